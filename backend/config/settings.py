@@ -6,6 +6,7 @@ from pathlib import Path
 from datetime import timedelta
 import os
 import dj_database_url
+from celery.schedules import crontab
 
 # ==========================
 # BASE
@@ -47,6 +48,7 @@ INSTALLED_APPS = [
 # MIDDLEWARE
 # ==========================
 MIDDLEWARE = [
+    'participants.metrics.QueryMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -83,6 +85,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Base de tests en archivo (no en memoria): los tests de sorteos
+        # concurrentes necesitan el locking real de SQLite entre conexiones
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -175,11 +180,216 @@ SIMPLE_JWT = {
 # EMAIL (SendGrid vía API con AnyMail)
 # ==========================
 
+# Tiempo máximo por envío (conexión y respuesta del proveedor). El worker de
+# email usa -P threads, que ignora los límites de tiempo de Celery: este
+# timeout del cliente es lo que acota cada envío
+EMAIL_SEND_TIMEOUT = float(os.getenv('EMAIL_SEND_TIMEOUT', '20'))
+
 ANYMAIL = {
     "SENDGRID_API_KEY": os.getenv("SENDGRID_API_KEY"),
+    "REQUESTS_TIMEOUT": EMAIL_SEND_TIMEOUT,
 }
+# Mismo límite si se usa el backend SMTP
+EMAIL_TIMEOUT = EMAIL_SEND_TIMEOUT
 
 EMAIL_BACKEND = "anymail.backends.sendgrid.EmailBackend"
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "noreply@ctsturismo.cl")
 
 FRONTEND_URL = os.getenv("FRONTEND_URL", "https://sorteo-san-valentin.vercel.app")
+
+# ==========================
+# CACHE
+# ==========================
+# Con REDIS_URL la caché (y con ella el límite de envío de emails) se comparte
+# entre todos los procesos de gunicorn y Celery
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# ==========================
+# CELERY
+# ==========================
+# Sin broker las tareas se ejecutan en el proceso web (ver participants/dispatch.py).
+# Para medir en una sola máquina sin Redis: CELERY_BROKER_URL=memory:// (un
+# proceso) o filesystem:// con CELERY_BROKER_FOLDER (varios procesos)
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL')
+CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
+if CELERY_BROKER_URL and CELERY_BROKER_URL.startswith('filesystem://'):
+    CELERY_BROKER_FOLDER = Path(os.getenv('CELERY_BROKER_FOLDER', BASE_DIR / '.celery-broker'))
+    CELERY_BROKER_TRANSPORT_OPTIONS = {
+        'data_folder_in': str(CELERY_BROKER_FOLDER / 'out'),
+        'data_folder_out': str(CELERY_BROKER_FOLDER / 'out'),
+        'processed_folder': str(CELERY_BROKER_FOLDER / 'processed'),
+        'control_folder': str(CELERY_BROKER_FOLDER / 'control'),
+        'store_processed': False,
+        'polling_interval': 0.1,
+    }
+    for folder in ('out', 'processed'):
+        (CELERY_BROKER_FOLDER / folder).mkdir(parents=True, exist_ok=True)
+
+# Colas separadas: los emails (muchos, lentos por red) no retrasan los sorteos.
+# Worker de email (I/O):  celery -A config worker -Q email -P threads -c 16 --prefetch-multiplier 4
+# Worker de sorteos:      celery -A config worker -Q draw,default -c 2 --prefetch-multiplier 1
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_QUEUES = {
+    'default': {'exchange': 'default', 'routing_key': 'default'},
+    'email': {'exchange': 'email', 'routing_key': 'email'},
+    'draw': {'exchange': 'draw', 'routing_key': 'draw'},
+}
+CELERY_TASK_ROUTES = {
+    'participants.tasks.send_verification_email': {'queue': 'email'},
+    'participants.tasks.send_winner_notification': {'queue': 'email'},
+    'participants.tasks.dispatch_email_outbox': {'queue': 'email'},
+    'participants.tasks.warm_draw_job': {'queue': 'draw'},
+    'participants.tasks.run_draw_job': {'queue': 'draw'},
+    'participants.tasks.run_bulk_job': {'queue': 'default'},
+    'participants.tasks.send_verification_reminders': {'queue': 'default'},
+    'participants.tasks.purge_unverified_participants': {'queue': 'default'},
+}
+# Un mensaje reservado por proceso: un sorteo nunca espera detrás de otro ya
+# reservado. El worker de email lo sube con --prefetch-multiplier
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.getenv('CELERY_WORKER_PREFETCH_MULTIPLIER', '1'))
+CELERY_WORKER_MAX_TASKS_PER_CHILD = 1000
+# El estado de sorteos, acciones masivas y envíos queda en la base de datos
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_RESULT_BACKEND = None
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_ACCEPT_CONTENT = ['json']
+# Límites de tiempo: el suave lanza SoftTimeLimitExceeded (la tarea puede
+# limpiar o reintentar), el duro termina el proceso hijo. Solo los aplica el
+# pool prefork (workers de draw y default); el pool de hilos del worker de
+# email los ignora, y ahí cada envío lo acota EMAIL_SEND_TIMEOUT
+CELERY_TASK_SOFT_TIME_LIMIT = 240
+CELERY_TASK_TIME_LIMIT = 300
+CELERY_TASK_ANNOTATIONS = {
+    'participants.tasks.run_bulk_job': {'soft_time_limit': 3300, 'time_limit': 3600},
+    'participants.tasks.send_verification_reminders': {'soft_time_limit': 3300, 'time_limit': 3600},
+    'participants.tasks.purge_unverified_participants': {'soft_time_limit': 3300, 'time_limit': 3600},
+}
+
+# ==========================
+# SORTEO
+# ==========================
+# Minutos antes de un sorteo programado en que se precalcula el pool elegible
+DRAW_WARMUP_MINUTES = int(os.getenv('DRAW_WARMUP_MINUTES', '10'))
+
+# ==========================
+# BACKGROUND (sin broker)
+# ==========================
+# Pool de hilos acotado para enviar emails fuera del request cuando no hay Celery
+BACKGROUND_EXECUTOR_WORKERS = int(os.getenv('BACKGROUND_EXECUTOR_WORKERS', '4'))
+BACKGROUND_EXECUTOR_QUEUE = int(os.getenv('BACKGROUND_EXECUTOR_QUEUE', '100'))
+# Con el pool lleno: 'inline' ejecuta en el request, 'block' espera un cupo
+# (hasta BACKGROUND_EXECUTOR_BLOCK_SECONDS) y 'outbox' deja los emails en la
+# bandeja para el próximo despacho (requiere `dispatch_outbox` periódico)
+BACKGROUND_EXECUTOR_POLICY = os.getenv('BACKGROUND_EXECUTOR_POLICY', 'inline')
+BACKGROUND_EXECUTOR_BLOCK_SECONDS = float(os.getenv('BACKGROUND_EXECUTOR_BLOCK_SECONDS', '5'))
+# Espera máxima para drenar el pool al apagar el worker (menor que el
+# graceful timeout de gunicorn, 30s por defecto)
+BACKGROUND_EXECUTOR_SHUTDOWN_SECONDS = float(os.getenv('BACKGROUND_EXECUTOR_SHUTDOWN_SECONDS', '25'))
+
+# ==========================
+# EMAIL OUTBOX
+# ==========================
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', '100'))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', '5'))
+
+# Límite de envío del proveedor (token bucket compartido en la caché)
+EMAIL_RATE_PER_SECOND = float(os.getenv('EMAIL_RATE_PER_SECOND', '10'))
+EMAIL_RATE_BURST = int(os.getenv('EMAIL_RATE_BURST', '10'))
+EMAIL_DAILY_LIMIT = int(os.getenv('EMAIL_DAILY_LIMIT', '0'))  # 0 = sin límite diario
+# Espera máxima antes de reprogramar un envío, y espera tras un 429 del proveedor
+EMAIL_THROTTLE_MAX_WAIT = float(os.getenv('EMAIL_THROTTLE_MAX_WAIT', '2'))
+EMAIL_THROTTLE_RETRY_SECONDS = int(os.getenv('EMAIL_THROTTLE_RETRY_SECONDS', '60'))
+
+# Tareas de email de Celery: reintentos con espera exponencial (5s, 10s, 20s...
+# hasta EMAIL_TASK_RETRY_BACKOFF_MAX) y reserva de un envío en curso
+EMAIL_TASK_MAX_RETRIES = int(os.getenv('EMAIL_TASK_MAX_RETRIES', '8'))
+EMAIL_TASK_RETRY_BACKOFF = 5
+EMAIL_TASK_RETRY_BACKOFF_MAX = 600
+EMAIL_DELIVERY_CLAIM_TIMEOUT = 300
+
+CELERY_BEAT_SCHEDULE = {
+    'dispatch-email-outbox': {
+        'task': 'participants.tasks.dispatch_email_outbox',
+        'schedule': 30.0,
+    },
+    'send-verification-reminders': {
+        'task': 'participants.tasks.send_verification_reminders',
+        'schedule': crontab(hour=11, minute=0),
+    },
+    'purge-unverified-participants': {
+        'task': 'participants.tasks.purge_unverified_participants',
+        'schedule': crontab(hour=4, minute=30),
+    },
+}
+
+# ==========================
+# RECORDATORIOS
+# ==========================
+# Recordatorio de verificación para quien se registró hace más de
+# REMINDER_MIN_AGE_HOURS, como máximo uno cada REMINDER_INTERVAL_HOURS
+REMINDER_MIN_AGE_HOURS = int(os.getenv('REMINDER_MIN_AGE_HOURS', '24'))
+REMINDER_INTERVAL_HOURS = int(os.getenv('REMINDER_INTERVAL_HOURS', '72'))
+# Filas por consulta y por transacción al recorrer los no verificados
+REMINDER_CHUNK_SIZE = int(os.getenv('REMINDER_CHUNK_SIZE', '1000'))
+
+# ==========================
+# RETENCIÓN
+# ==========================
+# Días que se conserva un registro sin verificar (0 desactiva la purga periódica)
+UNVERIFIED_RETENTION_DAYS = int(os.getenv('UNVERIFIED_RETENTION_DAYS', '30'))
+# Filas por transacción al purgar y pausa entre bloques
+PURGE_BATCH_SIZE = int(os.getenv('PURGE_BATCH_SIZE', '500'))
+PURGE_SLEEP_SECONDS = float(os.getenv('PURGE_SLEEP_SECONDS', '0.1'))
+
+# ==========================
+# ACCIONES MASIVAS
+# ==========================
+# Filas por transacción (un UPDATE / un INSERT a la bandeja por bloque)
+BULK_JOB_CHUNK_SIZE = int(os.getenv('BULK_JOB_CHUNK_SIZE', '1000'))
+BULK_JOB_MAX_IDS = int(os.getenv('BULK_JOB_MAX_IDS', '100000'))
+
+# ==========================
+# EVENTOS EN VIVO (SSE)
+# ==========================
+# /api/admin/events/ debe servirse con ASGI (ver Procfile): cada conexión es
+# una corrutina que lee los eventos publicados en la caché
+LIVE_EVENTS_BUFFER = int(os.getenv('LIVE_EVENTS_BUFFER', '1000'))
+LIVE_EVENTS_TTL = int(os.getenv('LIVE_EVENTS_TTL', '600'))
+LIVE_EVENTS_BATCH = 100
+LIVE_EVENTS_POLL_SECONDS = float(os.getenv('LIVE_EVENTS_POLL_SECONDS', '1'))
+LIVE_EVENTS_KEEPALIVE_SECONDS = 15
+LIVE_EVENTS_MAX_SECONDS = int(os.getenv('LIVE_EVENTS_MAX_SECONDS', '300'))
+LIVE_EVENTS_RETRY_MS = 3000
+# Vigencia del token de /api/admin/events/token/: solo se valida al conectar
+LIVE_EVENTS_TOKEN_SECONDS = int(os.getenv('LIVE_EVENTS_TOKEN_SECONDS', '60'))
+
+# ==========================
+# ADMIN
+# ==========================
+# Bajo este número de filas estimadas el admin cuenta exacto (COUNT(*))
+ADMIN_EXACT_COUNT_THRESHOLD = int(os.getenv('ADMIN_EXACT_COUNT_THRESHOLD', '10000'))
+
+# ==========================
+# MÉTRICAS
+# ==========================
+# Cada proceso vuelca sus métricas a la caché como máximo cada tantos segundos
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '5'))
+# Máximo de consultas por endpoint (nombre de URL). Superarlo deja un warning
+# en el log y un contador en /api/admin/metrics/; los tests lo hacen fallar.
+QUERY_BUDGET_DEFAULT = 10
+QUERY_BUDGETS = {
+    'admin-winners-draw': 18,
+    'register': 10,
+    'verify-email': 7,
+    'set-password': 7,
+    'admin-participants-list': 5,
+    'admin-participants-stats': 3,
+    'admin-winners-list': 4,
+}
@@ -0,0 +1,10 @@
+"""
+Configuración de gunicorn (se carga sola al iniciar gunicorn desde backend/)
+"""
+
+
+def worker_exit(server, worker):
+    """Drena el pool de hilos en segundo plano antes de que el worker termine"""
+    from participants.dispatch import shutdown_background
+
+    shutdown_background()
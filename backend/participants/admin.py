@@ -1,13 +1,64 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import Participant, Winner
+from django.urls import reverse
+from django.utils.html import format_html
+
+from .bulk import create_bulk_job
+from .models import BulkJob, EmailOutbox, Participant, Winner
+from .pagination import EstimatedCountPaginator
+
+
+class ProjectedChangeList(ChangeList):
+    """ChangeList que solo lee de la base de datos las columnas de `list_only` para la página"""
+
+    def get_results(self, request):
+        # Solo la página mostrada: las acciones siguen recibiendo filas completas
+        queryset = self.queryset
+        self.queryset = queryset.only(*self.model_admin.list_only)
+        try:
+            super().get_results(request)
+        finally:
+            self.queryset = queryset
+
+
+class HighVolumeAdminMixin:
+    """
+    Changelist para tablas grandes: conteo estimado, sin conteo total extra
+    ni facetas por filtro, y proyección con only().
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    list_only = ()
+
+    def get_changelist(self, request, **kwargs):
+        return ProjectedChangeList if self.list_only else super().get_changelist(request, **kwargs)
+
+
+def start_bulk_job(model_admin, request, queryset, action):
+    """Deja la acción en segundo plano y enlaza a su progreso (hasta BULK_JOB_MAX_IDS filas)"""
+    limit = settings.BULK_JOB_MAX_IDS
+    ids = list(queryset.values_list('pk', flat=True)[:limit + 1])
+    if len(ids) > limit:
+        model_admin.message_user(
+            request, f'Selecciona como máximo {limit} filas por acción masiva.', level=messages.ERROR
+        )
+        return
+    job = create_bulk_job(action, ids, request.user)
+    url = reverse('admin:participants_bulkjob_change', args=[job.pk])
+    model_admin.message_user(request, format_html(
+        '{}: {} fila(s) en proceso. <a href="{}">Ver progreso</a>', job.get_action_display(), job.total, url
+    ))
 
 
 @admin.register(Participant)
-class ParticipantAdmin(BaseUserAdmin):
+class ParticipantAdmin(HighVolumeAdminMixin, BaseUserAdmin):
     """Admin interface for Participant model"""
 
     list_display = ['email', 'full_name', 'phone', 'is_verified', 'is_admin', 'created_at']
+    list_only = ['id', 'email', 'full_name', 'phone', 'is_verified', 'is_admin', 'created_at']
     list_filter = ['is_verified', 'is_admin', 'is_active', 'created_at']
     search_fields = ['email', 'full_name', 'phone']
     ordering = ['-created_at']
@@ -17,7 +68,7 @@ class ParticipantAdmin(BaseUserAdmin):
             'fields': ('email', 'full_name', 'phone')
         }),
         ('Estado de Cuenta', {
-            'fields': ('is_verified', 'verified_at', 'verification_token')
+            'fields': ('is_verified', 'verified_at', 'last_reminded_at', 'verification_token', 'entry_weight')
         }),
         ('Permisos', {
             'fields': ('is_active', 'is_admin', 'is_superuser')
@@ -27,7 +78,8 @@ class ParticipantAdmin(BaseUserAdmin):
         }),
     )
 
-    readonly_fields = ['created_at', 'updated_at', 'verified_at', 'verification_token']
+    readonly_fields = ['created_at', 'updated_at', 'verified_at', 'last_reminded_at', 'verification_token']
+    actions = ['resend_verification_email', 'deactivate_participants']
 
     add_fieldsets = (
         (None, {
@@ -36,12 +88,25 @@ class ParticipantAdmin(BaseUserAdmin):
         }),
     )
 
+    @admin.action(description='Reenviar email de verificación')
+    def resend_verification_email(self, request, queryset):
+        start_bulk_job(self, request, queryset.filter(is_verified=False), BulkJob.ACTION_RESEND_VERIFICATION)
+
+    @admin.action(description='Desactivar participantes')
+    def deactivate_participants(self, request, queryset):
+        start_bulk_job(self, request, queryset.filter(is_active=True, is_admin=False), BulkJob.ACTION_DEACTIVATE)
+
 
 @admin.register(Winner)
-class WinnerAdmin(admin.ModelAdmin):
+class WinnerAdmin(HighVolumeAdminMixin, admin.ModelAdmin):
     """Admin interface for Winner model"""
 
     list_display = ['get_participant_name', 'get_participant_email', 'drawn_at', 'notified', 'get_drawn_by']
+    list_select_related = ['participant', 'drawn_by']
+    list_only = [
+        'id', 'drawn_at', 'notified',
+        'participant__full_name', 'participant__email', 'drawn_by__full_name',
+    ]
     list_filter = ['notified', 'drawn_at']
     search_fields = ['participant__email', 'participant__full_name']
     ordering = ['-drawn_at']
@@ -56,9 +121,21 @@ class WinnerAdmin(admin.ModelAdmin):
         ('Notificación', {
             'fields': ('notified', 'notified_at')
         }),
+        ('Auditoría', {
+            'fields': ('draw_mode', 'pool_size', 'pool_digest', 'nonce', 'seed')
+        }),
     )
 
-    readonly_fields = ['drawn_at', 'notified_at']
+    readonly_fields = ['drawn_at', 'notified_at', 'draw_mode', 'pool_size', 'pool_digest', 'nonce', 'seed']
+    actions = ['send_winner_notification', 'mark_winners_notified']
+
+    @admin.action(description='Enviar notificación al ganador')
+    def send_winner_notification(self, request, queryset):
+        start_bulk_job(self, request, queryset, BulkJob.ACTION_NOTIFY_WINNERS)
+
+    @admin.action(description='Marcar como notificados')
+    def mark_winners_notified(self, request, queryset):
+        start_bulk_job(self, request, queryset.filter(notified=False), BulkJob.ACTION_MARK_NOTIFIED)
 
     def get_participant_name(self, obj):
         return obj.participant.full_name
@@ -71,3 +148,36 @@ class WinnerAdmin(admin.ModelAdmin):
     def get_drawn_by(self, obj):
         return obj.drawn_by.full_name if obj.drawn_by else '-'
     get_drawn_by.short_description = 'Sorteado por'
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    """Admin interface for EmailOutbox model"""
+
+    list_display = ['to_email', 'kind', 'status', 'attempts', 'available_at', 'sent_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['to_email']
+    ordering = ['-id']
+    readonly_fields = ['participant', 'winner', 'created_at', 'sent_at', 'last_error']
+
+
+@admin.register(BulkJob)
+class BulkJobAdmin(admin.ModelAdmin):
+    """Admin interface for BulkJob model"""
+
+    list_display = ['action', 'status', 'processed', 'total', 'affected', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'action']
+    list_select_related = ['created_by']
+    ordering = ['-created_at']
+    exclude = ['target_ids']
+    readonly_fields = [
+        'action', 'status', 'total', 'processed', 'affected', 'error',
+        'created_by', 'created_at', 'started_at', 'finished_at'
+    ]
+
+    def get_queryset(self, request):
+        # target_ids puede tener BULK_JOB_MAX_IDS elementos: no se lee en el listado ni en el detalle
+        return super().get_queryset(request).defer('target_ids')
+
+    def has_add_permission(self, request):
+        return False
@@ -10,6 +10,10 @@ class ParticipantsConfig(AppConfig):
     name = 'participants'
 
     def ready(self):
+        from . import signals  # noqa: F401
+        from .draw import invalidate_alias_table
+        from .models import ParticipantCounters
+
         # Solo limpiar en producción, no en dev
         if os.getenv('DEBUG', 'True') == 'False':
             try:
@@ -25,6 +29,10 @@ class ParticipantsConfig(AppConfig):
                         # Reactiva las restricciones FK
                         cursor.execute("SET session_replication_role = 'origin';")
 
+                    # El DELETE directo no emite señales: contadores y tabla alias se recalculan aquí
+                    ParticipantCounters.reconcile()
+                    invalidate_alias_table()
+
                 logger.info("Se limpiaron las tablas Participant y Winner correctamente (modo forzado).")
             except Exception as e:
                 logger.warning(f"No se pudo limpiar las tablas: {e}")
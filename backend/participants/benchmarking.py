@@ -0,0 +1,115 @@
+"""
+Utilidades compartidas por los comandos de benchmark.
+
+Los datos sintéticos se crean dentro de una transacción que se revierte al
+terminar, por lo que los benchmarks nunca dejan filas en la base de datos.
+"""
+import random
+import statistics
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+from django.core.mail.backends import locmem
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Participant
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """Ejecuta el bloque dentro de una transacción que siempre se revierte"""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback()
+    except _Rollback:
+        pass
+
+
+def seed_participants(total, verified_ratio=1.0, batch_size=5000, start=0):
+    """Inserta `total` participantes sintéticos con bulk_create"""
+    verified_every = max(1, round(1 / verified_ratio)) if verified_ratio else 0
+    now = timezone.now()
+    created = 0
+    while created < total:
+        batch = []
+        for i in range(start + created, start + min(created + batch_size, total)):
+            batch.append(Participant(
+                id=uuid.uuid4(),
+                email=f'bench{i}@example.com',
+                full_name=f'Participante Benchmark {i}',
+                phone=f'+569{i:08d}',
+                password='!',
+                is_verified=bool(verified_every) and i % verified_every == 0,
+                verified_at=now if verified_every and i % verified_every == 0 else None,
+            ))
+        Participant.objects.bulk_create(batch, batch_size=batch_size)
+        created += len(batch)
+    return created
+
+
+def measure(func, repeat=5, trace_memory=True):
+    """
+    Ejecuta `func` `repeat` veces y retorna un dict con la mediana en ms y
+    el pico de memoria Python (tracemalloc) en MB. tracemalloc encarece cada
+    asignación: para medir solo CPU usar trace_memory=False.
+    """
+    timings = []
+    peak = 0
+    for _ in range(repeat):
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+        if trace_memory:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return {
+        'median_ms': statistics.median(timings),
+        'peak_mb': peak / (1024 * 1024),
+    }
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano sobre una lista de valores"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class LatencyEmailBackend(locmem.EmailBackend):
+    """Backend en memoria que simula la latencia HTTP del proveedor de email"""
+
+    latency_seconds = 0.15
+
+    def send_messages(self, messages):
+        time.sleep(self.latency_seconds * len(messages))
+        return super().send_messages(messages)
+
+
+class FlakyEmailBackend(locmem.EmailBackend):
+    """Backend en memoria que falla con probabilidad `failure_rate` (reproducible con `seed`)"""
+
+    failure_rate = 0.2
+    seed = 0
+    _random = random.Random(seed)
+
+    @classmethod
+    def reset(cls, failure_rate, seed=0):
+        cls.failure_rate = failure_rate
+        cls._random = random.Random(seed)
+
+    def send_messages(self, messages):
+        if self._random.random() < self.failure_rate:
+            raise ConnectionError("Fallo simulado del proveedor de email")
+        return super().send_messages(messages)
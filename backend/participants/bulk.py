@@ -0,0 +1,126 @@
+"""
+Acciones masivas del admin ejecutadas por bloques en segundo plano
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from .dispatch import broker_configured, run_in_background
+from .draw import invalidate_alias_table
+from .live import WINNERS_NOTIFIED, publish_on_commit
+from .models import BulkJob, Participant, ParticipantCounters, Winner
+from .outbox import enqueue_verification_emails, enqueue_winner_emails, flush_outbox_on_commit
+
+logger = logging.getLogger(__name__)
+
+
+def _resend_verification(ids):
+    """Un solo INSERT a la bandeja de salida por bloque"""
+    pending = list(Participant.objects.filter(id__in=ids, is_verified=False, is_active=True, is_admin=False))
+    enqueue_verification_emails(pending)
+    if pending:
+        flush_outbox_on_commit()
+    return len(pending)
+
+
+def _deactivate(ids):
+    """
+    UPDATE por bloque. update() no pasa por Participant.save(), así que los
+    contadores se ajustan aquí con las filas bloqueadas antes de modificarlas.
+    """
+    has_won = Exists(Winner.objects.filter(participant=OuterRef('pk')))
+    rows = list(
+        Participant.objects.select_for_update()
+        .filter(id__in=ids, is_active=True, is_admin=False)
+        .annotate(has_won=has_won)
+        .values_list('id', 'is_verified', 'has_won')
+    )
+    if not rows:
+        return 0
+    Participant.objects.filter(id__in=[row[0] for row in rows]).update(is_active=False, updated_at=timezone.now())
+    eligible = sum(1 for _, verified, won in rows if verified and not won)
+    ParticipantCounters.increment(active=-len(rows), eligible=-eligible)
+    invalidate_alias_table()
+    return len(rows)
+
+
+def _notify_winners(ids):
+    winners = list(Winner.objects.filter(id__in=ids).select_related('participant'))
+    enqueue_winner_emails(winners)
+    if winners:
+        flush_outbox_on_commit()
+    return len(winners)
+
+
+def _mark_notified(ids):
+    now = timezone.now()
+    pending = list(Winner.objects.filter(id__in=ids, notified=False).values_list('id', flat=True))
+    Winner.objects.filter(id__in=pending).update(notified=True, notified_at=now, updated_at=now)
+    if pending:
+        publish_on_commit(WINNERS_NOTIFIED, ids=pending)
+    return len(pending)
+
+
+ACTIONS = {
+    BulkJob.ACTION_RESEND_VERIFICATION: _resend_verification,
+    BulkJob.ACTION_DEACTIVATE: _deactivate,
+    BulkJob.ACTION_NOTIFY_WINNERS: _notify_winners,
+    BulkJob.ACTION_MARK_NOTIFIED: _mark_notified,
+}
+
+
+def create_bulk_job(action, ids, created_by):
+    """Crea la acción masiva y la encola al confirmar la transacción"""
+    ids = list(dict.fromkeys(str(pk) for pk in ids))
+    job = BulkJob.objects.create(action=action, target_ids=ids, total=len(ids), created_by=created_by)
+    transaction.on_commit(lambda: dispatch_bulk_job(job.id))
+    return job
+
+
+def dispatch_bulk_job(job_id):
+    """Celery si hay broker; si no, el pool de hilos del proceso (no bloquea el request)"""
+    from .tasks import run_bulk_job
+
+    if broker_configured():
+        run_bulk_job.delay(str(job_id))
+    else:
+        run_in_background(process_bulk_job, str(job_id))
+
+
+def process_bulk_job(job_id):
+    """
+    Ejecuta la acción en bloques de BULK_JOB_CHUNK_SIZE. Cada bloque y su
+    avance se confirman juntos, así que el progreso refleja exactamente lo
+    aplicado aunque el job falle a mitad de camino.
+    """
+    # Transición atómica: una entrega duplicada no vuelve a ejecutar el job
+    claimed = BulkJob.objects.filter(id=job_id, status=BulkJob.STATUS_PENDING).update(
+        status=BulkJob.STATUS_RUNNING, started_at=timezone.now()
+    )
+    if not claimed:
+        return None
+
+    job = BulkJob.objects.get(id=job_id)
+    handler = ACTIONS[job.action]
+    size = settings.BULK_JOB_CHUNK_SIZE
+    try:
+        for start in range(job.processed, len(job.target_ids), size):
+            chunk = job.target_ids[start:start + size]
+            with transaction.atomic():
+                affected = handler(chunk)
+                BulkJob.objects.filter(id=job_id).update(
+                    processed=F('processed') + len(chunk), affected=F('affected') + affected
+                )
+    except Exception as e:
+        logger.exception("Acción masiva %s falló", job_id)
+        BulkJob.objects.filter(id=job_id).update(
+            status=BulkJob.STATUS_FAILED, error=str(e), finished_at=timezone.now()
+        )
+        raise
+
+    BulkJob.objects.filter(id=job_id).update(status=BulkJob.STATUS_DONE, finished_at=timezone.now())
+    job.refresh_from_db()
+    return job
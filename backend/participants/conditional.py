@@ -0,0 +1,59 @@
+"""
+GET condicional (ETag / Last-Modified) para los listados del dashboard
+"""
+import hashlib
+
+from django.db.models import Count, Max, Subquery
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import Participant, ParticipantCounters, Winner
+
+
+def participants_version():
+    """
+    (total, último updated_at) de los participantes en una sola consulta.
+    Toda edición pasa por save() y mueve updated_at; las bajas cambian el
+    total mantenido en ParticipantCounters, así que sirve para cualquier filtro.
+    """
+    last_modified = Participant.objects.order_by('-updated_at').values('updated_at')[:1]
+    row = ParticipantCounters.objects.filter(pk=ParticipantCounters.SINGLETON_ID).annotate(
+        last_modified=Subquery(last_modified)
+    ).values_list('total', 'last_modified').first()
+    return row or (None, None)
+
+
+def winners_version():
+    """(cantidad, último updated_at de ganadores y de sus participantes) de los ganadores"""
+    row = Winner.objects.aggregate(
+        count=Count('id'),
+        last_modified=Max('updated_at'),
+        participants_modified=Max('participant__updated_at'),
+    )
+    return row['count'], row['last_modified'], row['participants_modified']
+
+
+def make_etag(request, version):
+    """ETag a partir de la ruta, los parámetros de la consulta y la versión de los datos"""
+    params = sorted(request.GET.lists())
+    raw = repr((request.path, params, version)).encode()
+    return '"{}"'.format(hashlib.md5(raw, usedforsecurity=False).hexdigest())
+
+
+def conditional_get(request, build_response, version, last_modified=None):
+    """
+    Responde 304 si el If-None-Match coincide con la versión actual, sin
+    llamar a `build_response` (no se consulta ni se serializa la página).
+    Solo se valida con ETag: Last-Modified no refleja las bajas, así que se
+    envía como dato informativo.
+    """
+    etag = make_etag(request, version)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build_response()
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # El navegador guarda la respuesta pero la revalida en cada petición
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,143 @@
+"""
+Despacho de tareas en segundo plano: Celery cuando hay broker configurado,
+un pool de hilos acotado en el mismo proceso cuando no lo hay
+"""
+import atexit
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+POLICY_BLOCK = 'block'
+POLICY_OUTBOX = 'outbox'
+POLICY_INLINE = 'inline'
+
+_executor = None
+_slots = None
+_closed = False
+_pending = set()
+_lock = threading.Lock()
+
+
+def broker_configured():
+    """Indica si hay un broker de Celery configurado (CELERY_BROKER_URL)"""
+    return bool(getattr(settings, 'CELERY_BROKER_URL', None))
+
+
+def enqueue(task, *args, eta=None):
+    """
+    Encola `task` en Celery. Sin broker la ejecuta en el pool de hilos del
+    proceso, así que el request no espera a que termine (en ese caso no se
+    admite `eta`).
+    """
+    if broker_configured():
+        return task.apply_async(args=args, eta=eta)
+    if eta is not None:
+        raise RuntimeError('Las tareas programadas requieren un broker de Celery.')
+    return run_in_background(task, *args)
+
+
+def _get_executor():
+    """Crea el pool de hilos del proceso la primera vez que se usa (None tras apagarlo)"""
+    global _executor, _slots
+    with _lock:
+        if _executor is None and not _closed:
+            workers = settings.BACKGROUND_EXECUTOR_WORKERS
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='background')
+            # Cupos = hilos ocupados + trabajos en espera
+            _slots = threading.BoundedSemaphore(workers + settings.BACKGROUND_EXECUTOR_QUEUE)
+            # Para procesos sin hook de apagado. concurrent.futures espera a sus
+            # hilos antes de los callbacks de atexit, así que en los workers web
+            # el drenaje acotado lo dispara gunicorn (worker_exit en gunicorn.conf.py)
+            atexit.register(shutdown_background)
+        return None if _closed else _executor
+
+
+def _acquire_slot(slots):
+    """Toma un cupo del pool; con la política 'block' espera a que se libere uno"""
+    if slots.acquire(blocking=False):
+        return True
+    if settings.BACKGROUND_EXECUTOR_POLICY == POLICY_BLOCK:
+        return slots.acquire(timeout=settings.BACKGROUND_EXECUTOR_BLOCK_SECONDS)
+    return False
+
+
+def _run(func, args):
+    """Ejecuta el trabajo y cierra las conexiones a la base que abrió el hilo"""
+    try:
+        return func(*args)
+    finally:
+        connections.close_all()
+
+
+def run_in_background(func, *args, on_drop=None):
+    """
+    Ejecuta `func(*args)` en el pool de hilos acotado del proceso.
+
+    Si la cola está llena se aplica BACKGROUND_EXECUTOR_POLICY: 'block' espera
+    un cupo (hasta BACKGROUND_EXECUTOR_BLOCK_SECONDS), 'outbox' descarta el
+    trabajo llamando a `on_drop` (solo para trabajos que ya quedaron guardados,
+    como la bandeja de salida) e 'inline' lo ejecuta en el hilo actual. Si no
+    se puede encolar ni descartar, el trabajo se ejecuta en el hilo actual:
+    la memoria queda acotada y ningún trabajo se pierde. Con
+    BACKGROUND_EXECUTOR_WORKERS = 0 todo se ejecuta en el hilo actual.
+    """
+    if settings.BACKGROUND_EXECUTOR_WORKERS <= 0:
+        return func(*args)
+    executor = _get_executor()
+    # El cupo se devuelve al mismo semáforo aunque el pool se reemplace
+    slots = _slots
+    if executor is None or not _acquire_slot(slots):
+        if on_drop is not None and settings.BACKGROUND_EXECUTOR_POLICY == POLICY_OUTBOX:
+            logger.warning("Pool en segundo plano lleno: %s queda para el próximo despacho", func.__name__)
+            return on_drop()
+        return func(*args)
+
+    future = executor.submit(_run, func, args)
+    with _lock:
+        _pending.add(future)
+
+    def _done(finished):
+        with _lock:
+            _pending.discard(finished)
+        slots.release()
+
+    future.add_done_callback(_done)
+    return future
+
+
+def wait_for_background(timeout=None):
+    """
+    Espera a que terminen los trabajos en segundo plano pendientes.
+    Retorna True si terminaron todos dentro de `timeout`.
+    """
+    with _lock:
+        pending = list(_pending)
+    return not wait(pending, timeout=timeout).not_done
+
+
+def shutdown_background(timeout=None):
+    """
+    Drena el pool al apagar el worker: deja de aceptar trabajos (los nuevos
+    se ejecutan en el hilo actual) y espera los pendientes hasta
+    BACKGROUND_EXECUTOR_SHUTDOWN_SECONDS. Retorna True si no quedó ninguno.
+    """
+    global _closed
+    with _lock:
+        _closed = True
+        executor = _executor
+    if executor is None:
+        return True
+    if timeout is None:
+        timeout = settings.BACKGROUND_EXECUTOR_SHUTDOWN_SECONDS
+    drained = wait_for_background(timeout)
+    if not drained:
+        with _lock:
+            remaining = len(_pending)
+        logger.warning("Apagado: %d trabajo(s) en segundo plano sin terminar", remaining)
+    executor.shutdown(wait=drained, cancel_futures=True)
+    return drained
@@ -0,0 +1,454 @@
+"""
+Motor del sorteo: selección de ganadores sin cargar el pool completo en memoria
+"""
+import hashlib
+import random
+import secrets
+import uuid
+import zlib
+from array import array
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .live import WINNERS_DRAWN, publish_on_commit
+from .models import DrawLock, Participant, ParticipantCounters, Winner
+
+STREAM_CHUNK_SIZE = 2000
+DEFAULT_CAMPAIGN = 'san-valentin'
+MODE_UNIFORM = 'uniform'
+MODE_WEIGHTED = 'weighted'
+
+# Tabla alias construida en este proceso y la versión con la que se construyó
+_alias_cache = {'version': None, 'table': None}
+
+
+def eligible_participants(as_of=None):
+    """
+    Retorna el queryset de participantes elegibles (sin premios previos).
+
+    Con `as_of` reconstruye el pool de un sorteo pasado: solo cuentan los
+    registros y verificaciones anteriores a esa fecha y los premios ya
+    entregados antes de ella.
+    """
+    queryset = Participant.objects.filter(is_verified=True, is_active=True, is_admin=False)
+    wins = Winner.objects.filter(participant=OuterRef('pk'))
+    if as_of is not None:
+        queryset = queryset.filter(created_at__lte=as_of).exclude(verified_at__gt=as_of)
+        wins = wins.filter(drawn_at__lt=as_of)
+    return queryset.exclude(Exists(wins))
+
+
+def weighted_pool(queryset):
+    """Restringe el pool a las filas con entradas (peso mayor a 0)"""
+    return queryset.filter(entry_weight__gt=0)
+
+
+def _hash_row(digest, pk, weight=None):
+    """Agrega una fila del pool al digest en curso"""
+    digest.update(pk.bytes)
+    if weight is not None:
+        digest.update(weight.to_bytes(4, 'big'))
+
+
+def pool_snapshot(queryset, weighted=False):
+    """
+    Calcula el SHA-256 del pool recorriendo sus pk en orden estable.
+
+    Los ids se leen en streaming con `values_list(...).iterator()`, por lo que
+    la memoria es constante sin importar el tamaño del pool. En el modo
+    ponderado cada pk se combina con su peso. Retorna (digest_hex, tamaño).
+    """
+    if not weighted:
+        digest, size, _ = scan_pool(queryset)
+        return digest, size
+    digest = hashlib.sha256()
+    size = 0
+    rows = weighted_pool(queryset).order_by('pk').values_list('pk', 'entry_weight')
+    for pk, weight in rows.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        _hash_row(digest, pk, weight)
+        size += 1
+    return digest.hexdigest(), size
+
+
+def scan_pool(queryset, positions=()):
+    """
+    Recorre el pool completo en orden por pk calculando su digest y toma los
+    pk que están en `positions` (ordenadas). Retorna (digest_hex, tamaño, pks).
+    La memoria es O(len(positions)).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    picked = []
+    wanted = iter(positions)
+    target = next(wanted, None)
+    for pk in queryset.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=STREAM_CHUNK_SIZE):
+        if size == target:
+            picked.append(pk)
+            target = next(wanted, None)
+        _hash_row(digest, pk)
+        size += 1
+    return digest.hexdigest(), size, picked
+
+
+def draw_positions(size, count, rng=random):
+    """
+    Posiciones sorteadas en [0, size), ordenadas. Usa el generador igual que
+    `pick_random_participant(s)`, así que los sorteos anteriores se
+    reproducen igual.
+    """
+    count = min(count, size)
+    if count == 0:
+        return []
+    if count == 1:
+        return [rng.randrange(size)]
+    return sorted(rng.sample(range(size), count))
+
+
+def derive_seed(pool_digest, nonce):
+    """Deriva la semilla del sorteo a partir del digest del pool y el nonce publicado"""
+    return hashlib.sha256(f'{pool_digest}:{nonce}'.encode()).hexdigest()
+
+
+def seeded_rng(seed):
+    """Generador reproducible para una semilla en hexadecimal"""
+    return random.Random(int(seed, 16))
+
+
+def pick_random_participant(queryset=None, rng=random):
+    """
+    Selecciona un participante de forma uniforme sin materializar el queryset.
+
+    Cuenta las filas elegibles, elige una posición al azar en [0, total) y
+    trae solo la clave primaria en esa posición (orden estable por pk). Si el
+    pool cambia entre el COUNT y la lectura se reintenta la selección.
+    Retorna None si no hay participantes elegibles.
+    """
+    if queryset is None:
+        queryset = eligible_participants()
+
+    ordered_pks = queryset.order_by('pk').values_list('pk', flat=True)
+    for _ in range(3):
+        total = queryset.count()
+        if total == 0:
+            return None
+        try:
+            winner_pk = ordered_pks[rng.randrange(total)]
+        except IndexError:
+            continue
+        try:
+            return Participant.objects.get(pk=winner_pk)
+        except Participant.DoesNotExist:
+            continue
+    return None
+
+
+def pick_random_participants(count, queryset=None, rng=random):
+    """
+    Selecciona `count` participantes distintos (sin reemplazo) en una pasada.
+
+    Elige `count` posiciones distintas en [0, total) y recorre las claves
+    primarias en orden estable con un iterador por chunks, quedándose solo con
+    las filas en esas posiciones. La memoria usada es O(count).
+    """
+    if queryset is None:
+        queryset = eligible_participants()
+
+    total = queryset.count()
+    count = min(count, total)
+    if count == 0:
+        return []
+
+    offsets = sorted(rng.sample(range(total), count))
+    picked = []
+    stream = queryset.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=STREAM_CHUNK_SIZE)
+    for position, pk in enumerate(stream):
+        if position == offsets[len(picked)]:
+            picked.append(pk)
+            if len(picked) == count:
+                break
+
+    # El orden del stream es por pk: se mezcla para asignar premios al azar
+    rng.shuffle(picked)
+    participants = Participant.objects.in_bulk(picked)
+    return [participants[pk] for pk in picked if pk in participants]
+
+
+class AliasTable:
+    """
+    Tabla alias de Vose para muestreo ponderado en O(1).
+
+    Se construye en O(n) a partir de los pares (pk, peso) del pool. Los datos
+    se guardan en arrays compactos: las probabilidades en `array('d')`, los
+    alias en `array('L')` y los UUID concatenados en un único bloque de bytes.
+    """
+
+    def __init__(self, pks, weights, digest=None):
+        n = len(weights)
+        total = float(sum(weights))
+        self.size = n
+        self.digest = digest
+        self._pks = pks
+        self._weights = weights
+        self._prob = array('d', bytes(8 * n))
+        self._alias = array('L', range(n))
+
+        scaled = array('d', (w * n / total for w in weights))
+        small = array('L', (i for i in range(n) if scaled[i] < 1.0))
+        large = array('L', (i for i in range(n) if scaled[i] >= 1.0))
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self._prob[less] = scaled[less]
+            self._alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        # Lo que queda tiene probabilidad 1 (salvo error de redondeo)
+        for index in large:
+            self._prob[index] = 1.0
+        for index in small:
+            self._prob[index] = 1.0
+
+    @classmethod
+    def from_queryset(cls, queryset):
+        """
+        Construye la tabla recorriendo el pool en streaming y en orden por pk.
+        El digest del pool (ver `pool_snapshot`) se calcula en la misma pasada.
+        """
+        pks = bytearray()
+        weights = array('L')
+        digest = hashlib.sha256()
+        rows = weighted_pool(queryset).order_by('pk').values_list('pk', 'entry_weight')
+        for pk, weight in rows.iterator(chunk_size=STREAM_CHUNK_SIZE):
+            _hash_row(digest, pk, weight)
+            pks += pk.bytes
+            weights.append(weight)
+        if not weights:
+            return None
+        return cls(bytes(pks), weights, digest.hexdigest())
+
+    def sample(self, count, rng=random):
+        """
+        Retorna `count` pk distintos (todos si el pool es menor) por muestreo
+        sucesivo sin reemplazo: las repeticiones se descartan y se vuelve a
+        sortear. Si se agotan los intentos (pocas entradas distintas frente a
+        `count`, o una con casi todo el peso) el resto se sortea recorriendo
+        las entradas aún no elegidas, con la misma distribución.
+        """
+        count = min(count, self.size)
+        picked = []
+        seen = set()
+        attempts = 0
+        while len(picked) < count and attempts < count * 50:
+            attempts += 1
+            index = self._pick_index(rng)
+            if index not in seen:
+                seen.add(index)
+                picked.append(index)
+        if len(picked) < count:
+            remaining = [index for index in range(self.size) if index not in seen]
+            while len(picked) < count:
+                target = rng.randrange(sum(self._weights[index] for index in remaining))
+                for position, index in enumerate(remaining):
+                    target -= self._weights[index]
+                    if target < 0:
+                        break
+                picked.append(remaining.pop(position))
+        return [self._pk(index) for index in picked]
+
+    def pick(self, rng=random):
+        """Retorna el pk de una entrada elegida con probabilidad proporcional a su peso"""
+        return self._pk(self._pick_index(rng))
+
+    def _pick_index(self, rng):
+        index = rng.randrange(self.size)
+        if rng.random() >= self._prob[index]:
+            index = self._alias[index]
+        return index
+
+    def _pk(self, index):
+        return uuid.UUID(bytes=self._pks[index * 16:(index + 1) * 16])
+
+
+def invalidate_alias_table():
+    """
+    Invalida la tabla alias en todos los procesos (cambió un peso o la
+    elegibilidad). La versión vive en la base: llamada dentro de la
+    transacción del cambio, los demás procesos ven la versión nueva junto con
+    los datos nuevos, nunca antes.
+    """
+    updated = ParticipantCounters.objects.filter(pk=ParticipantCounters.SINGLETON_ID).update(
+        pool_version=uuid.uuid4()
+    )
+    if not updated:
+        ParticipantCounters.reconcile()
+
+
+def get_alias_table():
+    """Retorna la tabla alias del pool elegible, reconstruyéndola solo si fue invalidada"""
+    version = ParticipantCounters.objects.filter(pk=ParticipantCounters.SINGLETON_ID).values_list(
+        'pool_version', flat=True
+    ).first()
+    if version is None:
+        version = ParticipantCounters.reconcile().pool_version
+    if _alias_cache['version'] != version:
+        _alias_cache['table'] = AliasTable.from_queryset(eligible_participants())
+        _alias_cache['version'] = version
+    return _alias_cache['table']
+
+
+def pick_weighted_participants(count, rng=random, table=None, queryset=None):
+    """
+    Selecciona `count` participantes distintos con probabilidad proporcional a
+    `entry_weight` usando la tabla alias (la cacheada si no se entrega una).
+
+    Retorna None si alguna selección ya no es elegible: la tabla quedó
+    desactualizada por una actualización masiva y hay que reconstruirla.
+    """
+    if table is None:
+        table = get_alias_table()
+    if table is None:
+        return []
+    if queryset is None:
+        queryset = eligible_participants()
+    picked = table.sample(count, rng)
+    participants = queryset.in_bulk(picked)
+    if len(participants) != len(picked):
+        return None
+    return [participants[pk] for pk in picked]
+
+
+class DrawError(Exception):
+    """El sorteo no se puede realizar (pool vacío o insuficiente)"""
+
+
+@contextmanager
+def draw_lock(campaign=DEFAULT_CAMPAIGN):
+    """
+    Abre una transacción que serializa los sorteos de una campaña.
+
+    En Postgres toma un advisory lock de transacción; en SQLite inicia la
+    transacción con BEGIN IMMEDIATE, que toma el lock de escritura de la base
+    desde el principio. En otros motores bloquea la fila DrawLock de la
+    campaña con SELECT ... FOR UPDATE. El lock se libera al terminar la
+    transacción.
+    """
+    if connection.vendor == 'sqlite':
+        connection.ensure_connection()
+        previous_mode = connection.transaction_mode
+        connection.transaction_mode = 'IMMEDIATE'
+        try:
+            with transaction.atomic():
+                connection.transaction_mode = previous_mode
+                DrawLock.objects.update_or_create(name=campaign, defaults={'acquired_at': timezone.now()})
+                yield
+        finally:
+            connection.transaction_mode = previous_mode
+        return
+
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [zlib.crc32(campaign.encode())])
+        else:
+            DrawLock.objects.get_or_create(name=campaign)
+            DrawLock.objects.select_for_update().filter(name=campaign).update(acquired_at=timezone.now())
+        yield
+
+
+def _select(mode, count, nonce):
+    """
+    Toma la fotografía del pool, deriva la semilla y selecciona los ganadores.
+    Retorna (participantes, digest, tamaño del pool, semilla).
+    """
+    if mode == MODE_WEIGHTED:
+        for _ in range(2):
+            table = get_alias_table()
+            if table is None:
+                return [], None, 0, None
+            seed = derive_seed(table.digest, nonce)
+            selected = pick_weighted_participants(count, seeded_rng(seed), table=table)
+            if selected is not None:
+                return selected, table.digest, table.size, seed
+            invalidate_alias_table()
+        raise DrawError('El pool cambió durante el sorteo, intenta nuevamente.')
+
+    # Dos pasadas en streaming: la primera calcula el digest (y con él la
+    # semilla), la segunda toma los pk sorteados y vuelve a calcular el digest.
+    # Si no coinciden, otra transacción cambió el pool entre ambas y se repite.
+    queryset = eligible_participants()
+    for _ in range(3):
+        digest, size = pool_snapshot(queryset)
+        seed = derive_seed(digest, nonce)
+        rng = seeded_rng(seed)
+        current, _, picked = scan_pool(queryset, draw_positions(size, count, rng))
+        if current != digest:
+            continue
+        # El orden del stream es por pk: se mezcla para asignar premios al azar
+        rng.shuffle(picked)
+        participants = Participant.objects.in_bulk(picked)
+        if len(participants) == len(picked):
+            return [participants[pk] for pk in picked], digest, size, seed
+    raise DrawError('El pool cambió durante el sorteo, intenta nuevamente.')
+
+
+def draw_winners(drawn_by, count=None, mode=MODE_UNIFORM, prize_descriptions=(), nonce=None):
+    """
+    Sortea y guarda los ganadores. Sin `count` sortea un único ganador.
+
+    La semilla del generador se deriva del SHA-256 del pool y de un nonce
+    publicado (uno aleatorio si no se entrega), y se guarda junto al digest y
+    el tamaño del pool en cada Winner para poder auditar el sorteo con el
+    comando `verify_draw`.
+
+    Debe llamarse dentro de `draw_lock()` para evitar sorteos duplicados.
+    Lanza DrawError si no hay suficientes participantes elegibles.
+    """
+    nonce = nonce or secrets.token_hex(16)
+    selected, digest, size, seed = _select(mode, count or 1, nonce)
+
+    if not selected:
+        raise DrawError('No hay participantes elegibles para el sorteo.')
+    if count is not None and len(selected) < count:
+        raise DrawError(f'Solo hay {len(selected)} participantes elegibles para el sorteo.')
+
+    winners = []
+    for index, participant in enumerate(selected):
+        extra = {'prize_description': prize_descriptions[index]} if index < len(prize_descriptions) else {}
+        winners.append(Winner(
+            participant=participant,
+            drawn_by=drawn_by,
+            draw_mode=mode,
+            draw_position=index,
+            pool_digest=digest,
+            pool_size=size,
+            nonce=nonce,
+            seed=seed,
+            **extra
+        ))
+    Winner.objects.bulk_create(winners)
+    # Todos venían del pool elegible: primer premio de cada uno
+    ParticipantCounters.increment(won=len(winners), eligible=-len(winners))
+    # bulk_create no emite post_save: los ganadores salen del pool ponderado
+    invalidate_alias_table()
+    publish_on_commit(WINNERS_DRAWN, ids=[winner.id for winner in winners])
+    return winners
+
+
+def replay_draw(mode, count, queryset, seed):
+    """
+    Repite la selección de un sorteo pasado sobre el pool reconstruido.
+    Retorna la lista de pk seleccionados en orden.
+    """
+    rng = seeded_rng(seed)
+    if mode == MODE_WEIGHTED:
+        table = AliasTable.from_queryset(queryset)
+        return table.sample(count, rng) if table is not None else []
+    _, _, picked = scan_pool(queryset, draw_positions(queryset.count(), count, rng))
+    rng.shuffle(picked)
+    return picked
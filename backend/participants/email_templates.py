@@ -0,0 +1,58 @@
+"""
+Plantillas de email: cada mensaje es un template con los bloques `subject`,
+`text` y `html` (templates/participants/emails/<nombre>.html). Se compila una
+sola vez por proceso y los tres bloques se renderizan con el mismo contexto.
+"""
+import threading
+from collections import namedtuple
+
+from django.template import Context, engines
+from django.template.loader_tags import BlockNode
+
+EMAIL_TEMPLATE = 'participants/emails/{}.html'
+PARTS = ('subject', 'text', 'html')
+# Solo la parte HTML se escapa; asunto y texto plano van tal cual
+AUTOESCAPE = {'subject': False, 'text': False, 'html': True}
+
+RenderedEmail = namedtuple('RenderedEmail', PARTS)
+
+_compiled = {}
+_lock = threading.Lock()
+
+
+def get_email_template(name):
+    """Retorna (template, {parte: nodelist}) compilado, leyéndolo del disco solo la primera vez"""
+    compiled = _compiled.get(name)
+    if compiled is None:
+        with _lock:
+            compiled = _compiled.get(name)
+            if compiled is None:
+                template = engines['django'].engine.get_template(EMAIL_TEMPLATE.format(name))
+                blocks = {node.name: node.nodelist for node in template.nodelist.get_nodes_by_type(BlockNode)}
+                missing = set(PARTS) - set(blocks)
+                if missing:
+                    raise ValueError(f"La plantilla {name} no define los bloques {', '.join(sorted(missing))}")
+                compiled = _compiled[name] = (template, blocks)
+    return compiled
+
+
+def clear_email_templates():
+    """Descarta las plantillas compiladas (para recargarlas tras editarlas)"""
+    with _lock:
+        _compiled.clear()
+
+
+def render_email(name, context):
+    """Renderiza asunto, texto y HTML de la plantilla `name` con un mismo contexto"""
+    template, blocks = get_email_template(name)
+    context = Context(context)
+    rendered = {}
+    with context.render_context.push_state(template), context.bind_template(template):
+        for part in PARTS:
+            context.autoescape = AUTOESCAPE[part]
+            rendered[part] = blocks[part].render(context)
+    return RenderedEmail(
+        subject=' '.join(rendered['subject'].split()),
+        text=rendered['text'].strip() + '\n',
+        html=rendered['html'].strip() + '\n',
+    )
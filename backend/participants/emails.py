@@ -1,49 +1,115 @@
 """
 Funciones para envío de emails (sin Celery - modo síncrono)
 """
+import logging
+from datetime import timedelta
+from types import SimpleNamespace
+
 from django.core.mail import send_mail
 from django.conf import settings
-from .models import Participant, Winner
-
-
-def send_verification_email_sync(participant_id):
+from django.utils import timezone
+from .email_templates import render_email
+from .models import EmailOutbox, Participant, Winner
+from .throttle import EmailThrottled, acquire, is_rate_limited_error, record_deferral
+
+logger = logging.getLogger(__name__)
+
+
+def verification_email_data(participant):
+    """Datos que necesita el email de verificación (evita volver a consultar la BD)"""
+    return {
+        'email': participant.email,
+        'full_name': participant.full_name,
+        'verification_token': str(participant.verification_token),
+    }
+
+
+def build_verification_email(participant):
+    """Retorna (asunto, texto, HTML) del email de verificación"""
+    return render_email('verification', {
+        'full_name': participant.full_name,
+        'verification_url': f"{settings.FRONTEND_URL}/verify/{participant.verification_token}",
+    })
+
+
+def build_reminder_email(participant):
+    """Retorna (asunto, texto, HTML) del recordatorio de verificación"""
+    return render_email('reminder', {
+        'full_name': participant.full_name,
+        'verification_url': f"{settings.FRONTEND_URL}/verify/{participant.verification_token}",
+    })
+
+
+def build_winner_email(winner):
+    """Retorna (asunto, texto, HTML) del email al ganador"""
+    return render_email('winner', {
+        'full_name': winner.participant.full_name,
+        'phone': winner.participant.phone,
+        'prize_description': winner.prize_description,
+    })
+
+
+def defer_to_outbox(kind, to_email, email, retry_after, participant_id=None, winner_id=None):
+    """Reprograma un envío sin presupuesto guardándolo en la bandeja de salida"""
+    EmailOutbox.objects.create(
+        kind=kind,
+        participant_id=participant_id,
+        winner_id=winner_id,
+        to_email=to_email,
+        subject=email.subject,
+        body=email.text,
+        html_body=email.html,
+        available_at=timezone.now() + timedelta(seconds=retry_after),
+    )
+    logger.info("Email a %s reprogramado en %.1fs por límite de envío", to_email, retry_after)
+
+
+def _send_throttled(email, to_email):
     """
-    Envía email de verificación de forma síncrona (sin Celery)
+    Envía respetando el límite del proveedor. Retorna None si se envió o los
+    segundos tras los cuales se debe reintentar.
     """
     try:
-        participant = Participant.objects.get(id=participant_id)
-
-        verification_link = f"{settings.FRONTEND_URL}/verify/{participant.verification_token}"
-
-        subject = 'Verifica tu email - Sorteo San Valentin'
-        message = f"""
-Hola {participant.full_name}!
-
-Gracias por registrarte en el Sorteo de San Valentin de CTS Turismo.
-
-Para completar tu registro y participar en el sorteo de una estadia romantica
-de 2 noches para pareja, por favor verifica tu correo haciendo clic en el
-siguiente enlace:
-
-{verification_link}
-
-Una vez verificado tu correo, podras crear tu contrasena y confirmar tu
-participacion.
-
-Mucha suerte!
-
----
-CTS Turismo
-Sorteo San Valentin 2025
-        """
-
+        acquire()
+    except EmailThrottled as e:
+        return e.retry_after
+    try:
         send_mail(
-            subject=subject,
-            message=message,
+            subject=email.subject,
+            message=email.text,
             from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[participant.email],
+            recipient_list=[to_email],
             fail_silently=False,
+            html_message=email.html,
         )
+    except Exception as e:
+        if not is_rate_limited_error(e):
+            raise
+        record_deferral()
+        return settings.EMAIL_THROTTLE_RETRY_SECONDS
+    return None
+
+
+def send_verification_email_sync(participant_id, participant_data=None):
+    """
+    Envía email de verificación de forma síncrona (sin Celery).
+    Si se entregan los datos del participante no se consulta la base de datos.
+    Si no hay presupuesto de envío el email queda en la bandeja de salida.
+    """
+    try:
+        if participant_data is None:
+            participant_data = verification_email_data(Participant.objects.get(id=participant_id))
+        participant = SimpleNamespace(**participant_data)
+
+        email = build_verification_email(participant)
+
+        retry_after = _send_throttled(email, participant.email)
+        if retry_after is not None:
+            defer_to_outbox(
+                EmailOutbox.KIND_VERIFICATION, participant.email, email, retry_after,
+                participant_id=participant_id
+            )
+            return False
 
         print(f"[OK] Email de verificacion enviado a: {participant.email}")
         return True
@@ -58,40 +124,22 @@ Sorteo San Valentin 2025
 
 def send_winner_notification_sync(winner_id):
     """
-    Envía notificación al ganador de forma síncrona (sin Celery)
+    Envía notificación al ganador de forma síncrona (sin Celery).
+    Si no hay presupuesto de envío el email queda en la bandeja de salida.
     """
     try:
-        winner = Winner.objects.get(id=winner_id)
+        winner = Winner.objects.select_related('participant').get(id=winner_id)
         participant = winner.participant
 
-        subject = 'FELICITACIONES! Eres el ganador del Sorteo San Valentin'
-        message = f"""
-FELICITACIONES {participant.full_name}!
-
-Has ganado el Sorteo de San Valentin de CTS Turismo!
-
-Tu premio:
-- Estadia de 2 noches todo incluido para pareja
-- Hotel seleccionado para una experiencia romantica inolvidable
+        email = build_winner_email(winner)
 
-Proximos pasos:
-Nos pondremos en contacto contigo en las proximas 24-48 horas al telefono
-{participant.phone} para coordinar los detalles de tu premio.
-
-Disfruta de tu premio y feliz San Valentin!
-
----
-CTS Turismo
-Equipo de Sorteos
-        """
-
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[participant.email],
-            fail_silently=False,
-        )
+        retry_after = _send_throttled(email, participant.email)
+        if retry_after is not None:
+            defer_to_outbox(
+                EmailOutbox.KIND_WINNER, participant.email, email, retry_after,
+                participant_id=participant.id, winner_id=winner.id
+            )
+            return False
 
         # Marcar como notificado
         winner.notified = True
@@ -0,0 +1,130 @@
+"""
+Eventos en vivo para el dashboard de admin (Server-Sent Events).
+
+Los eventos se publican en la caché de Django con un número de secuencia, así
+que llegan a los clientes conectados a cualquier proceso (web o Celery) cuando
+la caché es compartida (Redis). Cada conexión solo guarda la última secuencia
+leída y lee como máximo LIVE_EVENTS_BATCH eventos por vuelta.
+
+EventSource no permite headers, así que la conexión se autentica con un token
+firmado en la URL: sirve solo para este stream y vence a los
+LIVE_EVENTS_TOKEN_SECONDS, para que los logs y proxies que registren la URL
+no guarden una credencial reutilizable.
+"""
+import asyncio
+import json
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_CACHE_KEY = 'live-events:seq'
+EVENT_CACHE_KEY = 'live-events:event:{}'
+STREAM_TOKEN_SALT = 'participants.live-events'
+
+PARTICIPANT_REGISTERED = 'participant.registered'
+PARTICIPANT_VERIFIED = 'participant.verified'
+WINNERS_DRAWN = 'winners.drawn'
+WINNERS_NOTIFIED = 'winners.notified'
+# El cliente se atrasó más que el buffer: debe recargar por REST
+RESYNC = 'resync'
+
+
+def publish(event_type, **data):
+    """Agrega un evento al buffer compartido. Un fallo de la caché no interrumpe la operación"""
+    try:
+        cache.add(SEQUENCE_CACHE_KEY, 0, timeout=None)
+        sequence = cache.incr(SEQUENCE_CACHE_KEY)
+        cache.set(
+            EVENT_CACHE_KEY.format(sequence),
+            {'type': event_type, 'data': data},
+            timeout=settings.LIVE_EVENTS_TTL
+        )
+    except Exception:
+        logger.warning("No se pudo publicar el evento %s", event_type, exc_info=True)
+
+
+def publish_on_commit(event_type, **data):
+    """Publica el evento solo si la transacción actual se confirma"""
+    transaction.on_commit(lambda: publish(event_type, **data))
+
+
+def read_events(after):
+    """
+    Eventos con secuencia mayor a `after` (a lo más LIVE_EVENTS_BATCH).
+    Retorna (eventos, última secuencia leída); si el cliente quedó fuera del
+    buffer (o la caché se reinició) retorna un único evento RESYNC.
+    """
+    current = cache.get(SEQUENCE_CACHE_KEY, 0)
+    if current < after or current - after > settings.LIVE_EVENTS_BUFFER:
+        return [(current, {'type': RESYNC, 'data': {}})], current
+    last = min(current, after + settings.LIVE_EVENTS_BATCH)
+    keys = [EVENT_CACHE_KEY.format(sequence) for sequence in range(after + 1, last + 1)]
+    stored = cache.get_many(keys)
+    events = [
+        (sequence, stored[key])
+        for sequence, key in zip(range(after + 1, last + 1), keys)
+        if key in stored  # los expirados se omiten
+    ]
+    return events, last
+
+
+def stream_token(user):
+    """Token firmado y de corta duración para abrir el stream como `user`"""
+    return signing.dumps({'user': str(user.pk)}, salt=STREAM_TOKEN_SALT)
+
+
+def stream_token_user_id(token):
+    """Id del usuario del token de stream, o None si es inválido o venció"""
+    try:
+        payload = signing.loads(token, salt=STREAM_TOKEN_SALT, max_age=settings.LIVE_EVENTS_TOKEN_SECONDS)
+    except signing.BadSignature:  # incluye SignatureExpired
+        return None
+    return payload.get('user') if isinstance(payload, dict) else None
+
+
+def format_event(sequence, event):
+    """Serializa un evento en el formato de texto de SSE"""
+    data = json.dumps(event['data'], cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f"id: {sequence}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+def parse_last_event_id(value):
+    """Secuencia del header Last-Event-ID que envía EventSource al reconectar"""
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+async def event_stream(last_id=None):
+    """
+    Generador asíncrono de la respuesta SSE. Consulta la caché cada
+    LIVE_EVENTS_POLL_SECONDS, envía un comentario de keepalive cuando no hay
+    eventos y termina tras LIVE_EVENTS_MAX_SECONDS: EventSource reconecta solo
+    con Last-Event-ID, lo que reparte las conexiones entre workers.
+    """
+    yield f"retry: {settings.LIVE_EVENTS_RETRY_MS}\n\n"
+    if last_id is None:
+        last_id = await cache.aget(SEQUENCE_CACHE_KEY, 0)
+
+    deadline = time.monotonic() + settings.LIVE_EVENTS_MAX_SECONDS
+    last_write = time.monotonic()
+    while True:
+        events, last_id = await sync_to_async(read_events, thread_sensitive=False)(last_id)
+        if events:
+            yield ''.join(format_event(sequence, event) for sequence, event in events)
+            last_write = time.monotonic()
+        elif time.monotonic() - last_write >= settings.LIVE_EVENTS_KEEPALIVE_SECONDS:
+            yield ': keepalive\n\n'
+            last_write = time.monotonic()
+        if time.monotonic() >= deadline:
+            return
+        await asyncio.sleep(settings.LIVE_EVENTS_POLL_SECONDS)
@@ -0,0 +1,78 @@
+"""
+Management command to benchmark the Django admin changelists on large tables
+Usage: python manage.py benchmark_admin_changelist --rows 1000000
+"""
+from unittest.mock import patch
+
+from django.contrib import admin
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from participants.admin import ParticipantAdmin, WinnerAdmin
+from participants.benchmarking import measure, rolled_back, seed_participants
+from participants.draw import draw_winners
+from participants.models import Participant
+
+# Configuración por defecto de Django, para comparar
+DEFAULT_CHANGELIST = {
+    'paginator': Paginator,
+    'show_full_result_count': True,
+    'show_facets': admin.ShowFacets.ALLOW,
+    'list_only': (),
+    'list_select_related': False,
+}
+
+
+class Command(BaseCommand):
+    help = 'Compares the default and high-volume admin changelists for participants and winners'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--winners', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        client = Client()
+        with override_settings(ALLOWED_HOSTS=['*']), rolled_back():
+            admin_user = Participant.objects.create_superuser(
+                email='bench-admin-changelist@example.com',
+                full_name='Bench Admin',
+                phone='+56900000000',
+                password='bench'
+            )
+            client.force_login(admin_user)
+            self.stdout.write(f'Seeding {options["rows"]} participants...')
+            seed_participants(options['rows'], verified_ratio=0.5)
+            draw_winners(admin_user, count=options['winners'])
+
+            pages = {
+                'participants': (ParticipantAdmin, reverse('admin:participants_participant_changelist')),
+                'participants?is_verified': (
+                    ParticipantAdmin, reverse('admin:participants_participant_changelist') + '?is_verified__exact=1'
+                ),
+                'winners': (WinnerAdmin, reverse('admin:participants_winner_changelist')),
+            }
+
+            def get(url):
+                response = client.get(url)
+                assert response.status_code == 200, response.status_code
+
+            def queries(url):
+                with CaptureQueriesContext(connection) as context:
+                    get(url)
+                return len(context.captured_queries)
+
+            self.stdout.write(f'{"changelist":<26} {"default ms":>11} {"queries":>8} {"optimized ms":>13} {"queries":>8}')
+            for name, (model_admin, url) in pages.items():
+                with patch.multiple(model_admin, **DEFAULT_CHANGELIST):
+                    default = measure(lambda: get(url), options['repeat'], trace_memory=False)
+                    default_queries = queries(url)
+                optimized = measure(lambda: get(url), options['repeat'], trace_memory=False)
+                self.stdout.write(
+                    f'{name:<26} {default["median_ms"]:>11.1f} {default_queries:>8} '
+                    f'{optimized["median_ms"]:>13.1f} {queries(url):>8}'
+                )
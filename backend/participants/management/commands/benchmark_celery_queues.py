@@ -0,0 +1,148 @@
+"""
+Management command to benchmark the Celery queue topology on one machine
+Usage: python manage.py benchmark_celery_queues --messages 500 --draws 5
+       CELERY_BROKER_URL=filesystem:// python manage.py benchmark_celery_queues
+"""
+import threading
+import time
+from contextlib import ExitStack
+from unittest.mock import patch
+
+from celery.contrib.testing.worker import start_worker
+from celery.signals import task_postrun, task_prerun
+from django.core import mail
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from kombu import Connection
+
+from config.celery import app
+from participants.benchmarking import LatencyEmailBackend, percentile, seed_participants
+from participants.dispatch import broker_configured
+from participants.models import DrawJob, EmailDelivery, Participant
+from participants.tasks import send_verification_email, warm_draw_job
+
+SEED_START = 9000000
+DRAIN_TIMEOUT = 0.01
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs embedded Celery workers on a local broker and compares one shared queue against '
+        'separate email and draw queues: email throughput and how long draw tasks wait'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500)
+        parser.add_argument('--draws', type=int, default=5)
+        parser.add_argument('--latency', type=float, default=0.02, help='Simulated provider latency per email (s)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Threads of the email worker')
+        parser.add_argument('--prefetch', type=int, default=4, help='Prefetch multiplier of the email worker')
+        parser.add_argument('--timeout', type=float, default=300)
+
+    def handle(self, *args, **options):
+        # Sin broker configurado (CELERY_BROKER_URL) se usa el transporte en memoria
+        if not broker_configured():
+            app.conf.CELERY_BROKER_URL = 'memory://'
+            # El transporte en memoria consulta la cola cada segundo por defecto;
+            # Redis no hace polling, así que se acorta para no medir esa espera
+            app.conf.CELERY_BROKER_TRANSPORT_OPTIONS = {'polling_interval': 0.01}
+        self.sent, self.started, self.finished = {}, {}, {}
+        self.done = threading.Semaphore(0)
+        task_prerun.connect(self.on_prerun, weak=False)
+        task_postrun.connect(self.on_postrun, weak=False)
+
+        # Los workers leen en otras conexiones: los datos se confirman y se borran al final
+        seeded = Participant.objects.filter(email__startswith='bench', phone__gte=f'+569{SEED_START:08d}')
+        seeded.delete()
+        self.stdout.write(f'Seeding {options["messages"]} participants...')
+        seed_participants(options['messages'], verified_ratio=0, start=SEED_START)
+        participants = list(seeded.values('id', 'email', 'full_name', 'verification_token'))
+        job = DrawJob.objects.create(status=DrawJob.STATUS_SCHEDULED)
+
+        try:
+            with override_settings(EMAIL_BACKEND='participants.benchmarking.LatencyEmailBackend',
+                                   EMAIL_RATE_PER_SECOND=0), \
+                    patch.object(LatencyEmailBackend, 'latency_seconds', options['latency']):
+                self.stdout.write(
+                    f'{"topology":<10} {"emails/s":>10} {"draw wait p50 ms":>17} {"draw wait max ms":>17} {"sent":>6}'
+                )
+                for topology in ('shared', 'split'):
+                    self.run_topology(topology, participants, job, options)
+        finally:
+            task_prerun.disconnect(self.on_prerun)
+            task_postrun.disconnect(self.on_postrun)
+            job.delete()
+            seeded.delete()
+
+    def on_prerun(self, task_id, **kwargs):
+        self.started[task_id] = time.perf_counter()
+
+    def on_postrun(self, task_id, **kwargs):
+        self.finished[task_id] = time.perf_counter()
+        self.done.release()
+
+    def workers(self, topology, options):
+        """Un worker para todo (cola compartida) o uno por cola"""
+        email_worker = {
+            'pool': 'threads',
+            'concurrency': options['concurrency'],
+            'prefetch_multiplier': options['prefetch'],
+            'perform_ping_check': False,
+            'shutdown_timeout': options['timeout'],
+        }
+        if topology == 'shared':
+            return [dict(email_worker, queues=['default'])]
+        return [
+            dict(email_worker, queues=['email']),
+            {'pool': 'solo', 'prefetch_multiplier': 1, 'queues': ['draw'],
+             'perform_ping_check': False, 'shutdown_timeout': options['timeout']},
+        ]
+
+    def run_topology(self, topology, participants, job, options):
+        EmailDelivery.objects.filter(participant_id__in=[p['id'] for p in participants]).delete()
+        mail.outbox = []
+        self.sent.clear()
+        self.started.clear()
+        self.finished.clear()
+        # Sin 'queue' explícita se aplica CELERY_TASK_ROUTES
+        route = {'queue': 'default'} if topology == 'shared' else {}
+
+        with ExitStack() as stack:
+            # Con transportes sin event loop (memoria, filesystem) el worker confirma
+            # los mensajes entre esperas de 2s del broker; con acks_late eso limita
+            # el throughput a la ventana de prefetch cada 2s. Redis confirma al
+            # instante, así que la espera se acorta para medir como en producción
+            drain_events = Connection.drain_events
+            stack.enter_context(patch.object(
+                Connection, 'drain_events',
+                lambda connection, timeout=None, **kwargs: drain_events(connection, timeout=DRAIN_TIMEOUT, **kwargs)
+            ))
+            for worker in self.workers(topology, options):
+                stack.enter_context(start_worker(app, **worker))
+
+            start = time.perf_counter()
+            email_ids = []
+            for participant in participants:
+                data = {
+                    'email': participant['email'],
+                    'full_name': participant['full_name'],
+                    'verification_token': str(participant['verification_token']),
+                }
+                result = send_verification_email.apply_async(args=[str(participant['id']), data], **route)
+                email_ids.append(result.id)
+            draw_ids = []
+            for _ in range(options['draws']):
+                result = warm_draw_job.apply_async(args=[str(job.id)], **route)
+                self.sent[result.id] = time.perf_counter()
+                draw_ids.append(result.id)
+
+            for _ in range(len(email_ids) + len(draw_ids)):
+                if not self.done.acquire(timeout=options['timeout']):
+                    raise RuntimeError('Timed out waiting for the workers')
+
+        emails_elapsed = max(self.finished[task_id] for task_id in email_ids) - start
+        waits = [(self.started[task_id] - self.sent[task_id]) * 1000 for task_id in draw_ids]
+        self.stdout.write(
+            f'{topology:<10} {len(email_ids) / emails_elapsed:>10,.0f} {percentile(waits, 50):>17.1f} '
+            f'{max(waits):>17.1f} {len(mail.outbox):>6}'
+        )
@@ -0,0 +1,54 @@
+"""
+Management command to benchmark the winner selection
+Usage: python manage.py benchmark_draw --sizes 10000,100000,1000000 [--count 5]
+"""
+import random
+
+from django.core.management.base import BaseCommand
+
+from participants.benchmarking import measure, rolled_back, seed_participants
+from participants.draw import MODE_UNIFORM, MODE_WEIGHTED, _select, eligible_participants, invalidate_alias_table
+
+
+def select(mode, count, cold=False):
+    """Paso de selección de draw_winners (con `cold` se reconstruye la tabla alias)"""
+    if cold:
+        invalidate_alias_table()
+    return _select(mode, count, nonce='benchmark')
+
+
+class Command(BaseCommand):
+    help = 'Compares the legacy random.choice(list(...)) draw with the selection used by draw_winners'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help='Comma separated pool sizes')
+        parser.add_argument('--count', type=int, default=1, help='Winners per draw')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        count = options['count']
+        repeat = options['repeat']
+
+        self.stdout.write(f'{"rows":>10} {"impl":>14} {"median ms":>12} {"peak MB":>10}')
+        with rolled_back():
+            seeded = 0
+            for size in sizes:
+                seeded += seed_participants(size - seeded, start=seeded)
+                pool = eligible_participants()
+
+                results = {
+                    'legacy': measure(lambda: random.choice(list(pool)), repeat),
+                    'uniform': measure(lambda: select(MODE_UNIFORM, count), repeat),
+                    'weighted-cold': measure(lambda: select(MODE_WEIGHTED, count, cold=True), repeat),
+                    'weighted': measure(lambda: select(MODE_WEIGHTED, count), repeat),
+                }
+                for name, result in results.items():
+                    self.stdout.write(
+                        f'{size:>10} {name:>14} {result["median_ms"]:>12.1f} {result["peak_mb"]:>10.1f}'
+                    )
+        # La tabla alias cacheada se construyó con filas que ya no existen
+        invalidate_alias_table()
+
+        self.stdout.write(self.style.SUCCESS('Benchmark finished (synthetic rows rolled back).'))
@@ -0,0 +1,68 @@
+"""
+Management command to benchmark the Celery email tasks against a flaky email backend
+Usage: python manage.py benchmark_email_tasks --messages 2000 --failure-rate 0.2
+"""
+import time
+from collections import Counter
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from participants import tasks
+from participants.benchmarking import FlakyEmailBackend, rolled_back, seed_participants
+from participants.models import EmailDelivery, Participant
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the verification email task eagerly against a backend that fails at random and reports '
+        'throughput, retries, duplicate and lost messages'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000)
+        parser.add_argument('--failure-rate', type=float, default=0.2)
+        parser.add_argument('--redeliveries', type=float, default=0.1,
+                            help='Fraction of tasks delivered twice (as after a worker crash with acks_late)')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        total = options['messages']
+        backend = 'participants.benchmarking.FlakyEmailBackend'
+        FlakyEmailBackend.reset(options['failure_rate'], options['seed'])
+        mail.outbox = []
+        retries = Counter()
+        original_retry = tasks.send_verification_email.retry
+
+        def counting_retry(*args, **kwargs):
+            retries['count'] += 1
+            # En modo eager la cuenta regresiva se ignora; no se espera el backoff
+            kwargs['countdown'] = 0
+            return original_retry(*args, **kwargs)
+
+        with override_settings(EMAIL_BACKEND=backend, EMAIL_RATE_PER_SECOND=0), rolled_back(), \
+                patch.object(tasks.send_verification_email, 'retry', counting_retry):
+            self.stdout.write(f'Seeding {total} participants...')
+            seed_participants(total, verified_ratio=0)
+            ids = list(Participant.objects.filter(is_verified=False).values_list('id', flat=True)[:total])
+            redelivered = ids[:int(len(ids) * options['redeliveries'])]
+
+            start = time.perf_counter()
+            for participant_id in ids + redelivered:
+                tasks.send_verification_email.apply(args=[str(participant_id)])
+            elapsed = time.perf_counter() - start
+
+            sent_to = Counter(message.to[0] for message in mail.outbox)
+            statuses = Counter(EmailDelivery.objects.filter(participant_id__in=ids).values_list('status', flat=True))
+
+        invocations = len(ids) + len(redelivered)
+        self.stdout.write(f'{"participants":<22} {len(ids):>10}')
+        self.stdout.write(f'{"task invocations":<22} {invocations:>10}')
+        self.stdout.write(f'{"failure rate":<22} {options["failure_rate"]:>10.0%}')
+        self.stdout.write(f'{"retries":<22} {retries["count"]:>10}')
+        self.stdout.write(f'{"messages/s":<22} {len(sent_to) / elapsed:>10,.0f}')
+        self.stdout.write(f'{"duplicates":<22} {sum(n - 1 for n in sent_to.values()):>10}')
+        self.stdout.write(f'{"lost":<22} {len(ids) - len(sent_to):>10}')
+        self.stdout.write(f'{"deliveries failed":<22} {statuses[EmailDelivery.STATUS_FAILED]:>10}')
@@ -0,0 +1,61 @@
+"""
+Management command to benchmark deep pages of the admin participant list
+Usage: python manage.py benchmark_participant_list --rows 500000 --depths 1 100 5000
+"""
+from base64 import urlsafe_b64encode
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from participants.benchmarking import measure, rolled_back, seed_participants
+from participants.models import Participant
+from participants.views import ParticipantViewSet
+
+
+class Command(BaseCommand):
+    help = 'Compares page-number (COUNT + OFFSET) and keyset cursor pagination on deep pages of /api/admin/participants/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500000)
+        parser.add_argument('--depths', type=int, nargs='+', default=[1, 100, 1000, 5000],
+                            help='Page numbers to measure (50 rows per page)')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        view = ParticipantViewSet.as_view({'get': 'list'})
+        factory = APIRequestFactory()
+        page_size = 50
+
+        with override_settings(ALLOWED_HOSTS=['*']), rolled_back():
+            admin = Participant.objects.create_superuser(
+                email='bench-list-admin@example.com',
+                full_name='Bench Admin',
+                phone='+56900000000',
+                password='bench'
+            )
+            self.stdout.write(f'Seeding {options["rows"]} participants...')
+            seed_participants(options['rows'], verified_ratio=0.5)
+            ordered = Participant.objects.filter(is_admin=False).order_by('-created_at', '-id')
+
+            def get(params):
+                request = factory.get('/api/admin/participants/', params)
+                force_authenticate(request, user=admin)
+                response = view(request)
+                assert response.status_code == 200, response.data
+
+            self.stdout.write(f'{"page":>8} {"page-number ms":>16} {"cursor ms":>12}')
+            for depth in options['depths']:
+                offset = (depth - 1) * page_size
+                if offset >= options['rows']:
+                    continue
+                cursor_params = {'pagination': 'cursor'}
+                if offset:
+                    # Cursor de la última fila de la página anterior (lo que habría entregado `next`)
+                    last = ordered.values('created_at', 'id')[offset - 1]
+                    raw = f'{last["created_at"].isoformat()}|{last["id"]}|0'
+                    cursor_params['cursor'] = urlsafe_b64encode(raw.encode()).decode()
+
+                numbered = measure(lambda: get({'page': depth}), options['repeat'])
+                keyset = measure(lambda: get(cursor_params), options['repeat'])
+                self.stdout.write(f'{depth:>8} {numbered["median_ms"]:>16.1f} {keyset["median_ms"]:>12.1f}')
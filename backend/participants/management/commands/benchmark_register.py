@@ -0,0 +1,61 @@
+"""
+Management command to benchmark the registration endpoint latency
+Usage: python manage.py benchmark_register --requests 200 --latency-ms 150
+"""
+import time
+from unittest.mock import patch
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from participants.benchmarking import LatencyEmailBackend, percentile
+from participants.dispatch import wait_for_background
+from participants.emails import send_verification_email_sync
+from participants.models import Participant
+
+
+def legacy_send(participant):
+    """Reproduce el flujo anterior: re-consulta y envío dentro del request"""
+    send_verification_email_sync(participant.id)
+
+
+class Command(BaseCommand):
+    help = 'Measures p50/p99 latency of POST /api/participants/register/ with inline vs outbox + on_commit email dispatch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--latency-ms', type=int, default=150,
+                            help='Simulated email provider latency')
+
+    def handle(self, *args, **options):
+        LatencyEmailBackend.latency_seconds = options['latency_ms'] / 1000
+        backend = 'participants.benchmarking.LatencyEmailBackend'
+
+        with override_settings(EMAIL_BACKEND=backend, ALLOWED_HOSTS=['*'], CELERY_BROKER_URL=None):
+            with patch('participants.views.enqueue_verification_email', legacy_send), \
+                    patch('participants.views.flush_outbox_on_commit'):
+                inline = self.run_requests('inline', options['requests'])
+            background = self.run_requests('on_commit', options['requests'])
+            wait_for_background()
+
+        Participant.objects.filter(email__startswith='bench-register-').delete()
+
+        self.stdout.write(f'{"mode":>10} {"p50 ms":>10} {"p99 ms":>10}')
+        for name, timings in (('inline', inline), ('on_commit', background)):
+            self.stdout.write(f'{name:>10} {percentile(timings, 50):>10.1f} {percentile(timings, 99):>10.1f}')
+
+    def run_requests(self, label, total):
+        """Registers `total` participants and returns the latency of each request in ms"""
+        client = Client()
+        url = reverse('register')
+        timings = []
+        for i in range(total):
+            started = time.perf_counter()
+            client.post(url, {
+                'email': f'bench-register-{label}-{i}@example.com',
+                'full_name': f'Benchmark {i}',
+                'phone': '+56912345678',
+            }, content_type='application/json')
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
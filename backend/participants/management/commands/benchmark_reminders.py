@@ -0,0 +1,53 @@
+"""
+Management command to benchmark the verification reminder campaign on a large backlog
+Usage: python manage.py benchmark_reminders --rows 1000000 --chunk-size 1000
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from participants.benchmarking import measure, rolled_back, seed_participants
+from participants.outbox import enqueue_reminder_emails
+from participants.reminders import due_for_reminder, run_reminder_campaign
+
+
+def remind_all_at_once():
+    """Alternativa ingenua: carga todos los pendientes y los encola en una sola transacción"""
+    now = timezone.now()
+    with transaction.atomic():
+        participants = list(due_for_reminder(now))
+        enqueue_reminder_emails(participants)
+        due_for_reminder(now).update(last_reminded_at=now)
+    return len(participants)
+
+
+class Command(BaseCommand):
+    help = 'Compares the keyset reminder campaign against loading every unverified participant at once'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        results = {}
+        # Recién sembrados: sin edad mínima para que todos estén pendientes
+        with override_settings(REMINDER_MIN_AGE_HOURS=0):
+            for name, run in (
+                ('all at once', remind_all_at_once),
+                ('keyset chunks', lambda: run_reminder_campaign(chunk_size=options['chunk_size'])),
+            ):
+                with rolled_back():
+                    self.stdout.write(f'Seeding {rows} unverified participants...')
+                    seed_participants(rows, verified_ratio=0)
+                    results[name] = measure(run, repeat=1)
+
+        self.stdout.write(f'{"mode":<15} {"ms":>10} {"rows/s":>10} {"peak MB":>9}')
+        for name, result in results.items():
+            rate = rows / (result['median_ms'] / 1000)
+            self.stdout.write(f'{name:<15} {result["median_ms"]:>10.0f} {rate:>10,.0f} {result["peak_mb"]:>9.1f}')
+        self.stdout.write(
+            f'keyset chunks: one transaction per {options["chunk_size"]} rows; '
+            'all at once: one transaction for the whole backlog'
+        )
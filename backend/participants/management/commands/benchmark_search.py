@@ -0,0 +1,52 @@
+"""
+Management command to benchmark participant search
+Usage: python manage.py benchmark_search --rows 500000 --queries bench12345 "Benchmark 4999"
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+
+from participants.benchmarking import measure, rolled_back, seed_participants
+from participants.models import Participant
+from participants.search import SEARCH_FIELDS, search_participants
+
+
+def icontains_search(queryset, terms):
+    """Reproduce SearchFilter: un OR de ICONTAINS por campo y término"""
+    for term in terms:
+        condition = Q()
+        for field in SEARCH_FIELDS:
+            condition |= Q(**{f'{field}__icontains': term})
+        queryset = queryset.filter(condition)
+    return queryset.order_by('-created_at')
+
+
+class Command(BaseCommand):
+    help = 'Compares ICONTAINS search against the indexed search (pg_trgm / FTS5) on a synthetic table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500000)
+        parser.add_argument('--queries', nargs='+', default=['bench123456', '+56900012345', 'Benchmark 499999', 'nadie-coincide'])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.stdout.write(f'Seeding {options["rows"]} participants ({connection.vendor})...')
+            seed_participants(options['rows'])
+            base = Participant.objects.filter(is_admin=False)
+
+            self.stdout.write(f'{"query":>20} {"icontains ms":>14} {"indexed ms":>12} {"matches":>8}')
+            for query in options['queries']:
+                terms = query.split()
+                indexed = search_participants(base, terms)
+                if indexed is None:
+                    self.stdout.write(f'{query:>20}  (terms shorter than 3 chars use ICONTAINS)')
+                    continue
+                indexed = indexed.order_by('search_rank')
+
+                # Lo mismo que hace la primera página del listado: COUNT + 50 filas
+                legacy = measure(lambda: (icontains_search(base, terms).count(), list(icontains_search(base, terms)[:50])), options['repeat'])
+                fast = measure(lambda: (indexed.count(), list(indexed[:50])), options['repeat'])
+                self.stdout.write(
+                    f'{query:>20} {legacy["median_ms"]:>14.1f} {fast["median_ms"]:>12.1f} {indexed.count():>8}'
+                )
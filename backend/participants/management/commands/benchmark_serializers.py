@@ -0,0 +1,40 @@
+"""
+Management command to benchmark the admin participant list serialization
+Usage: python manage.py benchmark_serializers --rows 50000 --page-size 500
+"""
+from django.core.management.base import BaseCommand
+
+from participants.benchmarking import measure, rolled_back, seed_participants
+from participants.models import Participant
+from participants.serializers import ParticipantListRowSerializer, ParticipantListSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compares rows/sec of ParticipantListSerializer against the values() + Case/When fast path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000)
+        parser.add_argument('--page-sizes', type=int, nargs='+', default=[50, 500, 5000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self.stdout.write(f'Seeding {options["rows"]} participants...')
+            seed_participants(options['rows'], verified_ratio=0.5)
+            base = Participant.objects.filter(is_admin=False).order_by('-created_at', '-id')
+
+            self.stdout.write(f'{"rows":>8} {"model rows/s":>14} {"fast rows/s":>14} {"speedup":>8}')
+            for size in options['page_sizes']:
+                model = measure(
+                    lambda: ParticipantListSerializer(base[:size], many=True).data,
+                    options['repeat'], trace_memory=False
+                )
+                fast = measure(
+                    lambda: ParticipantListRowSerializer(ParticipantListRowSerializer.select(base)[:size]).data,
+                    options['repeat'], trace_memory=False
+                )
+                model_rate = size / (model['median_ms'] / 1000)
+                fast_rate = size / (fast['median_ms'] / 1000)
+                self.stdout.write(
+                    f'{size:>8} {model_rate:>14,.0f} {fast_rate:>14,.0f} {fast_rate / model_rate:>7.1f}x'
+                )
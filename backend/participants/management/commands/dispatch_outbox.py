@@ -0,0 +1,29 @@
+"""
+Management command to send pending emails from the outbox
+Usage: python manage.py dispatch_outbox [--batch-size 100] [--max-batches 10]
+"""
+from django.core.management.base import BaseCommand
+
+from participants.outbox import dispatch_outbox
+from participants.throttle import throttle_metrics
+
+
+class Command(BaseCommand):
+    help = 'Sends pending outbox emails in batches over a single backend connection per batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Emails per batch (default: EMAIL_OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+
+    def handle(self, *args, **options):
+        sent, failed = dispatch_outbox(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Sent {sent} email(s), {failed} failed.'))
+
+        metrics = throttle_metrics()
+        self.stdout.write(
+            f"Throttle: {metrics['granted']} granted, {metrics['deferred']} deferred, "
+            f"{metrics['wait_ms']} ms waited (avg {metrics['avg_wait_ms']} ms)"
+        )
@@ -0,0 +1,41 @@
+"""
+Management command to delete unverified registrations past the retention period
+Usage: python manage.py purge_unverified [--days 30] [--batch-size 500] [--sleep 0.1] [--dry-run]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from participants.retention import purge_unverified
+
+
+class Command(BaseCommand):
+    help = 'Deletes participants that did not verify their email within the retention period, in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Retention in days (default: UNVERIFIED_RETENTION_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--sleep', type=float, default=None, help='Pause between batches (s)')
+        parser.add_argument('--max-batches', type=int, default=None)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the participants that would be deleted')
+
+    def handle(self, *args, **options):
+        days = settings.UNVERIFIED_RETENTION_DAYS if options['days'] is None else options['days']
+        if days <= 0:
+            raise CommandError('Retention must be at least 1 day')
+
+        def progress(deleted, batches):
+            self.stdout.write(f'Batch {batches}: {deleted} deleted so far')
+
+        deleted, batches = purge_unverified(
+            days=days,
+            batch_size=options['batch_size'],
+            sleep=options['sleep'],
+            max_batches=options['max_batches'],
+            dry_run=options['dry_run'],
+            progress=progress,
+        )
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {deleted} unverified participant(s) older than {days} day(s) in {batches} batch(es)'
+        ))
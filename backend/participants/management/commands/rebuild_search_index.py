@@ -0,0 +1,17 @@
+"""
+Management command to rebuild the participant search index
+Usage: python manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from participants.search import install_search_index
+
+
+class Command(BaseCommand):
+    help = 'Re-creates the search index and re-indexes every participant (run after VACUUM on SQLite)'
+
+    def handle(self, *args, **options):
+        if not install_search_index(connection):
+            raise CommandError(f'No search index is available for the {connection.vendor} backend.')
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt ({connection.vendor}).'))
@@ -0,0 +1,32 @@
+"""
+Management command to recompute the dashboard participant counters
+Usage: python manage.py reconcile_counters
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from participants.models import ParticipantCounters
+
+
+class Command(BaseCommand):
+    help = 'Recomputes ParticipantCounters with one conditional-aggregate query and reports any drift'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stored = ParticipantCounters.objects.select_for_update().filter(pk=ParticipantCounters.SINGLETON_ID).first()
+            counters = ParticipantCounters.reconcile()
+
+        drift = 0
+        for field in ParticipantCounters.FIELDS:
+            before = getattr(stored, field) if stored else None
+            after = getattr(counters, field)
+            if before != after:
+                drift += 1
+                self.stdout.write(self.style.WARNING(f'{field}: {before} -> {after}'))
+            else:
+                self.stdout.write(f'{field}: {after}')
+
+        if drift:
+            self.stdout.write(self.style.SUCCESS(f'\nCounters reconciled ({drift} field(s) corrected).'))
+        else:
+            self.stdout.write(self.style.SUCCESS('\nCounters were already consistent.'))
@@ -0,0 +1,25 @@
+"""
+Management command to send verification reminders to unverified participants
+Usage: python manage.py send_reminders [--chunk-size 1000] [--max-chunks 10] [--dry-run]
+"""
+from django.core.management.base import BaseCommand
+
+from participants.reminders import run_reminder_campaign
+
+
+class Command(BaseCommand):
+    help = 'Queues a verification reminder in the email outbox for every unverified participant that is due one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument('--max-chunks', type=int, default=None)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the participants that are due')
+
+    def handle(self, *args, **options):
+        reminded, chunks = run_reminder_campaign(
+            chunk_size=options['chunk_size'],
+            max_chunks=options['max_chunks'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'Would remind' if options['dry_run'] else 'Queued reminders for'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {reminded} participant(s) in {chunks} chunk(s)'))
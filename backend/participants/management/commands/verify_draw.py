@@ -0,0 +1,73 @@
+"""
+Management command to audit past draws
+Usage: python manage.py verify_draw <winner_id> [<winner_id> ...]
+       python manage.py verify_draw --all
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+
+from participants.draw import (
+    MODE_WEIGHTED,
+    derive_seed,
+    eligible_participants,
+    pool_snapshot,
+    replay_draw
+)
+from participants.models import Winner
+
+
+class Command(BaseCommand):
+    help = 'Re-computes the pool digest and seed of past draws and replays the winner selection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('winner_ids', nargs='*', help='Winner IDs to verify')
+        parser.add_argument('--all', action='store_true', help='Verify every audited draw')
+
+    def handle(self, *args, **options):
+        winners = Winner.objects.exclude(seed='')
+        if not options['all']:
+            if not options['winner_ids']:
+                raise CommandError('Provide winner IDs or use --all.')
+            winners = winners.filter(id__in=options['winner_ids'])
+
+        seeds = winners.order_by().values_list('seed', flat=True).distinct()
+        if not seeds:
+            raise CommandError('No audited draws found.')
+
+        failures = 0
+        for seed in seeds:
+            if not self.verify_batch(seed):
+                failures += 1
+
+        if failures:
+            raise CommandError(f'{failures} draw(s) could not be verified.')
+        self.stdout.write(self.style.SUCCESS('\nAll draws verified successfully!'))
+
+    def verify_batch(self, seed):
+        """Verifies every winner drawn with the same seed (one draw request)"""
+        batch = list(Winner.objects.filter(seed=seed).order_by('draw_position'))
+        first = batch[0]
+        as_of = Winner.objects.filter(seed=seed).aggregate(Min('drawn_at'))['drawn_at__min']
+        label = f'Draw {as_of:%Y-%m-%d %H:%M:%S} ({len(batch)} winner(s), {first.draw_mode})'
+
+        pool = eligible_participants(as_of=as_of)
+        digest, size = pool_snapshot(pool, weighted=first.draw_mode == MODE_WEIGHTED)
+
+        if digest != first.pool_digest or size != first.pool_size:
+            self.stdout.write(self.style.ERROR(
+                f'{label}: pool mismatch (stored {first.pool_size} rows {first.pool_digest[:12]}, '
+                f'recomputed {size} rows {digest[:12]}). The pool changed after the draw.'
+            ))
+            return False
+
+        if derive_seed(digest, first.nonce) != seed:
+            self.stdout.write(self.style.ERROR(f'{label}: seed does not match digest and nonce.'))
+            return False
+
+        replayed = replay_draw(first.draw_mode, len(batch), pool, seed)
+        if replayed != [winner.participant_id for winner in batch]:
+            self.stdout.write(self.style.ERROR(f'{label}: replayed selection differs from stored winners.'))
+            return False
+
+        self.stdout.write(self.style.SUCCESS(f'{label}: OK (pool {size} rows, digest {digest[:12]})'))
+        return True
@@ -0,0 +1,193 @@
+"""
+Métricas por endpoint (consultas, tiempo de base de datos y tiempo total)
+guardadas como contadores en la caché de Django, compartidos entre procesos.
+
+Cada proceso acumula las solicitudes en memoria y las vuelca a la caché cada
+METRICS_FLUSH_SECONDS: un incremento por contador y no por solicitud, así que
+medir no agrega viajes a Redis en el camino de cada request.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+ENDPOINTS_CACHE_KEY = 'endpoint-metrics:names'
+ENDPOINT_CACHE_KEY = 'endpoint-metrics:{}:{}'
+ENDPOINT_FIELDS = ('requests', 'queries', 'db_us', 'wall_us', 'over_budget')
+
+# Contadores del proceso aún no volcados: (endpoint, campo) -> cantidad
+_pending = defaultdict(int)
+_pending_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def increment(key, amount=1):
+    """Suma `amount` a un contador de la caché (atómico en Redis y memcached)"""
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        cache.set(key, amount, timeout=None)
+
+
+class QueryStats:
+    """execute_wrapper que cuenta las consultas y el tiempo que pasan en la base de datos"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def query_budget(name):
+    """Máximo de consultas permitido para el endpoint `name`"""
+    return settings.QUERY_BUDGETS.get(name, settings.QUERY_BUDGET_DEFAULT)
+
+
+def record_request(name, queries, db_seconds, wall_seconds):
+    """
+    Acumula en memoria las métricas de una solicitud al endpoint `name`.
+    Retorna True si ya corresponde volcarlas a la caché (ver `flush_metrics`).
+    """
+    budget = query_budget(name)
+    over_budget = queries > budget
+    amounts = {
+        'requests': 1,
+        'queries': queries,
+        'db_us': int(db_seconds * 1_000_000),
+        'wall_us': int(wall_seconds * 1_000_000),
+        'over_budget': int(over_budget),
+    }
+    with _pending_lock:
+        for field, amount in amounts.items():
+            if amount:
+                _pending[(name, field)] += amount
+        due = time.monotonic() - _flushed_at >= settings.METRICS_FLUSH_SECONDS
+    if over_budget:
+        logger.warning("%s ejecutó %s consultas (presupuesto %s)", name, queries, budget)
+    return due
+
+
+def flush_metrics():
+    """Vuelca a la caché los contadores acumulados en este proceso"""
+    global _flushed_at
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _flushed_at = time.monotonic()
+    if not pending:
+        return
+    names = cache.get(ENDPOINTS_CACHE_KEY) or []
+    added = {name for name, _ in pending} - set(names)
+    if added:
+        cache.set(ENDPOINTS_CACHE_KEY, sorted(set(names) | added), timeout=None)
+    for (name, field), amount in pending.items():
+        increment(ENDPOINT_CACHE_KEY.format(name, field), amount)
+
+
+def reset_metrics():
+    """Descarta los contadores del proceso que aún no se volcaron"""
+    with _pending_lock:
+        _pending.clear()
+
+
+def endpoint_metrics():
+    """Promedios por endpoint a partir de los contadores acumulados"""
+    flush_metrics()
+    names = cache.get(ENDPOINTS_CACHE_KEY) or []
+    keys = [ENDPOINT_CACHE_KEY.format(name, field) for name in names for field in ENDPOINT_FIELDS]
+    values = cache.get_many(keys)
+    result = {}
+    for name in names:
+        raw = {field: values.get(ENDPOINT_CACHE_KEY.format(name, field), 0) for field in ENDPOINT_FIELDS}
+        requests = raw['requests'] or 1
+        result[name] = {
+            'requests': raw['requests'],
+            'avg_queries': round(raw['queries'] / requests, 2),
+            'avg_db_ms': round(raw['db_us'] / requests / 1000, 2),
+            'avg_wall_ms': round(raw['wall_us'] / requests / 1000, 2),
+            'query_budget': query_budget(name),
+            'over_budget': raw['over_budget'],
+        }
+    return result
+
+
+def install_wrapper(wrapper):
+    """Agrega `wrapper` a la conexión del hilo actual"""
+    connection.execute_wrappers.append(wrapper)
+
+
+def remove_wrapper(wrapper):
+    """Quita `wrapper` de la conexión del hilo actual"""
+    connection.execute_wrappers.remove(wrapper)
+
+
+class QueryMetricsMiddleware:
+    """
+    Mide cada solicitud: número de consultas, tiempo en la base de datos y
+    tiempo total. Agrega el header Server-Timing, acumula las métricas por
+    nombre de URL y registra un warning cuando se supera el presupuesto de
+    consultas (settings.QUERY_BUDGETS). Funciona en modo síncrono y asíncrono
+    para no forzar la cadena de middleware a modo síncrono bajo ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = QueryStats()
+        started = time.perf_counter()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        if self.finish(request, response, stats, time.perf_counter() - started):
+            flush_metrics()
+        return response
+
+    async def __acall__(self, request):
+        # Las consultas de la vista corren en el hilo thread-sensitive de
+        # sync_to_async, con su propia conexión: el wrapper se instala ahí.
+        stats = QueryStats()
+        started = time.perf_counter()
+        await sync_to_async(install_wrapper)(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(remove_wrapper)(stats)
+        if self.finish(request, response, stats, time.perf_counter() - started):
+            await sync_to_async(flush_metrics)()
+        return response
+
+    def finish(self, request, response, stats, wall):
+        """Agrega Server-Timing y acumula las métricas; retorna si toca volcarlas"""
+        response['Server-Timing'] = (
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", '
+            f'total;dur={wall * 1000:.1f}'
+        )
+        # Disponible para los tests (ver QueryBudgetMixin)
+        response.query_count = stats.count
+
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.view_name:
+            return record_request(match.view_name, stats.count, stats.duration, wall)
+        return False
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='entry_weight',
+            field=models.PositiveIntegerField(default=1, verbose_name='entradas'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:38
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0002_participant_entry_weight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DrawLock',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='campaña')),
+                ('acquired_at', models.DateTimeField(blank=True, null=True, verbose_name='tomado el')),
+            ],
+            options={
+                'verbose_name': 'bloqueo de sorteo',
+                'verbose_name_plural': 'bloqueos de sorteo',
+            },
+        ),
+        migrations.CreateModel(
+            name='DrawIdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name='clave')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='código de respuesta')),
+                ('response', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='respuesta')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='creado el')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='creado por')),
+            ],
+            options={
+                'verbose_name': 'clave de idempotencia',
+                'verbose_name_plural': 'claves de idempotencia',
+            },
+        ),
+    ]
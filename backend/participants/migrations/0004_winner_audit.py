@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0003_draw_lock_and_idempotency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='winner',
+            name='draw_mode',
+            field=models.CharField(default='uniform', max_length=20, verbose_name='modo de sorteo'),
+        ),
+        migrations.AddField(
+            model_name='winner',
+            name='draw_position',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='posición en el sorteo'),
+        ),
+        migrations.AddField(
+            model_name='winner',
+            name='nonce',
+            field=models.CharField(blank=True, max_length=64, verbose_name='nonce publicado'),
+        ),
+        migrations.AddField(
+            model_name='winner',
+            name='pool_digest',
+            field=models.CharField(blank=True, max_length=64, verbose_name='SHA-256 del pool'),
+        ),
+        migrations.AddField(
+            model_name='winner',
+            name='pool_size',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='tamaño del pool'),
+        ),
+        migrations.AddField(
+            model_name='winner',
+            name='seed',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='semilla'),
+        ),
+    ]
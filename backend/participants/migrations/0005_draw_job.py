@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:47
+
+import django.core.serializers.json
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0004_winner_audit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DrawJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('scheduled', 'Programado'), ('running', 'En ejecución'), ('done', 'Completado'), ('failed', 'Fallido')], default='pending', max_length=20, verbose_name='estado')),
+                ('mode', models.CharField(default='uniform', max_length=20, verbose_name='modo de sorteo')),
+                ('count', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='cantidad de ganadores')),
+                ('prize_descriptions', models.JSONField(blank=True, default=list, verbose_name='premios')),
+                ('nonce', models.CharField(blank=True, max_length=64, verbose_name='nonce publicado')),
+                ('scheduled_for', models.DateTimeField(blank=True, null=True, verbose_name='programado para')),
+                ('eligible_count', models.PositiveIntegerField(blank=True, null=True, verbose_name='participantes elegibles')),
+                ('result', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='resultado')),
+                ('error', models.TextField(blank=True, verbose_name='error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='creado el')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='iniciado el')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='terminado el')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='draw_jobs', to=settings.AUTH_USER_MODEL, verbose_name='creado por')),
+            ],
+            options={
+                'verbose_name': 'sorteo en segundo plano',
+                'verbose_name_plural': 'sorteos en segundo plano',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:52
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0005_draw_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('verification', 'Verificación'), ('winner', 'Ganador')], max_length=20, verbose_name='tipo')),
+                ('to_email', models.EmailField(max_length=255, verbose_name='destinatario')),
+                ('subject', models.CharField(max_length=255, verbose_name='asunto')),
+                ('body', models.TextField(verbose_name='mensaje')),
+                ('html_body', models.TextField(blank=True, verbose_name='mensaje HTML')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('sending', 'Enviando'), ('sent', 'Enviado'), ('failed', 'Fallido')], default='pending', max_length=20, verbose_name='estado')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='intentos')),
+                ('last_error', models.TextField(blank=True, verbose_name='último error')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='disponible desde')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='creado el')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='enviado el')),
+                ('participant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='emails', to=settings.AUTH_USER_MODEL, verbose_name='participante')),
+                ('winner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='emails', to='participants.winner', verbose_name='ganador')),
+            ],
+            options={
+                'verbose_name': 'email en bandeja de salida',
+                'verbose_name_plural': 'bandeja de salida de emails',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='participant_status_44a0ca_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('participants', '0006_email_outbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['created_at', 'id'], name='participant_created_id_idx'),
+        ),
+    ]
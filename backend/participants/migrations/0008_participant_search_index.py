@@ -0,0 +1,72 @@
+from django.db import migrations
+
+# SQL fijo de esta migración (no se importa participants.search, que cambia con el código)
+TABLE = 'participants_participant'
+FTS_TABLE = 'participants_participant_fts'
+SEARCH_FIELDS = ('email', 'full_name', 'phone')
+
+SQLITE_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        email, full_name, phone,
+        content='{TABLE}', content_rowid='rowid', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, email, full_name, phone)
+        VALUES (new.rowid, new.email, new.full_name, new.phone);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, email, full_name, phone)
+        VALUES ('delete', old.rowid, old.email, old.full_name, old.phone);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF email, full_name, phone ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, email, full_name, phone)
+        VALUES ('delete', old.rowid, old.email, old.full_name, old.phone);
+        INSERT INTO {FTS_TABLE}(rowid, email, full_name, phone)
+        VALUES (new.rowid, new.email, new.full_name, new.phone);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+POSTGRES_STATEMENTS = ['CREATE EXTENSION IF NOT EXISTS pg_trgm'] + [
+    f'CREATE INDEX IF NOT EXISTS participant_{field}_trgm_idx ON {TABLE} '
+    f'USING gin (UPPER({field}::text) gin_trgm_ops)'
+    for field in SEARCH_FIELDS
+]
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        statements = POSTGRES_STATEMENTS
+    elif connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 34, 0):
+        statements = SQLITE_STATEMENTS
+    else:
+        return
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        statements = [f'DROP INDEX IF EXISTS participant_{field}_trgm_idx' for field in SEARCH_FIELDS]
+    elif connection.vendor == 'sqlite':
+        statements = [f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}' for suffix in ('ai', 'ad', 'au')]
+        statements.append(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    else:
+        return
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0007_participant_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
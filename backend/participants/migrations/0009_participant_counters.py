@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:14
+
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+
+def compute_counters(apps, schema_editor):
+    Participant = apps.get_model('participants', 'Participant')
+    Winner = apps.get_model('participants', 'Winner')
+    ParticipantCounters = apps.get_model('participants', 'ParticipantCounters')
+
+    has_won = Exists(Winner.objects.filter(participant=OuterRef('pk')))
+    values = Participant.objects.filter(is_admin=False).aggregate(
+        total=Count('pk'),
+        verified=Count('pk', filter=Q(is_verified=True)),
+        password_set=Count('pk', filter=~Q(password='') & ~Q(password__startswith='!')),
+        active=Count('pk', filter=Q(is_active=True)),
+        won=Count('pk', filter=Q(has_won)),
+        eligible=Count('pk', filter=Q(is_verified=True, is_active=True) & ~Q(has_won)),
+    )
+    ParticipantCounters.objects.update_or_create(pk=1, defaults={**values, 'reconciled_at': timezone.now()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0008_participant_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParticipantCounters',
+            fields=[
+                ('id', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False)),
+                ('total', models.IntegerField(default=0, verbose_name='total')),
+                ('verified', models.IntegerField(default=0, verbose_name='verificados')),
+                ('password_set', models.IntegerField(default=0, verbose_name='con contraseña')),
+                ('active', models.IntegerField(default=0, verbose_name='activos')),
+                ('won', models.IntegerField(default=0, verbose_name='ganadores')),
+                ('eligible', models.IntegerField(default=0, verbose_name='elegibles')),
+                ('reconciled_at', models.DateTimeField(blank=True, null=True, verbose_name='reconciliado el')),
+            ],
+            options={
+                'verbose_name': 'contadores de participantes',
+                'verbose_name_plural': 'contadores de participantes',
+            },
+        ),
+        migrations.RunPython(compute_counters, migrations.RunPython.noop),
+    ]
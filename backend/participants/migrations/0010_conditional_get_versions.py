@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('participants', '0009_participant_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='winner',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='actualizado el'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['updated_at'], name='participant_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:02
+
+import django.core.serializers.json
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0010_conditional_get_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('action', models.CharField(choices=[('resend_verification', 'Reenviar email de verificación'), ('deactivate', 'Desactivar participantes'), ('notify_winners', 'Enviar notificación a ganadores'), ('mark_notified', 'Marcar ganadores como notificados')], max_length=30, verbose_name='acción')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('running', 'En ejecución'), ('done', 'Completado'), ('failed', 'Fallido')], default='pending', max_length=20, verbose_name='estado')),
+                ('target_ids', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='IDs seleccionados')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='total')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='procesados')),
+                ('affected', models.PositiveIntegerField(default=0, verbose_name='modificados')),
+                ('error', models.TextField(blank=True, verbose_name='error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='creado el')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='iniciado el')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='terminado el')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bulk_jobs', to=settings.AUTH_USER_MODEL, verbose_name='creado por')),
+            ],
+            options={
+                'verbose_name': 'acción masiva',
+                'verbose_name_plural': 'acciones masivas',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
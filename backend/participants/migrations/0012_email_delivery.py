@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0011_bulk_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('verification', 'Verificación'), ('winner', 'Ganador')], max_length=20, verbose_name='tipo')),
+                ('reference', models.CharField(max_length=64, verbose_name='referencia')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('sending', 'Enviando'), ('sent', 'Enviado'), ('failed', 'Fallido')], default='pending', max_length=20, verbose_name='estado')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='intentos')),
+                ('last_error', models.TextField(blank=True, verbose_name='último error')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='tomado el')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='enviado el')),
+                ('participant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to=settings.AUTH_USER_MODEL, verbose_name='participante')),
+            ],
+            options={
+                'verbose_name': 'entrega de email',
+                'verbose_name_plural': 'entregas de email',
+                'constraints': [models.UniqueConstraint(fields=('participant', 'kind', 'reference'), name='unique_email_delivery')],
+            },
+        ),
+    ]
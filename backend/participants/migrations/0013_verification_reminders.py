@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('participants', '0012_email_delivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participant',
+            name='last_reminded_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='último recordatorio'),
+        ),
+        migrations.AlterField(
+            model_name='emaildelivery',
+            name='kind',
+            field=models.CharField(choices=[('verification', 'Verificación'), ('winner', 'Ganador'), ('reminder', 'Recordatorio')], max_length=20, verbose_name='tipo'),
+        ),
+        migrations.AlterField(
+            model_name='emailoutbox',
+            name='kind',
+            field=models.CharField(choices=[('verification', 'Verificación'), ('winner', 'Ganador'), ('reminder', 'Recordatorio')], max_length=20, verbose_name='tipo'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(condition=models.Q(('is_verified', False)), fields=['created_at', 'id'], name='participant_reminder_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0013_verification_reminders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DrawPool',
+            fields=[
+                ('seed', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='semilla')),
+                ('draw_mode', models.CharField(max_length=20, verbose_name='modo de sorteo')),
+                ('size', models.PositiveIntegerField(verbose_name='tamaño del pool')),
+                ('pks', models.BinaryField(verbose_name='participantes')),
+                ('weights', models.BinaryField(blank=True, default=b'', verbose_name='pesos')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='creado el')),
+            ],
+            options={
+                'verbose_name': 'pool de sorteo',
+                'verbose_name_plural': 'pools de sorteo',
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:38
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0014_draw_pool'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='DrawPool',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 12:45
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('participants', '0015_delete_draw_pool'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='participantcounters',
+            name='pool_version',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, verbose_name='versión del pool'),
+        ),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils import timezone
 import uuid
@@ -61,6 +63,10 @@ class Participant(AbstractBaseUser, PermissionsMixin):
     is_verified = models.BooleanField('verificado', default=False)
     verification_token = models.UUIDField(default=uuid.uuid4, editable=False)
     verified_at = models.DateTimeField('verificado el', null=True, blank=True)
+    last_reminded_at = models.DateTimeField('último recordatorio', null=True, blank=True)
+
+    # Entradas en el sorteo ponderado (bonos por verificación temprana, referidos, etc.)
+    entry_weight = models.PositiveIntegerField('entradas', default=1)
 
     # Permisos y roles
     is_active = models.BooleanField('activo', default=True)
@@ -85,16 +91,68 @@ class Participant(AbstractBaseUser, PermissionsMixin):
             models.Index(fields=['email']),
             models.Index(fields=['is_verified']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['created_at', 'id'], name='participant_created_id_idx'),
+            # Versión del listado para el ETag (ver conditional.py)
+            models.Index(fields=['updated_at'], name='participant_updated_idx'),
+            # Recorrido por keyset de la campaña de recordatorios (ver reminders.py)
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(is_verified=False),
+                name='participant_reminder_idx'
+            ),
         ]
 
     def __str__(self):
         return f"{self.full_name} ({self.email})"
 
+    # Campos que determinan en qué contadores de ParticipantCounters cuenta
+    COUNTER_FIELDS = ('is_admin', 'is_verified', 'is_active', 'password')
+    # Campos que determinan si entra al sorteo ponderado y con qué peso
+    DRAW_FIELDS = ('is_admin', 'is_verified', 'is_active', 'entry_weight')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        deferred = instance.get_deferred_fields()
+        if not deferred.intersection(cls.COUNTER_FIELDS):
+            instance._counter_state = instance.counter_state()
+        if not deferred.intersection(cls.DRAW_FIELDS):
+            instance._draw_state = instance.draw_state()
+        return instance
+
+    def counter_state(self):
+        """Estado que cuentan los contadores (None para administradores)"""
+        if self.is_admin:
+            return None
+        return (self.is_verified, bool(self.password) and self.has_usable_password(), self.is_active)
+
+    def draw_state(self):
+        """Peso con que entra a la tabla alias (None si no entra; los premios se ven aparte)"""
+        if self.is_verified and self.is_active and not self.is_admin and self.entry_weight > 0:
+            return self.entry_weight
+        return None
+
+    def save(self, *args, **kwargs):
+        """Guarda y ajusta ParticipantCounters en la misma transacción"""
+        with transaction.atomic(using=kwargs.get('using')):
+            if self._state.adding:
+                old_state = None
+            elif hasattr(self, '_counter_state'):
+                old_state = self._counter_state
+            else:
+                stored = type(self).objects.filter(pk=self.pk).first()
+                old_state = stored.counter_state() if stored else None
+            super().save(*args, **kwargs)
+            new_state = self.counter_state()
+            if new_state != old_state:
+                ParticipantCounters.apply_change(old_state, new_state, has_won=self.wins.exists() if old_state else False)
+            self._counter_state = new_state
+
     def verify_email(self):
         """Marca el email como verificado"""
         self.is_verified = True
         self.verified_at = timezone.now()
-        self.save(update_fields=['is_verified', 'verified_at'])
+        self.save(update_fields=['is_verified', 'verified_at', 'updated_at'])
 
     @property
     def can_participate(self):
@@ -135,6 +193,16 @@ class Winner(models.Model):
         default='Estadía de 2 noches todo pagado para pareja en hotel'
     )
 
+    # Auditoría: fotografía del pool y semilla con la que se sorteó
+    draw_mode = models.CharField('modo de sorteo', max_length=20, default='uniform')
+    draw_position = models.PositiveSmallIntegerField('posición en el sorteo', default=0)
+    pool_digest = models.CharField('SHA-256 del pool', max_length=64, blank=True)
+    pool_size = models.PositiveIntegerField('tamaño del pool', null=True, blank=True)
+    nonce = models.CharField('nonce publicado', max_length=64, blank=True)
+    seed = models.CharField('semilla', max_length=64, blank=True, db_index=True)
+
+    updated_at = models.DateTimeField('actualizado el', auto_now=True, db_index=True)
+
     class Meta:
         verbose_name = 'ganador'
         verbose_name_plural = 'ganadores'
@@ -147,4 +215,385 @@ class Winner(models.Model):
         """Marca al ganador como notificado"""
         self.notified = True
         self.notified_at = timezone.now()
-        self.save(update_fields=['notified', 'notified_at'])
+        self.save(update_fields=['notified', 'notified_at', 'updated_at'])
+
+
+class DrawLock(models.Model):
+    """
+    Fila de bloqueo por campaña: serializa los sorteos concurrentes
+    """
+
+    name = models.CharField('campaña', max_length=50, primary_key=True)
+    acquired_at = models.DateTimeField('tomado el', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'bloqueo de sorteo'
+        verbose_name_plural = 'bloqueos de sorteo'
+
+    def __str__(self):
+        return self.name
+
+
+class DrawIdempotencyKey(models.Model):
+    """
+    Resultado almacenado de un sorteo para responder reintentos con el mismo
+    header Idempotency-Key sin volver a sortear
+    """
+
+    key = models.CharField('clave', max_length=255, unique=True)
+    created_by = models.ForeignKey(
+        Participant,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+',
+        verbose_name='creado por'
+    )
+    status_code = models.PositiveSmallIntegerField('código de respuesta')
+    response = models.JSONField('respuesta', encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField('creado el', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'clave de idempotencia'
+        verbose_name_plural = 'claves de idempotencia'
+
+    def __str__(self):
+        return self.key
+
+
+class DrawJob(models.Model):
+    """
+    Sorteo ejecutado en segundo plano por Celery, inmediato o programado
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_SCHEDULED = 'scheduled'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_SCHEDULED, 'Programado'),
+        (STATUS_RUNNING, 'En ejecución'),
+        (STATUS_DONE, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField('estado', max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+
+    # Parámetros del sorteo
+    mode = models.CharField('modo de sorteo', max_length=20, default='uniform')
+    count = models.PositiveSmallIntegerField('cantidad de ganadores', null=True, blank=True)
+    prize_descriptions = models.JSONField('premios', default=list, blank=True)
+    nonce = models.CharField('nonce publicado', max_length=64, blank=True)
+    scheduled_for = models.DateTimeField('programado para', null=True, blank=True)
+    created_by = models.ForeignKey(
+        Participant,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='draw_jobs',
+        verbose_name='creado por'
+    )
+
+    # Progreso y resultado
+    eligible_count = models.PositiveIntegerField('participantes elegibles', null=True, blank=True)
+    result = models.JSONField('resultado', encoder=DjangoJSONEncoder, null=True, blank=True)
+    error = models.TextField('error', blank=True)
+
+    created_at = models.DateTimeField('creado el', auto_now_add=True)
+    started_at = models.DateTimeField('iniciado el', null=True, blank=True)
+    finished_at = models.DateTimeField('terminado el', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'sorteo en segundo plano'
+        verbose_name_plural = 'sorteos en segundo plano'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Sorteo {self.id} ({self.get_status_display()})"
+
+
+class BulkJob(models.Model):
+    """
+    Acción masiva del admin (API o Django admin) ejecutada en segundo plano
+    por bloques, con progreso consultable
+    """
+
+    ACTION_RESEND_VERIFICATION = 'resend_verification'
+    ACTION_DEACTIVATE = 'deactivate'
+    ACTION_NOTIFY_WINNERS = 'notify_winners'
+    ACTION_MARK_NOTIFIED = 'mark_notified'
+    ACTION_CHOICES = [
+        (ACTION_RESEND_VERIFICATION, 'Reenviar email de verificación'),
+        (ACTION_DEACTIVATE, 'Desactivar participantes'),
+        (ACTION_NOTIFY_WINNERS, 'Enviar notificación a ganadores'),
+        (ACTION_MARK_NOTIFIED, 'Marcar ganadores como notificados'),
+    ]
+    PARTICIPANT_ACTIONS = (ACTION_RESEND_VERIFICATION, ACTION_DEACTIVATE)
+    WINNER_ACTIONS = (ACTION_NOTIFY_WINNERS, ACTION_MARK_NOTIFIED)
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En ejecución'),
+        (STATUS_DONE, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    action = models.CharField('acción', max_length=30, choices=ACTION_CHOICES)
+    status = models.CharField('estado', max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    target_ids = models.JSONField('IDs seleccionados', encoder=DjangoJSONEncoder, default=list)
+    created_by = models.ForeignKey(
+        Participant,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='bulk_jobs',
+        verbose_name='creado por'
+    )
+
+    # Progreso: filas revisadas y filas efectivamente modificadas
+    total = models.PositiveIntegerField('total', default=0)
+    processed = models.PositiveIntegerField('procesados', default=0)
+    affected = models.PositiveIntegerField('modificados', default=0)
+    error = models.TextField('error', blank=True)
+
+    created_at = models.DateTimeField('creado el', auto_now_add=True)
+    started_at = models.DateTimeField('iniciado el', null=True, blank=True)
+    finished_at = models.DateTimeField('terminado el', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'acción masiva'
+        verbose_name_plural = 'acciones masivas'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_action_display()} ({self.processed}/{self.total}, {self.get_status_display()})"
+
+    @property
+    def progress(self):
+        """Porcentaje procesado (0-100)"""
+        return round(100 * self.processed / self.total, 1) if self.total else 100.0
+
+
+class EmailOutbox(models.Model):
+    """
+    Bandeja de salida transaccional: los emails se guardan junto con el cambio
+    que los origina y un despachador los envía por lotes
+    """
+
+    KIND_VERIFICATION = 'verification'
+    KIND_WINNER = 'winner'
+    KIND_REMINDER = 'reminder'
+    KIND_CHOICES = [
+        (KIND_VERIFICATION, 'Verificación'),
+        (KIND_WINNER, 'Ganador'),
+        (KIND_REMINDER, 'Recordatorio'),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_SENDING, 'Enviando'),
+        (STATUS_SENT, 'Enviado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    kind = models.CharField('tipo', max_length=20, choices=KIND_CHOICES)
+    participant = models.ForeignKey(
+        Participant,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='emails',
+        verbose_name='participante'
+    )
+    winner = models.ForeignKey(
+        Winner,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='emails',
+        verbose_name='ganador'
+    )
+
+    # Mensaje ya renderizado
+    to_email = models.EmailField('destinatario', max_length=255)
+    subject = models.CharField('asunto', max_length=255)
+    body = models.TextField('mensaje')
+    html_body = models.TextField('mensaje HTML', blank=True)
+
+    # Estado de envío
+    status = models.CharField('estado', max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField('intentos', default=0)
+    last_error = models.TextField('último error', blank=True)
+    available_at = models.DateTimeField('disponible desde', default=timezone.now)
+    created_at = models.DateTimeField('creado el', auto_now_add=True)
+    sent_at = models.DateTimeField('enviado el', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'email en bandeja de salida'
+        verbose_name_plural = 'bandeja de salida de emails'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} → {self.to_email} ({self.get_status_display()})"
+
+
+class EmailDelivery(models.Model):
+    """
+    Registro de idempotencia de las tareas de email de Celery: un envío por
+    (participante, tipo, referencia). La referencia es el token de
+    verificación o el ID del ganador, así que un reintento o una entrega
+    duplicada de la tarea nunca envía dos veces el mismo email.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_SENDING, 'Enviando'),
+        (STATUS_SENT, 'Enviado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    participant = models.ForeignKey(
+        Participant,
+        on_delete=models.CASCADE,
+        related_name='deliveries',
+        verbose_name='participante'
+    )
+    kind = models.CharField('tipo', max_length=20, choices=EmailOutbox.KIND_CHOICES)
+    reference = models.CharField('referencia', max_length=64)
+
+    status = models.CharField('estado', max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField('intentos', default=0)
+    last_error = models.TextField('último error', blank=True)
+    claimed_at = models.DateTimeField('tomado el', null=True, blank=True)
+    sent_at = models.DateTimeField('enviado el', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'entrega de email'
+        verbose_name_plural = 'entregas de email'
+        constraints = [
+            models.UniqueConstraint(fields=['participant', 'kind', 'reference'], name='unique_email_delivery'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} → {self.participant_id} ({self.get_status_display()})"
+
+
+class ParticipantCounters(models.Model):
+    """
+    Fila única con los contadores del dashboard (solo participantes, sin
+    administradores). Se mantiene en la misma transacción que cada alta,
+    verificación, cambio de contraseña o borrado; reconcile() la recalcula.
+    También guarda la versión del pool ponderado, compartida por todos los
+    procesos a través de la base de datos.
+    """
+
+    SINGLETON_ID = 1
+    FIELDS = ('total', 'verified', 'password_set', 'active', 'won', 'eligible')
+
+    id = models.PositiveSmallIntegerField(primary_key=True, default=SINGLETON_ID)
+    total = models.IntegerField('total', default=0)
+    verified = models.IntegerField('verificados', default=0)
+    password_set = models.IntegerField('con contraseña', default=0)
+    active = models.IntegerField('activos', default=0)
+    won = models.IntegerField('ganadores', default=0)
+    eligible = models.IntegerField('elegibles', default=0)
+    reconciled_at = models.DateTimeField('reconciliado el', null=True, blank=True)
+    # Cambia junto con el pool del sorteo ponderado (ver draw.get_alias_table)
+    pool_version = models.UUIDField('versión del pool', default=uuid.uuid4, editable=False)
+
+    class Meta:
+        verbose_name = 'contadores de participantes'
+        verbose_name_plural = 'contadores de participantes'
+
+    def __str__(self):
+        return f"{self.total} participantes, {self.verified} verificados"
+
+    @staticmethod
+    def _contribution(state, has_won):
+        """Cuánto aporta un participante con `state` a cada contador"""
+        if state is None:
+            return {}
+        verified, password_set, active = state
+        return {
+            'total': 1,
+            'verified': int(verified),
+            'password_set': int(password_set),
+            'active': int(active),
+            'eligible': int(verified and active and not has_won),
+        }
+
+    @classmethod
+    def apply_change(cls, old_state, new_state, has_won=False):
+        """Aplica la diferencia entre dos estados de un participante"""
+        old = cls._contribution(old_state, has_won)
+        new = cls._contribution(new_state, has_won)
+        cls.increment(**{field: new.get(field, 0) - old.get(field, 0) for field in cls.FIELDS})
+
+    @classmethod
+    def increment(cls, **deltas):
+        """UPDATE atómico col = col + delta; si la fila no existe se recalcula"""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        updated = cls.objects.filter(pk=cls.SINGLETON_ID).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+        if not updated:
+            cls.reconcile()
+
+    @classmethod
+    def record_win(cls, participant, added):
+        """Ajusta los contadores cuando un participante gana por primera vez o deja de ser ganador"""
+        if participant.is_admin:
+            return
+        remaining = Winner.objects.filter(participant=participant).count()
+        if remaining != (1 if added else 0):
+            return
+        sign = 1 if added else -1
+        eligible = participant.is_verified and participant.is_active
+        cls.increment(won=sign, eligible=-sign if eligible else 0)
+
+    @classmethod
+    def current(cls):
+        """Retorna la fila de contadores (la calcula si aún no existe)"""
+        counters = cls.objects.filter(pk=cls.SINGLETON_ID).first()
+        return counters or cls.reconcile()
+
+    @classmethod
+    def compute(cls):
+        """Recalcula los contadores con una sola consulta de agregados condicionales"""
+        has_won = Exists(Winner.objects.filter(participant=OuterRef('pk')))
+        return Participant.objects.filter(is_admin=False).aggregate(
+            total=Count('pk'),
+            verified=Count('pk', filter=Q(is_verified=True)),
+            password_set=Count('pk', filter=~Q(password='') & ~Q(password__startswith='!')),
+            active=Count('pk', filter=Q(is_active=True)),
+            won=Count('pk', filter=Q(has_won)),
+            eligible=Count('pk', filter=Q(is_verified=True, is_active=True) & ~Q(has_won)),
+        )
+
+    @classmethod
+    def reconcile(cls):
+        """Sobrescribe la fila con los valores recalculados y la retorna"""
+        values = cls.compute()
+        counters, _ = cls.objects.update_or_create(
+            pk=cls.SINGLETON_ID,
+            defaults={**values, 'reconciled_at': timezone.now()}
+        )
+        return counters
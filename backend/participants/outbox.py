@@ -0,0 +1,243 @@
+"""
+Bandeja de salida de emails: encolado transaccional y despachador por lotes
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .dispatch import broker_configured, run_in_background
+from .emails import build_reminder_email, build_verification_email, build_winner_email
+from .live import WINNERS_NOTIFIED, publish_on_commit
+from .models import EmailOutbox, Winner
+from .throttle import EmailThrottled, acquire, is_rate_limited_error, record_deferral
+
+logger = logging.getLogger(__name__)
+
+FLUSH_QUEUED_CACHE_KEY = 'outbox:flush-queued'
+
+
+def enqueue_verification_email(participant):
+    """Guarda el email de verificación en la bandeja de salida"""
+    email = build_verification_email(participant)
+    return EmailOutbox.objects.create(
+        kind=EmailOutbox.KIND_VERIFICATION,
+        participant=participant,
+        to_email=participant.email,
+        subject=email.subject,
+        body=email.text,
+        html_body=email.html,
+    )
+
+
+def enqueue_verification_emails(participants):
+    """Guarda los emails de verificación de varios participantes (un solo INSERT)"""
+    rows = []
+    for participant in participants:
+        email = build_verification_email(participant)
+        rows.append(EmailOutbox(
+            kind=EmailOutbox.KIND_VERIFICATION,
+            participant=participant,
+            to_email=participant.email,
+            subject=email.subject,
+            body=email.text,
+            html_body=email.html,
+        ))
+    return EmailOutbox.objects.bulk_create(rows)
+
+
+def enqueue_reminder_emails(participants):
+    """Guarda los recordatorios de verificación de varios participantes (un solo INSERT)"""
+    rows = []
+    for participant in participants:
+        email = build_reminder_email(participant)
+        rows.append(EmailOutbox(
+            kind=EmailOutbox.KIND_REMINDER,
+            participant=participant,
+            to_email=participant.email,
+            subject=email.subject,
+            body=email.text,
+            html_body=email.html,
+        ))
+    return EmailOutbox.objects.bulk_create(rows)
+
+
+def enqueue_winner_emails(winners):
+    """Guarda los emails de los ganadores en la bandeja de salida (un solo INSERT)"""
+    rows = []
+    for winner in winners:
+        email = build_winner_email(winner)
+        rows.append(EmailOutbox(
+            kind=EmailOutbox.KIND_WINNER,
+            participant=winner.participant,
+            winner=winner,
+            to_email=winner.participant.email,
+            subject=email.subject,
+            body=email.text,
+            html_body=email.html,
+        ))
+    return EmailOutbox.objects.bulk_create(rows)
+
+
+def flush_outbox_on_commit():
+    """
+    Despacha la bandeja de salida después del commit de la transacción actual.
+
+    Solo se encola un despacho a la vez: el despachador libera la marca antes
+    de leer las filas, así que nada de lo que se confirme después queda sin
+    despachar.
+    """
+    transaction.on_commit(_queue_flush)
+
+
+def _queue_flush():
+    """Encola el despachador en Celery o en el pool de hilos del proceso"""
+    from .tasks import dispatch_email_outbox
+
+    if not cache.add(FLUSH_QUEUED_CACHE_KEY, True, timeout=60):
+        return
+    if broker_configured():
+        dispatch_email_outbox.delay()
+    else:
+        # Si el pool está lleno los emails esperan en la bandeja al próximo
+        # despacho; se libera la marca para que el siguiente commit lo encole
+        run_in_background(dispatch_outbox, on_drop=lambda: cache.delete(FLUSH_QUEUED_CACHE_KEY))
+
+
+def claim_batch(batch_size):
+    """
+    Reserva hasta `batch_size` emails pendientes con SELECT ... FOR UPDATE
+    SKIP LOCKED, de modo que varios despachadores en paralelo nunca toman la
+    misma fila. Las filas reservadas quedan en estado 'sending' (y
+    `available_at` marca el momento de la reserva).
+    """
+    with transaction.atomic():
+        rows = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status=EmailOutbox.STATUS_PENDING, available_at__lte=timezone.now())
+            .order_by('id')[:batch_size]
+        )
+        if rows:
+            EmailOutbox.objects.filter(id__in=[row.id for row in rows]).update(
+                status=EmailOutbox.STATUS_SENDING,
+                attempts=F('attempts') + 1,
+                available_at=timezone.now()
+            )
+    return rows
+
+
+def send_batch(rows):
+    """
+    Envía un lote por una única conexión al backend de email y registra el
+    resultado de cada fila. Si se agota el presupuesto de envío (o el
+    proveedor responde 429) el resto del lote se reprograma sin contar el
+    intento. Retorna (enviados, fallidos, diferidos).
+    """
+    sent_ids = set()
+    failures = {}
+    deferred = []
+    retry_after = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        failures = {row.id: str(e) for row in rows}
+        rows_to_send = []
+    else:
+        rows_to_send = rows
+    try:
+        for index, row in enumerate(rows_to_send):
+            try:
+                acquire()
+            except EmailThrottled as e:
+                deferred, retry_after = rows_to_send[index:], e.retry_after
+                break
+            message = EmailMultiAlternatives(
+                subject=row.subject,
+                body=row.body,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[row.to_email],
+                connection=connection,
+            )
+            if row.html_body:
+                message.attach_alternative(row.html_body, 'text/html')
+            try:
+                connection.send_messages([message])
+                sent_ids.add(row.id)
+            except Exception as e:
+                if is_rate_limited_error(e):
+                    deferred, retry_after = rows_to_send[index:], settings.EMAIL_THROTTLE_RETRY_SECONDS
+                    record_deferral(len(deferred))
+                    break
+                failures[row.id] = str(e)
+    finally:
+        connection.close()
+
+    now = timezone.now()
+    if sent_ids:
+        EmailOutbox.objects.filter(id__in=sent_ids).update(
+            status=EmailOutbox.STATUS_SENT, sent_at=now, last_error=''
+        )
+        winner_ids = [row.winner_id for row in rows if row.id in sent_ids and row.winner_id]
+        if winner_ids:
+            Winner.objects.filter(id__in=winner_ids).update(notified=True, notified_at=now, updated_at=now)
+            publish_on_commit(WINNERS_NOTIFIED, ids=winner_ids)
+
+    if deferred:
+        logger.info("%s email(s) diferidos %.1fs por límite de envío", len(deferred), retry_after)
+        EmailOutbox.objects.filter(id__in=[row.id for row in deferred]).update(
+            status=EmailOutbox.STATUS_PENDING,
+            attempts=F('attempts') - 1,
+            available_at=now + timedelta(seconds=retry_after)
+        )
+
+    attempts = {row.id: row.attempts + 1 for row in rows}
+    for row_id, error in failures.items():
+        logger.warning("Error enviando email %s: %s", row_id, error)
+        if attempts[row_id] >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            EmailOutbox.objects.filter(id=row_id).update(status=EmailOutbox.STATUS_FAILED, last_error=error)
+        else:
+            # Reintento con espera exponencial: 1, 2, 4, 8... minutos
+            retry_at = now + timedelta(minutes=2 ** (attempts[row_id] - 1))
+            EmailOutbox.objects.filter(id=row_id).update(
+                status=EmailOutbox.STATUS_PENDING, available_at=retry_at, last_error=error
+            )
+    return len(sent_ids), len(failures), len(deferred)
+
+
+def dispatch_outbox(batch_size=None, max_batches=None):
+    """
+    Envía los emails pendientes por lotes hasta vaciar la bandeja, hasta
+    `max_batches` o hasta agotar el presupuesto de envío. Retorna
+    (enviados, fallidos).
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    cache.delete(FLUSH_QUEUED_CACHE_KEY)
+    release_stale_claims()
+
+    total_sent = total_failed = batches = 0
+    while max_batches is None or batches < max_batches:
+        rows = claim_batch(batch_size)
+        if not rows:
+            break
+        sent, failed, deferred = send_batch(rows)
+        total_sent += sent
+        total_failed += failed
+        batches += 1
+        if deferred:
+            # Sin presupuesto de envío: el resto espera a su nuevo available_at
+            break
+    return total_sent, total_failed
+
+
+def release_stale_claims(older_than=timedelta(minutes=15)):
+    """Devuelve a 'pending' las filas que quedaron en 'sending' (despachador caído)"""
+    return EmailOutbox.objects.filter(
+        status=EmailOutbox.STATUS_SENDING,
+        available_at__lte=timezone.now() - older_than
+    ).update(status=EmailOutbox.STATUS_PENDING)
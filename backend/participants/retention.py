@@ -0,0 +1,86 @@
+"""
+Expiración de registros no verificados: quien no confirmó su correo en
+UNVERIFIED_RETENTION_DAYS se borra por bloques de PURGE_BATCH_SIZE.
+
+Cada bloque es una consulta con LIMIT ordenada por clave primaria y una
+transacción corta, con una pausa de PURGE_SLEEP_SECONDS entre bloques para no
+competir con los registros ni acumular bloqueos y réplica pendiente.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Participant, ParticipantCounters, Winner
+from .signals import batch_delete
+
+
+def stale_unverified(days=None, now=None):
+    """
+    No verificados registrados hace más de `days` días. Nunca incluye
+    administradores ni a quien figure como ganador (historial de sorteos)
+    """
+    days = settings.UNVERIFIED_RETENTION_DAYS if days is None else days
+    now = now or timezone.now()
+    return Participant.objects.filter(
+        is_verified=False,
+        is_admin=False,
+        created_at__lt=now - timedelta(days=days),
+    ).exclude(Exists(Winner.objects.filter(participant=OuterRef('pk'))))
+
+
+def _delete_locked(batch):
+    """
+    Bloquea las filas de `batch` que nadie más tiene bloqueadas, las borra y
+    las descuenta de ParticipantCounters. Son no verificados sin premios, así
+    que no cuentan como verificados ni elegibles y no están en la tabla alias.
+    """
+    rows = list(batch.select_for_update(skip_locked=True).values_list('id', 'is_active', 'password'))
+    if not rows:
+        return 0
+    with batch_delete():
+        Participant.objects.filter(id__in=[row[0] for row in rows]).delete()
+    active = sum(1 for _, is_active, _ in rows if is_active)
+    password_set = sum(1 for _, _, password in rows if password and not password.startswith(UNUSABLE_PASSWORD_PREFIX))
+    ParticipantCounters.increment(total=-len(rows), active=-active, password_set=-password_set)
+    return len(rows)
+
+
+def purge_unverified(days=None, batch_size=None, sleep=None, max_batches=None, dry_run=False, progress=None):
+    """
+    Borra los no verificados vencidos, bloque a bloque por id. Las filas se
+    bloquean con SELECT ... FOR UPDATE SKIP LOCKED y se vuelven a filtrar
+    dentro de la transacción: quien verifica mientras corre la purga no se
+    borra. Los contadores se descuentan con un solo UPDATE por bloque (ver
+    `_delete_locked`). Con `dry_run` solo cuenta. `progress` recibe
+    (borrados, bloques) tras cada bloque. Retorna (borrados, bloques).
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    sleep = settings.PURGE_SLEEP_SECONDS if sleep is None else sleep
+    stale = stale_unverified(days).order_by('id')
+
+    if dry_run:
+        total = stale.count()
+        return total, -(-total // batch_size)
+
+    total = batches = 0
+    cursor = None
+    while max_batches is None or batches < max_batches:
+        page = stale if cursor is None else stale.filter(id__gt=cursor)
+        ids = list(page.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        if batches:
+            time.sleep(sleep)
+        with transaction.atomic():
+            deleted = _delete_locked(stale.filter(id__in=ids))
+        cursor = ids[-1]
+        total += deleted
+        batches += 1
+        if progress:
+            progress(total, batches)
+    return total, batches
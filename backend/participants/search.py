@@ -0,0 +1,178 @@
+"""
+Búsqueda indexada de participantes: índices pg_trgm en Postgres y una tabla
+FTS5 (tokenizer trigram) en SQLite. Sin índice disponible se usa la búsqueda
+ICONTAINS de SearchFilter.
+
+La tabla FTS5 apunta al rowid implícito de la tabla de participantes (la pk
+es un UUID), que VACUUM o una migración que reconstruye la tabla pueden
+renumerar: el índice se reconstruye después de cada migración y se verifica
+una vez por proceso antes de usarlo.
+"""
+import logging
+
+from django.db import DatabaseError, connection
+from django.db.models import BooleanField, F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+from rest_framework import filters
+
+from .models import Participant
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = ('email', 'full_name', 'phone')
+# El tokenizer trigram de FTS5 y pg_trgm necesitan al menos 3 caracteres
+MIN_TERM_LENGTH = 3
+
+PARTICIPANT_TABLE = Participant._meta.db_table
+FTS_TABLE = f'{PARTICIPANT_TABLE}_fts'
+
+SQLITE_FTS_STATEMENTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        email, full_name, phone,
+        content='{PARTICIPANT_TABLE}', content_rowid='rowid', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {PARTICIPANT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, email, full_name, phone)
+        VALUES (new.rowid, new.email, new.full_name, new.phone);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {PARTICIPANT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, email, full_name, phone)
+        VALUES ('delete', old.rowid, old.email, old.full_name, old.phone);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF email, full_name, phone ON {PARTICIPANT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, email, full_name, phone)
+        VALUES ('delete', old.rowid, old.email, old.full_name, old.phone);
+        INSERT INTO {FTS_TABLE}(rowid, email, full_name, phone)
+        VALUES (new.rowid, new.email, new.full_name, new.phone);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+SQLITE_FTS_REBUILD = SQLITE_FTS_STATEMENTS[-1]
+SQLITE_FTS_CHECK = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('integrity-check', 1)"
+
+POSTGRES_TRGM_STATEMENTS = ['CREATE EXTENSION IF NOT EXISTS pg_trgm'] + [
+    # Misma expresión que genera ICONTAINS en Postgres, para que el LIKE use el índice
+    f'CREATE INDEX IF NOT EXISTS participant_{field}_trgm_idx ON {PARTICIPANT_TABLE} '
+    f'USING gin (UPPER({field}::text) gin_trgm_ops)'
+    for field in SEARCH_FIELDS
+]
+
+_fts_ready = {}
+
+
+def install_search_index(conn):
+    """Crea (o repara) el índice de búsqueda del motor de base de datos"""
+    if conn.vendor == 'postgresql':
+        statements = POSTGRES_TRGM_STATEMENTS
+    elif conn.vendor == 'sqlite' and sqlite_supports_trigram(conn):
+        statements = SQLITE_FTS_STATEMENTS
+    else:
+        return False
+    with conn.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+    _fts_ready.pop(conn.alias, None)
+    return True
+
+
+def sqlite_supports_trigram(conn):
+    """El tokenizer trigram de FTS5 existe desde SQLite 3.34"""
+    return conn.Database.sqlite_version_info >= (3, 34, 0)
+
+
+def sqlite_index_installed(conn):
+    """Indica si la tabla FTS5 y sus triggers existen (un rebuild de tabla borra los triggers)"""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+            [FTS_TABLE, f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+        )
+        return cursor.fetchone()[0] == 4
+
+
+def sqlite_index_consistent(conn):
+    """Compara el índice con la tabla ('integrity-check' de FTS5, O(n))"""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(SQLITE_FTS_CHECK)
+    except DatabaseError:
+        return False
+    return True
+
+
+def rebuild_sqlite_index(conn):
+    """Vuelve a indexar todas las filas con los rowid actuales"""
+    with conn.cursor() as cursor:
+        cursor.execute(SQLITE_FTS_REBUILD)
+
+
+def _fts_available():
+    """Índice instalado; la primera vez en el proceso se reconstruye si quedó desfasado"""
+    if connection.alias not in _fts_ready:
+        ready = sqlite_index_installed(connection)
+        if ready and not sqlite_index_consistent(connection):
+            logger.warning("Índice de búsqueda desfasado de la tabla de participantes: se reconstruye")
+            rebuild_sqlite_index(connection)
+        _fts_ready[connection.alias] = ready
+    return _fts_ready[connection.alias]
+
+
+def _fts_phrase(term):
+    """Cita el término como frase FTS5 (las comillas internas se duplican)"""
+    return '"{}"'.format(term.replace('"', '""'))
+
+
+def search_participants(queryset, terms):
+    """
+    Filtra `queryset` por los términos (todos deben aparecer en algún campo) y
+    anota `search_rank`, menor es más relevante. Retorna None si no hay índice
+    que sirva para estos términos.
+    """
+    if not terms or any(len(term) < MIN_TERM_LENGTH for term in terms):
+        return None
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        # ICONTAINS compila a UPPER(campo::text) LIKE ..., que usa los índices GIN
+        for term in terms:
+            condition = Q()
+            for field in SEARCH_FIELDS:
+                condition |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(condition)
+        similarity = Greatest(*[
+            TrigramSimilarity(field, Value(' '.join(terms))) for field in SEARCH_FIELDS
+        ])
+        return queryset.annotate(search_rank=-similarity)
+
+    if connection.vendor == 'sqlite' and _fts_available():
+        match = ' '.join(_fts_phrase(term) for term in terms)
+        rowid = f'{PARTICIPANT_TABLE}.rowid'
+        matches = RawSQL(
+            f'{rowid} IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+            [match], output_field=BooleanField()
+        )
+        rank = RawSQL(
+            f'(SELECT bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = {rowid})',
+            [match], output_field=FloatField()
+        )
+        return queryset.filter(matches).annotate(search_rank=rank)
+
+    return None
+
+
+class ParticipantSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter que usa el índice de búsqueda y ordena por relevancia (salvo
+    que se pida ?ordering=). Sin índice aplicable cae en ICONTAINS.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        results = search_participants(queryset, terms)
+        if results is None:
+            return super().filter_queryset(request, queryset, view)
+        if request.query_params.get('ordering'):
+            return results
+        return results.order_by('search_rank', F('created_at').desc(), '-id')
@@ -1,6 +1,10 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
-from .models import Participant, Winner
+from django.db.models import Case, CharField, Value, When
+from django.utils import timezone
+from .models import BulkJob, DrawJob, Participant, Winner
+from .draw import MODE_UNIFORM, MODE_WEIGHTED
 
 
 class ParticipantRegistrationSerializer(serializers.ModelSerializer):
@@ -9,6 +13,8 @@ class ParticipantRegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Participant
         fields = ['email', 'full_name', 'phone']
+        # validate_email ya revisa duplicados; sin esto UniqueValidator repite la consulta
+        extra_kwargs = {'email': {'validators': []}}
 
     def validate_email(self, value):
         """Valida que el email no esté duplicado"""
@@ -63,6 +69,10 @@ class ParticipantSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'is_verified', 'verified_at', 'created_at']
 
 
+STATUS_VERIFIED = 'Verificado'
+STATUS_PENDING = 'Pendiente de verificación'
+
+
 class ParticipantListSerializer(serializers.ModelSerializer):
     """Serializer para listado de participantes (admin)"""
 
@@ -76,8 +86,49 @@ class ParticipantListSerializer(serializers.ModelSerializer):
     def get_status(self, obj):
         """Retorna el estado del participante"""
         if not obj.is_verified:
-            return 'Pendiente de verificación'
-        return 'Verificado'
+            return STATUS_PENDING
+        return STATUS_VERIFIED
+
+
+class ParticipantListRowSerializer:
+    """
+    Ruta rápida del listado: serializa filas de values() sin instanciar
+    Participant ni recorrer los campos de DRF. La salida es idéntica a la de
+    ParticipantListSerializer.
+    """
+
+    fields = ParticipantListSerializer.Meta.fields
+    _datetime = serializers.DateTimeField()
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def select(cls, queryset):
+        """Limita la consulta a las columnas del listado y calcula `status` en SQL"""
+        return queryset.annotate(
+            status=Case(
+                When(is_verified=True, then=Value(STATUS_VERIFIED)),
+                default=Value(STATUS_PENDING),
+                output_field=CharField()
+            )
+        ).values(*cls.fields)
+
+    @property
+    def data(self):
+        to_datetime = self._datetime.to_representation
+        return [
+            {
+                'id': str(row['id']),
+                'email': row['email'],
+                'full_name': row['full_name'],
+                'phone': row['phone'],
+                'is_verified': row['is_verified'],
+                'created_at': to_datetime(row['created_at']),
+                'status': row['status'],
+            }
+            for row in self.rows
+        ]
 
 
 class WinnerSerializer(serializers.ModelSerializer):
@@ -93,9 +144,84 @@ class WinnerSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'participant', 'participant_name', 'participant_email', 'participant_phone',
             'drawn_at', 'drawn_by', 'drawn_by_name',
-            'notified', 'notified_at', 'prize_description'
+            'notified', 'notified_at', 'prize_description',
+            'draw_mode', 'pool_digest', 'pool_size', 'nonce', 'seed'
+        ]
+        read_only_fields = [
+            'id', 'drawn_at', 'notified', 'notified_at',
+            'draw_mode', 'pool_digest', 'pool_size', 'nonce', 'seed'
+        ]
+
+
+class DrawSerializer(serializers.Serializer):
+    """Serializer para sortear uno o varios ganadores en una sola solicitud"""
+
+    count = serializers.IntegerField(min_value=1, max_value=100, required=False)
+    mode = serializers.ChoiceField(choices=[MODE_UNIFORM, MODE_WEIGHTED], default=MODE_UNIFORM)
+    nonce = serializers.CharField(max_length=64, required=False)
+    prize_descriptions = serializers.ListField(
+        child=serializers.CharField(), required=False, allow_empty=True
+    )
+
+    def validate(self, attrs):
+        """Valida que no haya más premios que ganadores a sortear"""
+        prizes = attrs.get('prize_descriptions', [])
+        if len(prizes) > attrs.get('count', 1):
+            raise serializers.ValidationError({
+                'prize_descriptions': 'Hay más premios que ganadores a sortear.'
+            })
+        return attrs
+
+
+class DrawJobCreateSerializer(DrawSerializer):
+    """Serializer para crear un sorteo en segundo plano (inmediato o programado)"""
+
+    scheduled_for = serializers.DateTimeField(required=False)
+
+    def validate_scheduled_for(self, value):
+        """Valida que la fecha programada sea futura"""
+        if value <= timezone.now():
+            raise serializers.ValidationError('La fecha programada debe ser futura.')
+        return value
+
+
+class DrawJobSerializer(serializers.ModelSerializer):
+    """Serializer para consultar el estado de un sorteo en segundo plano"""
+
+    class Meta:
+        model = DrawJob
+        fields = [
+            'id', 'status', 'mode', 'count', 'prize_descriptions', 'nonce',
+            'scheduled_for', 'eligible_count', 'result', 'error',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+
+class BulkJobCreateSerializer(serializers.Serializer):
+    """Serializer para crear una acción masiva; `actions` limita las acciones del recurso"""
+
+    action = serializers.ChoiceField(choices=[])
+
+    def __init__(self, *args, actions=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        labels = dict(BulkJob.ACTION_CHOICES)
+        self.fields['action'].choices = [(action, labels[action]) for action in actions]
+        self.fields['ids'] = serializers.ListField(
+            child=serializers.UUIDField(), min_length=1, max_length=settings.BULK_JOB_MAX_IDS
+        )
+
+
+class BulkJobSerializer(serializers.ModelSerializer):
+    """Serializer para consultar el progreso de una acción masiva"""
+
+    class Meta:
+        model = BulkJob
+        fields = [
+            'id', 'action', 'status', 'total', 'processed', 'affected', 'progress',
+            'error', 'created_at', 'started_at', 'finished_at'
         ]
-        read_only_fields = ['id', 'drawn_at', 'notified', 'notified_at']
+        read_only_fields = fields
 
 
 class LoginSerializer(serializers.Serializer):
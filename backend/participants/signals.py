@@ -0,0 +1,105 @@
+"""
+Señales del modelo: mantienen sincronizadas las estructuras derivadas del pool
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .draw import invalidate_alias_table
+from .models import Participant, ParticipantCounters, Winner
+from .search import install_search_index, sqlite_supports_trigram
+
+# Activo durante un borrado por bloques que ajusta contadores y tabla alias por su cuenta
+_batch_delete = ContextVar('participants_batch_delete', default=False)
+
+
+@contextmanager
+def batch_delete():
+    """
+    Omite el ajuste por fila al borrar participantes: cada post_delete haría
+    un UPDATE de la fila única de contadores (y tomaría su lock). Quien borra
+    ajusta los contadores una vez por bloque.
+    """
+    token = _batch_delete.set(True)
+    try:
+        yield
+    finally:
+        _batch_delete.reset(token)
+
+
+@receiver(post_save, sender=Participant)
+def participant_saved(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Invalida la tabla alias si cambió la participación o el peso en el sorteo
+    ponderado. Se compara con el estado leído de la base (ver Participant.from_db);
+    editar el nombre o el teléfono no la invalida.
+    """
+    new_state = instance.draw_state()
+    if created:
+        changed = new_state is not None
+    elif hasattr(instance, '_draw_state'):
+        changed = instance._draw_state != new_state
+    else:
+        changed = update_fields is None or not set(Participant.DRAW_FIELDS).isdisjoint(update_fields)
+    instance._draw_state = new_state
+    if changed:
+        # En la misma transacción: la versión nueva se publica junto con el cambio
+        invalidate_alias_table()
+
+
+@receiver(post_delete, sender=Participant)
+def participant_left_pool(sender, instance, **kwargs):
+    """Invalida la tabla alias si el participante borrado estaba en el pool"""
+    if not _batch_delete.get() and instance.draw_state() is not None:
+        invalidate_alias_table()
+
+
+@receiver(post_save, sender=Winner)
+@receiver(post_delete, sender=Winner)
+def pool_changed(sender, created=True, **kwargs):
+    """
+    Un premio nuevo saca al participante del pool y uno borrado puede
+    devolverlo; editar un ganador (p. ej. marcarlo notificado) no lo cambia
+    """
+    if created:
+        invalidate_alias_table()
+
+
+@receiver(post_migrate, sender=apps.get_app_config('participants'))
+def repair_search_index(sender, using, **kwargs):
+    """
+    En SQLite, las migraciones que reconstruyen la tabla de participantes
+    borran los triggers de la tabla FTS5 y renumeran los rowid: se reinstalan
+    los triggers y se reindexa
+    """
+    conn = connections[using]
+    if conn.vendor == 'sqlite' and sqlite_supports_trigram(conn):
+        install_search_index(conn)
+
+
+@receiver(post_delete, sender=Participant)
+def participant_deleted(sender, instance, **kwargs):
+    """Descuenta al participante borrado de los contadores"""
+    if _batch_delete.get():
+        return
+    has_won = Winner.objects.filter(participant_id=instance.pk).exists()
+    ParticipantCounters.apply_change(instance.counter_state(), None, has_won=has_won)
+
+
+@receiver(post_save, sender=Winner)
+def winner_saved(sender, instance, created, **kwargs):
+    """Cuenta al participante como ganador (los sorteos usan bulk_create y lo hacen aparte)"""
+    if created:
+        ParticipantCounters.record_win(instance.participant, added=True)
+
+
+@receiver(post_delete, sender=Winner)
+def winner_deleted(sender, instance, **kwargs):
+    """Devuelve al participante al pool si era su único premio"""
+    participant = Participant.objects.filter(pk=instance.participant_id).first()
+    if participant is not None:
+        ParticipantCounters.record_win(participant, added=False)
@@ -1,109 +1,255 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+from anymail.exceptions import AnymailInvalidAddress, AnymailRecipientsRefused
 from celery import shared_task
 from django.core.mail import send_mail
 from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
-from .models import Participant, Winner
-
-
-@shared_task
-def send_verification_email(participant_id):
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import DrawJob, EmailDelivery, EmailOutbox, Participant, Winner
+from .bulk import process_bulk_job
+from .emails import build_verification_email, build_winner_email
+from .outbox import dispatch_outbox, enqueue_winner_emails, flush_outbox_on_commit
+from .reminders import run_reminder_campaign
+from .retention import purge_unverified
+from .draw import MODE_WEIGHTED, DrawError, draw_lock, draw_winners, eligible_participants, get_alias_table
+from .serializers import WinnerSerializer
+from .throttle import EmailThrottled, acquire, is_rate_limited_error, record_deferral
+
+
+# Errores del proveedor que no se arreglan reintentando (destinatario inválido o rechazado)
+PERMANENT_EMAIL_ERRORS = (AnymailInvalidAddress, AnymailRecipientsRefused)
+
+# Reintento con espera exponencial (y jitter) ante cualquier otro error; el
+# mensaje se confirma al broker solo al terminar, así que si el worker muere
+# la tarea se vuelve a entregar y EmailDelivery evita el doble envío
+EMAIL_TASK_OPTIONS = {
+    'bind': True,
+    'autoretry_for': (Exception,),
+    'dont_autoretry_for': PERMANENT_EMAIL_ERRORS,
+    'retry_backoff': settings.EMAIL_TASK_RETRY_BACKOFF,
+    'retry_backoff_max': settings.EMAIL_TASK_RETRY_BACKOFF_MAX,
+    'retry_jitter': True,
+    'max_retries': settings.EMAIL_TASK_MAX_RETRIES,
+    'acks_late': True,
+    'reject_on_worker_lost': True,
+    'ignore_result': True,
+}
+
+
+def _claim_delivery(participant_id, kind, reference):
     """
-    Tarea asíncrona para enviar email de verificación
+    Toma el registro de idempotencia del envío. Retorna (id, None) si se tomó,
+    (None, None) si ya se envió y (None, segundos) si otro worker lo tiene
+    reservado: los segundos que faltan para que su reserva expire.
     """
-    try:
-        participant = Participant.objects.get(id=participant_id)
-    except Participant.DoesNotExist:
-        return f"Participant {participant_id} not found"
-
-    # Construir URL de verificación
-    verification_url = f"{settings.FRONTEND_URL}/verify/{participant.verification_token}"
-
-    # Asunto del correo
-    subject = 'Verifica tu correo - Sorteo San Valentín CTS Turismo'
-
-    # Mensaje en texto plano
-    message = f"""
-    ¡Hola {participant.full_name}!
-
-    Gracias por registrarte en el Sorteo de San Valentín de CTS Turismo.
-
-    Para completar tu inscripción y participar por una estadía de 2 noches todo pagado
-    para una pareja, necesitas verificar tu correo electrónico.
-
-    Haz clic en el siguiente enlace para verificar tu cuenta:
-    {verification_url}
-
-    Una vez verificado, podrás crear tu contraseña y confirmar tu participación.
-
-    ¡Mucha suerte!
-
-    Equipo de CTS Turismo
+    delivery, _ = EmailDelivery.objects.get_or_create(participant_id=participant_id, kind=kind, reference=reference)
+    now = timezone.now()
+    timeout = timedelta(seconds=settings.EMAIL_DELIVERY_CLAIM_TIMEOUT)
+    claimed = EmailDelivery.objects.filter(pk=delivery.pk).filter(
+        Q(status__in=[EmailDelivery.STATUS_PENDING, EmailDelivery.STATUS_FAILED])
+        | Q(status=EmailDelivery.STATUS_SENDING, claimed_at__lt=now - timeout)
+    ).update(status=EmailDelivery.STATUS_SENDING, claimed_at=now, attempts=F('attempts') + 1)
+    if claimed:
+        return delivery.pk, None
+
+    delivery.refresh_from_db(fields=['status', 'claimed_at'])
+    if delivery.status == EmailDelivery.STATUS_SENT:
+        return None, None
+    # Reserva vigente: puede ser de esta misma tarea, reentregada tras morir su worker
+    remaining = (delivery.claimed_at + timeout - now).total_seconds() if delivery.claimed_at else 0
+    return None, max(1, int(remaining) + 1)
+
+
+def _deliver(task, participant_id, kind, reference, email, to_email):
     """
-
-    # Enviar correo
+    Envía `email` una sola vez por (participante, tipo, referencia). Los
+    errores se propagan para que Celery reintente; el registro queda
+    pendiente (o fallido si no quedan reintentos) para el siguiente intento.
+    Si otro worker tiene el envío reservado se reintenta cuando su reserva
+    expire, así que una tarea reentregada nunca pierde el email.
+    Retorna True si se envió en esta ejecución.
+    """
+    delivery_id, wait = _claim_delivery(participant_id, kind, reference)
+    if wait is not None:
+        raise task.retry(countdown=wait, max_retries=None)
+    if delivery_id is None:
+        return False
+    deliveries = EmailDelivery.objects.filter(pk=delivery_id)
     try:
+        acquire()
         send_mail(
-            subject=subject,
-            message=message,
+            subject=email.subject,
+            message=email.text,
             from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[participant.email],
+            recipient_list=[to_email],
             fail_silently=False,
+            html_message=email.html,
         )
-        return f"Verification email sent to {participant.email}"
+    except EmailThrottled as e:
+        # Sin presupuesto de envío: no cuenta como intento fallido
+        deliveries.update(status=EmailDelivery.STATUS_PENDING, attempts=F('attempts') - 1)
+        raise task.retry(countdown=e.retry_after, max_retries=None)
     except Exception as e:
-        return f"Error sending email to {participant.email}: {str(e)}"
+        if is_rate_limited_error(e):
+            record_deferral()
+            deliveries.update(status=EmailDelivery.STATUS_PENDING, last_error=str(e))
+            raise task.retry(countdown=settings.EMAIL_THROTTLE_RETRY_SECONDS, max_retries=None)
+        final = isinstance(e, PERMANENT_EMAIL_ERRORS) or task.request.retries >= task.max_retries
+        deliveries.update(
+            status=EmailDelivery.STATUS_FAILED if final else EmailDelivery.STATUS_PENDING,
+            last_error=str(e)
+        )
+        raise
+    deliveries.update(status=EmailDelivery.STATUS_SENT, sent_at=timezone.now(), last_error='')
+    return True
 
 
-@shared_task
-def send_winner_notification(winner_id):
+@shared_task(**EMAIL_TASK_OPTIONS)
+def send_verification_email(self, participant_id, participant_data=None):
+    """
+    Tarea asíncrona para enviar email de verificación.
+    Si se entregan los datos del participante no se consulta la base de datos.
+    """
+    if participant_data is not None:
+        participant = SimpleNamespace(**participant_data)
+    else:
+        try:
+            participant = Participant.objects.get(id=participant_id)
+        except Participant.DoesNotExist:
+            return f"Participant {participant_id} not found"
+
+    sent = _deliver(
+        self, participant_id, EmailOutbox.KIND_VERIFICATION, str(participant.verification_token),
+        build_verification_email(participant), participant.email
+    )
+    return f"Verification email {'sent' if sent else 'already sent'} to {participant.email}"
+
+
+@shared_task(**EMAIL_TASK_OPTIONS)
+def send_winner_notification(self, winner_id):
     """
     Tarea asíncrona para notificar al ganador del sorteo
     """
     try:
-        winner = Winner.objects.get(id=winner_id)
+        winner = Winner.objects.select_related('participant').get(id=winner_id)
     except Winner.DoesNotExist:
         return f"Winner {winner_id} not found"
 
     participant = winner.participant
+    sent = _deliver(
+        self, participant.id, EmailOutbox.KIND_WINNER, str(winner.id),
+        build_winner_email(winner), participant.email
+    )
+    if sent:
+        winner.mark_as_notified()
+    return f"Winner notification {'sent' if sent else 'already sent'} to {participant.email}"
+
+
+@shared_task
+def warm_draw_job(job_id):
+    """
+    Tarea previa a un sorteo programado: cuenta el pool elegible y, en modo
+    ponderado, deja construida la tabla alias
+    """
+    try:
+        job = DrawJob.objects.get(id=job_id)
+    except DrawJob.DoesNotExist:
+        return f"Draw job {job_id} not found"
 
-    # Asunto del correo
-    subject = '🎉 ¡FELICITACIONES! Ganaste el Sorteo de San Valentín - CTS Turismo'
+    eligible_count = eligible_participants().count()
+    if job.mode == MODE_WEIGHTED:
+        get_alias_table()
+    DrawJob.objects.filter(id=job_id).update(eligible_count=eligible_count)
+    return f"Draw job {job_id} warmed ({eligible_count} eligible)"
 
-    # Mensaje en texto plano
-    message = f"""
-    ¡Hola {participant.full_name}!
 
-    ¡FELICITACIONES! 🎉🎊
+def _fail_draw_job(job, message):
+    """Marca un sorteo en segundo plano como fallido"""
+    job.status = DrawJob.STATUS_FAILED
+    job.error = message
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
 
-    Tenemos el placer de informarte que has sido seleccionado/a como GANADOR/A
-    del Sorteo de San Valentín de CTS Turismo.
 
-    Premio ganado:
-    {winner.prize_description}
+@shared_task
+def run_draw_job(job_id):
+    """
+    Tarea asíncrona que ejecuta un sorteo en segundo plano y guarda el resultado
+    """
+    # Transición atómica: si el job ya se tomó (entrega duplicada) no se vuelve a sortear
+    claimed = DrawJob.objects.filter(
+        id=job_id, status__in=[DrawJob.STATUS_PENDING, DrawJob.STATUS_SCHEDULED]
+    ).update(status=DrawJob.STATUS_RUNNING, started_at=timezone.now())
+    if not claimed:
+        return f"Draw job {job_id} already taken"
+
+    job = DrawJob.objects.select_related('created_by').get(id=job_id)
+    try:
+        with draw_lock():
+            winners = draw_winners(
+                job.created_by,
+                count=job.count,
+                mode=job.mode,
+                prize_descriptions=job.prize_descriptions,
+                nonce=job.nonce or None
+            )
+            enqueue_winner_emails(winners)
+            flush_outbox_on_commit()
+    except DrawError as e:
+        _fail_draw_job(job, str(e))
+        return f"Draw job {job_id} failed: {e}"
+    except Exception as e:
+        _fail_draw_job(job, f"Error inesperado: {e}")
+        raise
+
+    job.status = DrawJob.STATUS_DONE
+    job.eligible_count = winners[0].pool_size
+    job.result = {'winners': WinnerSerializer(winners, many=True).data}
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'eligible_count', 'result', 'finished_at'])
 
-    Pronto nos pondremos en contacto contigo al teléfono {participant.phone}
-    para coordinar los detalles de tu premio.
+    return f"Draw job {job_id} done ({len(winners)} winner(s))"
 
-    ¡Que disfrutes mucho tu estadía romántica!
 
-    Equipo de CTS Turismo
-    www.ctsturismo.cl
+@shared_task
+def run_bulk_job(job_id):
     """
+    Tarea asíncrona que ejecuta una acción masiva del admin por bloques
+    """
+    job = process_bulk_job(job_id)
+    if job is None:
+        return f"Bulk job {job_id} already taken"
+    return f"Bulk job {job_id} done ({job.affected}/{job.total} affected)"
 
-    # Enviar correo
-    try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[participant.email],
-            fail_silently=False,
-        )
 
-        # Marcar como notificado
-        winner.mark_as_notified()
+@shared_task
+def dispatch_email_outbox():
+    """
+    Tarea periódica (Celery beat) que despacha la bandeja de salida de emails
+    """
+    sent, failed = dispatch_outbox()
+    return f"Outbox dispatched: {sent} sent, {failed} failed"
 
-        return f"Winner notification sent to {participant.email}"
-    except Exception as e:
-        return f"Error sending winner notification to {participant.email}: {str(e)}"
+
+@shared_task
+def send_verification_reminders():
+    """
+    Tarea periódica (Celery beat) que recuerda verificar el correo a los
+    participantes pendientes
+    """
+    reminded, chunks = run_reminder_campaign()
+    return f"Verification reminders queued: {reminded} ({chunks} chunk(s))"
+
+
+@shared_task
+def purge_unverified_participants():
+    """
+    Tarea periódica (Celery beat) que borra los registros sin verificar más
+    antiguos que UNVERIFIED_RETENTION_DAYS
+    """
+    if settings.UNVERIFIED_RETENTION_DAYS <= 0:
+        return "Unverified retention disabled"
+    deleted, batches = purge_unverified()
+    return f"Stale unverified participants purged: {deleted} ({batches} batch(es))"
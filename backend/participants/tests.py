@@ -1,15 +1,78 @@
 """
 Tests para la aplicación de participantes del Sorteo San Valentín
 """
-from django.test import TestCase
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.template import engines
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.urls import reverse
 from django.core import mail
+from django.core.cache import cache
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
+import csv
+import io
+import json
+import random
+import threading
+import time
 import uuid
-
-from .models import Participant, Winner
+import warnings
+from base64 import urlsafe_b64encode
+from datetime import timedelta
+from io import StringIO
+from operator import itemgetter
+from unittest.mock import patch
+
+from anymail.exceptions import AnymailRecipientsRefused
+from celery.exceptions import Retry
+
+from . import dispatch
+from .models import BulkJob, DrawJob, EmailDelivery, EmailOutbox, Participant, ParticipantCounters, Winner
+from .outbox import (
+    FLUSH_QUEUED_CACHE_KEY,
+    dispatch_outbox,
+    enqueue_verification_email,
+    enqueue_winner_emails
+)
+from .emails import build_verification_email, send_verification_email_sync
+from .email_templates import clear_email_templates, render_email
+from .reminders import run_reminder_campaign
+from .retention import purge_unverified
+from .tasks import purge_unverified_participants, run_draw_job, send_verification_email, send_winner_notification
+from .export import EXPORT_FORMATS, export_response
+from .live import PARTICIPANT_REGISTERED, RESYNC, WINNERS_DRAWN, publish, read_events, stream_token
+from .metrics import (
+    ENDPOINT_CACHE_KEY,
+    endpoint_metrics,
+    flush_metrics,
+    query_budget,
+    reset_metrics
+)
+from .pagination import EstimatedCountPaginator
+from .search import search_participants
+from .serializers import ParticipantListRowSerializer, ParticipantListSerializer
+from .throttle import BUCKET_CACHE_KEY, LOCK_CACHE_KEY, LOCK_RETRY_SECONDS, acquire, reserve, throttle_metrics
+from .draw import (
+    AliasTable,
+    derive_seed,
+    draw_positions,
+    draw_winners,
+    eligible_participants,
+    get_alias_table,
+    pick_random_participant,
+    pick_random_participants,
+    pick_weighted_participants,
+    pool_snapshot,
+    seeded_rng
+)
 
 
 class ParticipantModelTests(TestCase):
@@ -161,6 +224,7 @@ class WinnerModelTests(TestCase):
         self.assertIn(self.participant.full_name, str(winner))
 
 
+@override_settings(BACKGROUND_EXECUTOR_WORKERS=0)
 class ParticipantRegistrationAPITests(APITestCase):
     """Tests para el endpoint de registro de participantes"""
 
@@ -176,7 +240,8 @@ class ParticipantRegistrationAPITests(APITestCase):
 
     def test_register_participant_success(self):
         """Test: registro exitoso de participante"""
-        response = self.client.post(self.register_url, self.valid_data, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.register_url, self.valid_data, format='json')
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertIn('message', response.data)
@@ -190,6 +255,35 @@ class ParticipantRegistrationAPITests(APITestCase):
         self.assertEqual(len(mail.outbox), 1)
         self.assertIn(self.valid_data['full_name'], mail.outbox[0].body)
 
+    def test_register_writes_outbox_row(self):
+        """Test: el registro guarda el email en la bandeja y lo despacha después del commit"""
+        with patch('participants.outbox.dispatch_outbox') as dispatch:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.client.post(self.register_url, self.valid_data, format='json')
+            dispatch.assert_not_called()
+
+            row = EmailOutbox.objects.get()
+            self.assertEqual(row.kind, EmailOutbox.KIND_VERIFICATION)
+            self.assertEqual(row.to_email, self.valid_data['email'])
+            self.assertEqual(row.status, EmailOutbox.STATUS_PENDING)
+
+            for callback in callbacks:
+                callback()
+        cache.delete(FLUSH_QUEUED_CACHE_KEY)
+        dispatch.assert_called_once()
+
+    @override_settings(CELERY_BROKER_URL='memory://')
+    def test_register_uses_celery_when_broker_configured(self):
+        """Test: con broker configurado la bandeja se despacha por la tarea de Celery"""
+        with patch('participants.tasks.dispatch_email_outbox.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(self.register_url, self.valid_data, format='json')
+        cache.delete(FLUSH_QUEUED_CACHE_KEY)
+
+        delay.assert_called_once()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.STATUS_PENDING).count(), 1)
+
     def test_register_duplicate_email(self):
         """Test: no se permite registro con email duplicado"""
         # Crear primer participante
@@ -530,8 +624,178 @@ class ParticipantListAPITests(APITestCase):
         self.assertEqual(response.data['total_participants'], 5)
         self.assertEqual(response.data['verified'], 3)
         self.assertEqual(response.data['pending'], 2)
+        self.assertEqual(response.data['eligible_for_draw'], 3)
+        self.assertEqual(response.data['password_set'], 0)
+        self.assertEqual(response.data['active'], 5)
+        self.assertEqual(response.data['winners'], 0)
+
+    def test_cursor_pagination_walks_all_rows(self):
+        """Test: el modo cursor recorre todas las filas sin repetir y permite volver"""
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        # Mismo created_at para todos: el desempate por id debe mantener el orden
+        Participant.objects.filter(is_admin=False).update(created_at=timezone.now())
+
+        seen = []
+        url = f'{self.participants_url}?pagination=cursor&page_size=2'
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            pages.append([p['id'] for p in response.data['results']])
+            seen.extend(pages[-1])
+            last_response, url = response, response.data['next']
+
+        expected = Participant.objects.filter(is_admin=False).order_by('-created_at', '-id')
+        self.assertEqual(seen, [str(pk) for pk in expected.values_list('id', flat=True)])
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+
+        response = self.client.get(last_response.data['previous'])
+        self.assertEqual([p['id'] for p in response.data['results']], pages[1])
+
+    def test_indexed_search_ranks_and_follows_updates(self):
+        """Test: la búsqueda indexada ordena por relevancia y ve los cambios del participante"""
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        Participant.objects.filter(email='participant1@example.com').update(full_name='Rosa Rosales')
+        Participant.objects.filter(email='participant2@example.com').update(full_name='Rosa Pérez')
+
+        response = self.client.get(f'{self.participants_url}?search=rosales')
+        self.assertEqual([p['email'] for p in response.data['results']], ['participant1@example.com'])
+
+        response = self.client.get(f'{self.participants_url}?search=rosa')
+        self.assertEqual(response.data['results'][0]['email'], 'participant1@example.com')
+        self.assertEqual(len(response.data['results']), 2)
+
+        Participant.objects.filter(email='participant1@example.com').delete()
+        response = self.client.get(f'{self.participants_url}?search=rosales')
+        self.assertEqual(response.data['results'], [])
+
+    def test_search_uses_index_for_long_terms(self):
+        """Test: con términos de 3+ caracteres la búsqueda usa el índice; los cortos usan ICONTAINS"""
+        queryset = Participant.objects.filter(is_admin=False)
+
+        results = search_participants(queryset, ['cipant3'])
+        self.assertEqual([p.email for p in results], ['participant3@example.com'])
+        self.assertIsNone(search_participants(queryset, ['p3']))
+
+    def test_search_rebuilds_index_with_renumbered_rowids(self):
+        """Test: si los rowid cambian (VACUUM) el índice se reconstruye antes de buscar"""
+        queryset = Participant.objects.filter(is_admin=False)
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE participants_participant SET rowid = rowid + 1000')
+
+        with patch.dict('participants.search._fts_ready', clear=True):
+            results = search_participants(queryset, ['cipant3'])
+            self.assertEqual([p.email for p in results], ['participant3@example.com'])
+
+    def test_export_csv_applies_filters(self):
+        """Test: la exportación CSV aplica el filtro is_verified y se entrega en streaming"""
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        response = self.client.get(reverse('admin-participants-export'), {'is_verified': 'true'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual({row['is_verified'] for row in rows}, {'True'})
+
+    def test_export_csv_neutralizes_formulas(self):
+        """Test: el CSV antepone ' a los valores que una planilla ejecutaría como fórmula, no a los teléfonos"""
+        Participant.objects.create_user(
+            email='formula@example.com', full_name='=HYPERLINK("http://evil.example","x")', phone='+56911111111'
+        )
+        Participant.objects.create_user(
+            email='formula_dde@example.com', full_name='+cmd|" /C calc"!A0', phone='+56 9 2222-2222'
+        )
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        response = self.client.get(reverse('admin-participants-export'), {'search': 'formula'})
+        rows = sorted(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())), key=itemgetter('email'))
+
+        self.assertEqual(rows[0]['full_name'], '\'=HYPERLINK("http://evil.example","x")')
+        self.assertEqual(rows[0]['email'], 'formula@example.com')
+        self.assertEqual(rows[1]['full_name'], '\'+cmd|" /C calc"!A0')
+        # Los teléfonos son números, no fórmulas: se exportan intactos
+        self.assertEqual([row['phone'] for row in rows], ['+56911111111', '+56 9 2222-2222'])
+
+    def test_export_ndjson_applies_search(self):
+        """Test: la exportación NDJSON aplica la búsqueda"""
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        response = self.client.get(
+            reverse('admin-participants-export'), {'export_format': 'ndjson', 'search': 'participant3'}
+        )
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['email'] for line in lines], ['participant3@example.com'])
+
+    async def test_export_async_iterator_matches_sync(self):
+        """Test: con asynchronous=True la exportación es un iterador asíncrono con el mismo contenido"""
+        queryset = Participant.objects.filter(is_staff=False).order_by('email')
+        columns = {'email': 'email', 'full_name': 'full_name'}
+        for export_format in EXPORT_FORMATS:
+            expected = await sync_to_async(
+                lambda: b''.join(export_response(queryset, columns, export_format, 'x').streaming_content)
+            )()
+            response = export_response(queryset, columns, export_format, 'x', asynchronous=True)
+
+            self.assertTrue(response.is_async)
+            self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), expected)
+
+    async def test_export_streams_under_asgi(self):
+        """Test: bajo ASGI la exportación se sirve sin que Django la acumule en memoria"""
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.admin).access_token))()
+        response = await self.async_client.get(
+            reverse('admin-participants-export'), {'is_verified': 'true'},
+            headers={'Authorization': f'Bearer {token}'}
+        )
+        self.assertTrue(response.is_async)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            content = b''.join([chunk async for chunk in response])
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        self.assertEqual(len(rows), 3)
+
+    def test_export_rejects_unknown_format(self):
+        """Test: un formato de exportación desconocido retorna 400"""
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        response = self.client.get(reverse('admin-participants-export'), {'export_format': 'xlsx'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fast_list_matches_model_serializer(self):
+        """Test: la ruta rápida del listado entrega lo mismo que ParticipantListSerializer"""
+        queryset = Participant.objects.filter(is_admin=False).order_by('-created_at', '-id')
+
+        fast = ParticipantListRowSerializer(ParticipantListRowSerializer.select(queryset)).data
+        slow = ParticipantListSerializer(queryset, many=True).data
+
+        self.assertEqual(fast, [dict(row) for row in slow])
+        self.assertEqual({row['status'] for row in fast}, {'Verificado', 'Pendiente de verificación'})
+
+    def test_invalid_cursor_returns_404(self):
+        """Test: un cursor manipulado retorna 404"""
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        response = self.client.get(f'{self.participants_url}?cursor=no-es-un-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+        bad_pk = urlsafe_b64encode(b'2024-01-01T00:00:00+00:00|no-es-un-uuid|0').decode()
+        response = self.client.get(f'{self.participants_url}?cursor={bad_pk}')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+
+@override_settings(BACKGROUND_EXECUTOR_WORKERS=0)
 class WinnerDrawAPITests(APITestCase):
     """Tests para el sorteo de ganador"""
 
@@ -582,7 +846,8 @@ class WinnerDrawAPITests(APITestCase):
         refresh = RefreshToken.for_user(self.admin)
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
 
-        response = self.client.post(self.draw_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.draw_url)
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertIn('message', response.data)
@@ -596,6 +861,8 @@ class WinnerDrawAPITests(APITestCase):
 
         # Verificar que se envió email (en test mode)
         self.assertEqual(len(mail.outbox), 1)
+        winner.refresh_from_db()
+        self.assertTrue(winner.notified)
 
     def test_draw_no_eligible_participants(self):
         """Test: error si no hay participantes elegibles"""
@@ -610,6 +877,61 @@ class WinnerDrawAPITests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('error', response.data)
 
+    def test_draw_multiple_winners(self):
+        """Test: sorteo de varios ganadores distintos en una solicitud"""
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.draw_url,
+                {'count': 2, 'prize_descriptions': ['Premio 1', 'Premio 2']},
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['winners']), 2)
+        self.assertEqual(Winner.objects.values('participant').distinct().count(), 2)
+        self.assertEqual(
+            set(Winner.objects.values_list('prize_description', flat=True)),
+            {'Premio 1', 'Premio 2'}
+        )
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_export_winners_csv(self):
+        """Test: exportación CSV de ganadores con los datos del participante"""
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.client.post(self.draw_url, {'count': 2}, format='json')
+
+        response = self.client.get(reverse('admin-winners-export'))
+
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(all(row['participant_email'].endswith('@example.com') for row in rows))
+
+    def test_draw_skips_previous_winners(self):
+        """Test: un participante no puede ganar dos veces"""
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        response = self.client.post(self.draw_url, {'count': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.post(self.draw_url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Winner.objects.count(), 3)
+
+    def test_draw_more_winners_than_eligible(self):
+        """Test: error si se piden más ganadores que participantes elegibles"""
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        response = self.client.post(self.draw_url, {'count': 5}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Winner.objects.count(), 0)
+
     def test_list_winners(self):
         """Test: listar ganadores"""
         # Crear un ganador
@@ -631,6 +953,1402 @@ class WinnerDrawAPITests(APITestCase):
         self.assertIn('participant_email', response.data['results'][0])
 
 
+class EmailOutboxTests(TestCase):
+    """Tests para la bandeja de salida de emails"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        self.participants = [
+            Participant.objects.create_user(
+                email=f'outbox{i}@example.com',
+                full_name=f'Outbox {i}',
+                phone=f'+5696000000{i}'
+            )
+            for i in range(3)
+        ]
+
+    def test_dispatch_sends_pending_batches(self):
+        """Test: el despachador envía todos los pendientes por lotes"""
+        for participant in self.participants:
+            enqueue_verification_email(participant)
+
+        sent, failed = dispatch_outbox(batch_size=2)
+
+        self.assertEqual((sent, failed), (3, 0))
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.STATUS_SENT).count(), 3)
+        self.assertEqual(dispatch_outbox(), (0, 0))
+
+    def test_failed_send_is_retried_later(self):
+        """Test: un envío fallido vuelve a 'pending' con espera y cuenta el intento"""
+        row = enqueue_verification_email(self.participants[0])
+
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=Exception('SMTP caído')):
+            sent, failed = dispatch_outbox()
+
+        row.refresh_from_db()
+        self.assertEqual((sent, failed), (0, 1))
+        self.assertEqual(row.status, EmailOutbox.STATUS_PENDING)
+        self.assertEqual(row.attempts, 1)
+        self.assertGreater(row.available_at, timezone.now())
+        self.assertIn('SMTP caído', row.last_error)
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=1)
+    def test_failed_send_gives_up_after_max_attempts(self):
+        """Test: tras el máximo de intentos el email queda fallido"""
+        row = enqueue_verification_email(self.participants[0])
+
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=Exception('SMTP caído')):
+            dispatch_outbox()
+
+        row.refresh_from_db()
+        self.assertEqual(row.status, EmailOutbox.STATUS_FAILED)
+
+    def test_winner_marked_notified_after_send(self):
+        """Test: el ganador queda notificado cuando su email se envía"""
+        winner = Winner.objects.create(participant=self.participants[0])
+        enqueue_winner_emails([winner])
+
+        dispatch_outbox()
+
+        winner.refresh_from_db()
+        self.assertTrue(winner.notified)
+        self.assertIsNotNone(winner.notified_at)
+
+    def test_stale_claims_are_released(self):
+        """Test: las filas reservadas por un despachador caído se vuelven a enviar"""
+        row = enqueue_verification_email(self.participants[0])
+        EmailOutbox.objects.filter(id=row.id).update(
+            status=EmailOutbox.STATUS_SENDING,
+            available_at=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(dispatch_outbox(), (1, 0))
+
+
+@override_settings(EMAIL_RATE_PER_SECOND=1, EMAIL_RATE_BURST=2, EMAIL_THROTTLE_MAX_WAIT=0)
+class EmailThrottleTests(TestCase):
+    """Tests para el límite de envío de emails (token bucket en la caché)"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        cache.clear()
+        self.participants = [
+            Participant.objects.create_user(
+                email=f'throttle{i}@example.com',
+                full_name=f'Throttle {i}',
+                phone=f'+5695000000{i}'
+            )
+            for i in range(3)
+        ]
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_bucket_allows_burst_then_waits(self):
+        """Test: el bucket deja pasar la ráfaga y luego pide esperar"""
+        self.assertEqual(reserve(), 0)
+        self.assertEqual(reserve(), 0)
+        self.assertGreater(reserve(), 0)
+
+    def test_busy_lock_defers_without_touching_it(self):
+        """Test: si otro proceso retiene el lock se pide esperar y su lock no se borra"""
+        cache.set(LOCK_CACHE_KEY, 'otro-proceso', timeout=60)
+        with patch('participants.throttle.time.monotonic', side_effect=[0, 0, 5]):
+            self.assertEqual(reserve(), LOCK_RETRY_SECONDS)
+
+        self.assertEqual(cache.get(LOCK_CACHE_KEY), 'otro-proceso')
+        self.assertIsNone(cache.get(BUCKET_CACHE_KEY))
+
+    @override_settings(EMAIL_RATE_BURST=10, EMAIL_DAILY_LIMIT=1)
+    def test_daily_limit_waits_until_next_day(self):
+        """Test: superado el cupo diario la espera llega hasta el día siguiente"""
+        self.assertEqual(reserve(), 0)
+        self.assertGreater(reserve(), 1)
+
+    def test_outbox_defers_without_counting_attempt(self):
+        """Test: sin presupuesto los emails se reprograman, no se descartan"""
+        rows = [enqueue_verification_email(participant) for participant in self.participants]
+
+        sent, failed = dispatch_outbox()
+
+        self.assertEqual((sent, failed), (2, 0))
+        deferred = EmailOutbox.objects.get(id=rows[2].id)
+        self.assertEqual(deferred.status, EmailOutbox.STATUS_PENDING)
+        self.assertEqual(deferred.attempts, 0)
+        self.assertGreater(deferred.available_at, timezone.now())
+        self.assertEqual(throttle_metrics()['deferred'], 1)
+
+    def test_provider_429_defers_batch(self):
+        """Test: un 429 del proveedor reprograma el lote sin marcarlo fallido"""
+        row = enqueue_verification_email(self.participants[0])
+        error = Exception('Too Many Requests')
+        error.status_code = 429
+
+        with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=error):
+            self.assertEqual(dispatch_outbox(), (0, 0))
+
+        row.refresh_from_db()
+        self.assertEqual(row.status, EmailOutbox.STATUS_PENDING)
+        self.assertEqual(row.attempts, 0)
+
+    def test_sync_send_over_budget_goes_to_outbox(self):
+        """Test: el envío síncrono sin presupuesto queda en la bandeja de salida"""
+        for participant in self.participants:
+            send_verification_email_sync(participant.id)
+
+        self.assertEqual(len(mail.outbox), 2)
+        row = EmailOutbox.objects.get()
+        self.assertEqual(row.participant, self.participants[2])
+
+    @override_settings(EMAIL_THROTTLE_MAX_WAIT=5)
+    def test_wait_time_is_recorded(self):
+        """Test: la espera del limitador queda en las métricas"""
+        with patch('participants.throttle.time.sleep') as sleep:
+            sleep.side_effect = lambda seconds: cache.set(BUCKET_CACHE_KEY, (1, 0), timeout=60)
+            for _ in range(3):
+                acquire()
+
+        metrics = throttle_metrics()
+        self.assertEqual(metrics['granted'], 3)
+        self.assertGreater(metrics['wait_ms'], 0)
+
+
+class ParticipantCountersTests(TestCase):
+    """Tests para los contadores incrementales del dashboard"""
+
+    def assertCountersConsistent(self):
+        counters = ParticipantCounters.current()
+        self.assertEqual(
+            {field: getattr(counters, field) for field in ParticipantCounters.FIELDS},
+            ParticipantCounters.compute()
+        )
+        return counters
+
+    def test_counters_follow_participant_lifecycle(self):
+        """Test: alta, verificación, contraseña, sorteo y borrado mantienen los contadores"""
+        admin = Participant.objects.create_superuser(
+            email='admin@ctsturismo.cl', full_name='Admin', phone='+56900000000', password='admin123'
+        )
+        participants = [
+            Participant.objects.create_user(
+                email=f'counter{i}@example.com', full_name=f'Counter {i}', phone=f'+5694000000{i}'
+            )
+            for i in range(4)
+        ]
+        counters = self.assertCountersConsistent()
+        self.assertEqual((counters.total, counters.verified, counters.eligible), (4, 0, 0))
+
+        for participant in participants[:3]:
+            participant.verify_email()
+        participants[0].set_password('secreta123')
+        participants[0].save()
+        counters = self.assertCountersConsistent()
+        self.assertEqual((counters.verified, counters.password_set, counters.eligible), (3, 1, 3))
+
+        draw_winners(admin, count=2)
+        counters = self.assertCountersConsistent()
+        self.assertEqual((counters.won, counters.eligible), (2, 1))
+
+        Winner.objects.create(participant=participants[3])
+        Participant.objects.filter(wins__isnull=False).first().delete()
+        Winner.objects.filter(participant=participants[3]).delete()
+        counters = self.assertCountersConsistent()
+        self.assertEqual(counters.total, 3)
+
+    def test_current_reads_a_single_row(self):
+        """Test: las estadísticas se leen con una sola consulta"""
+        Participant.objects.create_user(email='uno@example.com', full_name='Uno', phone='+56911111111')
+        with self.assertNumQueries(1):
+            counters = ParticipantCounters.current()
+        self.assertEqual(counters.total, 1)
+
+    def test_reconcile_command_fixes_drift(self):
+        """Test: reconcile_counters corrige cambios hechos con update() masivos"""
+        for i in range(2):
+            Participant.objects.create_user(email=f'drift{i}@example.com', full_name='Drift', phone='+56911111111')
+        Participant.objects.update(is_verified=True)
+        self.assertEqual(ParticipantCounters.current().verified, 0)
+
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+
+        self.assertIn('verified: 0 -> 2', out.getvalue())
+        self.assertEqual(ParticipantCounters.current().verified, 2)
+
+
+class DrawEngineTests(TestCase):
+    """Tests para el motor de selección del sorteo"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        self.participants = []
+        for i in range(4):
+            participant = Participant.objects.create_user(
+                email=f'pool{i}@example.com',
+                full_name=f'Pool {i}',
+                phone=f'+5690000000{i}'
+            )
+            participant.verify_email()
+            self.participants.append(participant)
+
+    def test_pick_returns_none_without_eligible(self):
+        """Test: sin participantes elegibles retorna None"""
+        Participant.objects.update(is_verified=False)
+        self.assertIsNone(pick_random_participant())
+
+    def test_pick_only_eligible(self):
+        """Test: nunca selecciona inactivos ni administradores"""
+        Participant.objects.exclude(pk=self.participants[0].pk).update(is_active=False)
+        for _ in range(5):
+            self.assertEqual(pick_random_participant(), self.participants[0])
+
+    def test_pick_covers_whole_pool(self):
+        """Test: todas las posiciones del pool pueden salir sorteadas"""
+        rng = random.Random(1234)
+        picked = {pick_random_participant(rng=rng).pk for _ in range(60)}
+        self.assertEqual(picked, {p.pk for p in self.participants})
+
+
+class WeightedDrawTests(TestCase):
+    """Tests para el sorteo ponderado con tabla alias"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        self.light = Participant.objects.create_user(
+            email='light@example.com', full_name='Una Entrada', phone='+56900000001'
+        )
+        self.heavy = Participant.objects.create_user(
+            email='heavy@example.com', full_name='Tres Entradas', phone='+56900000002'
+        )
+        for participant, weight in ((self.light, 1), (self.heavy, 3)):
+            participant.entry_weight = weight
+            participant.save()
+            participant.verify_email()
+
+    def test_alias_table_respects_weights(self):
+        """Test: la frecuencia de cada participante es proporcional a su peso"""
+        table = AliasTable.from_queryset(eligible_participants())
+        rng = random.Random(42)
+        picks = [table.pick(rng) for _ in range(8000)]
+        ratio = picks.count(self.heavy.pk) / len(picks)
+        self.assertAlmostEqual(ratio, 0.75, delta=0.03)
+
+    def test_zero_weight_is_never_picked(self):
+        """Test: un participante con peso 0 no entra a la tabla"""
+        self.light.entry_weight = 0
+        with self.captureOnCommitCallbacks(execute=True):
+            self.light.save()
+        rng = random.Random(7)
+        for _ in range(20):
+            self.assertEqual(pick_weighted_participants(1, rng=rng), [self.heavy])
+
+    def test_sample_never_returns_fewer_than_requested(self):
+        """Test: aunque una entrada concentre casi todo el peso, se obtienen `count` participantes distintos"""
+        pks = [uuid.uuid4() for _ in range(3)]
+        table = AliasTable(b''.join(pk.bytes for pk in pks), [1, 1, 10 ** 6])
+
+        for seed in range(5):
+            self.assertCountEqual(table.sample(3, random.Random(seed)), pks)
+        self.assertCountEqual(table.sample(10, random.Random(0)), pks)
+
+    def test_alias_table_cached_until_invalidated(self):
+        """Test: la tabla se reutiliza entre sorteos y se invalida al cambiar pesos"""
+        table = get_alias_table()
+        self.assertIs(get_alias_table(), table)
+
+        # La versión vive en la base, no en la caché de cada proceso
+        cache.clear()
+        self.assertIs(get_alias_table(), table)
+
+        self.heavy.entry_weight = 5
+        self.heavy.save(update_fields=['entry_weight'])
+        self.assertIsNot(get_alias_table(), table)
+
+    def test_alias_table_survives_changes_outside_the_pool(self):
+        """Test: editar datos de contacto o notificar a un ganador no reconstruye la tabla"""
+        admin = Participant.objects.create_superuser(
+            email='admin@ctsturismo.cl', full_name='Admin CTS', phone='+56900000000', password='admin123'
+        )
+        winner = Winner.objects.create(participant=self.light, drawn_by=admin)
+        table = get_alias_table()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            winner.mark_as_notified()
+            heavy = Participant.objects.get(pk=self.heavy.pk)
+            heavy.full_name = 'Tres Entradas Editado'
+            heavy.save()
+            Participant.objects.create_user(email='nuevo@example.com', full_name='Sin Verificar', phone='+56900000003')
+
+        self.assertIs(get_alias_table(), table)
+
+    def test_weighted_draw_endpoint(self):
+        """Test: el endpoint de sorteo acepta el modo ponderado"""
+        admin = Participant.objects.create_superuser(
+            email='admin@ctsturismo.cl', full_name='Admin CTS', phone='+56900000000', password='admin123'
+        )
+        client = APIClient()
+        refresh = RefreshToken.for_user(admin)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        response = client.post(reverse('admin-winners-draw'), {'mode': 'weighted', 'count': 2}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Winner.objects.count(), 2)
+
+        response = client.post(reverse('admin-winners-draw'), {'mode': 'weighted'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DrawAuditTests(TestCase):
+    """Tests para la auditoría de sorteos (digest del pool y semilla)"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        self.admin = Participant.objects.create_superuser(
+            email='admin@ctsturismo.cl',
+            full_name='Admin CTS',
+            phone='+56900000000',
+            password='admin123'
+        )
+        for i in range(6):
+            participant = Participant.objects.create_user(
+                email=f'audit{i}@example.com',
+                full_name=f'Auditado {i}',
+                phone=f'+5698000000{i}'
+            )
+            participant.verify_email()
+
+    def test_draw_stores_pool_snapshot(self):
+        """Test: el ganador guarda digest, tamaño del pool, nonce y semilla"""
+        digest, size = pool_snapshot(eligible_participants())
+        winner, = draw_winners(self.admin, nonce='nonce-publicado')
+
+        self.assertEqual(winner.pool_digest, digest)
+        self.assertEqual(winner.pool_size, 6)
+        self.assertEqual(winner.nonce, 'nonce-publicado')
+        self.assertEqual(winner.seed, derive_seed(digest, 'nonce-publicado'))
+
+    def test_same_pool_and_nonce_reproduce_draw(self):
+        """Test: el mismo pool y nonce sortean el mismo ganador"""
+        with transaction.atomic():
+            first = draw_winners(self.admin, count=2, nonce='abc')
+            transaction.set_rollback(True)
+        second = draw_winners(self.admin, count=2, nonce='abc')
+
+        self.assertEqual(
+            [w.participant_id for w in first],
+            [w.participant_id for w in second]
+        )
+
+    def test_verify_draw_command(self):
+        """Test: el comando verify_draw reproduce sorteos pasados"""
+        draw_winners(self.admin, nonce='uno')
+        draw_winners(self.admin, count=2, nonce='dos')
+        draw_winners(self.admin, mode='weighted', nonce='tres')
+
+        out = StringIO()
+        call_command('verify_draw', '--all', stdout=out)
+        self.assertEqual(out.getvalue().count(': OK'), 3)
+
+    def test_uniform_draw_matches_offset_selection(self):
+        """Test: la selección en streaming coincide con la de COUNT/OFFSET (sorteos anteriores)"""
+        winners = draw_winners(self.admin, count=3, nonce='tres')
+
+        pool = eligible_participants(as_of=min(w.drawn_at for w in winners))
+        offset = pick_random_participants(3, pool, seeded_rng(winners[0].seed))
+        self.assertEqual([p.pk for p in offset], [w.participant_id for w in winners])
+
+    def test_pool_change_between_passes_is_redrawn(self):
+        """Test: si el pool cambia entre las dos pasadas del sorteo, se vuelve a sortear con el pool nuevo"""
+        def register_during_draw(size, count, rng):
+            if not Participant.objects.filter(email='tarde@example.com').exists():
+                Participant.objects.create_user(
+                    email='tarde@example.com', full_name='Tarde', phone='+56980000099'
+                ).verify_email()
+            return original(size, count, rng)
+
+        original = draw_positions
+        with patch('participants.draw.draw_positions', side_effect=register_during_draw) as positions:
+            winners = draw_winners(self.admin, count=2, nonce='uno')
+
+        self.assertEqual(positions.call_count, 2)
+        self.assertEqual(winners[0].pool_size, 7)
+        out = StringIO()
+        call_command('verify_draw', str(winners[0].pk), stdout=out)
+        self.assertIn(': OK', out.getvalue())
+
+    def test_verify_draw_detects_tampering(self):
+        """Test: el comando detecta un ganador alterado"""
+        winner, = draw_winners(self.admin, nonce='uno')
+        other = eligible_participants().exclude(pk=winner.participant_id).first()
+        Winner.objects.filter(pk=winner.pk).update(participant=other)
+
+        with self.assertRaises(CommandError):
+            call_command('verify_draw', str(winner.pk), stdout=StringIO())
+
+
+@override_settings(BACKGROUND_EXECUTOR_WORKERS=0)
+class DrawJobAPITests(APITestCase):
+    """Tests para sorteos en segundo plano (jobs de Celery)"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        self.jobs_url = reverse('admin-draw-jobs-list')
+        self.admin = Participant.objects.create_superuser(
+            email='admin@ctsturismo.cl',
+            full_name='Admin CTS',
+            phone='+56900000000',
+            password='admin123'
+        )
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        for i in range(3):
+            participant = Participant.objects.create_user(
+                email=f'job{i}@example.com',
+                full_name=f'Job {i}',
+                phone=f'+5697000000{i}'
+            )
+            participant.verify_email()
+
+    def test_create_job_returns_id_and_runs(self):
+        """Test: crear un sorteo retorna el ID y el estado se puede consultar"""
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.jobs_url, {'count': 2}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertIn('job_id', response.data)
+
+        status_response = self.client.get(response.data['status_url'])
+        self.assertEqual(status_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(status_response.data['status'], DrawJob.STATUS_DONE)
+        self.assertEqual(len(status_response.data['result']['winners']), 2)
+        self.assertEqual(status_response.data['eligible_count'], 3)
+        self.assertEqual(Winner.objects.count(), 2)
+
+    def test_job_without_broker_runs_in_background(self):
+        """Test: sin broker el sorteo va al pool de hilos y el request no lo espera"""
+        with patch('participants.dispatch.run_in_background') as background:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.jobs_url, {'count': 2}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        background.assert_called_once_with(run_draw_job, response.data['job_id'])
+        self.assertEqual(DrawJob.objects.get(id=response.data['job_id']).status, DrawJob.STATUS_PENDING)
+
+    def test_job_without_eligible_participants_fails(self):
+        """Test: el job queda fallido si no hay participantes elegibles"""
+        Participant.objects.filter(is_admin=False).update(is_verified=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.jobs_url, {}, format='json')
+
+        job = DrawJob.objects.get(id=response.data['job_id'])
+        self.assertEqual(job.status, DrawJob.STATUS_FAILED)
+        self.assertTrue(job.error)
+
+    def test_scheduled_job_requires_broker(self):
+        """Test: un sorteo programado requiere broker de Celery"""
+        scheduled_for = timezone.now() + timedelta(days=1)
+        response = self.client.post(self.jobs_url, {'scheduled_for': scheduled_for.isoformat()}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(DrawJob.objects.count(), 0)
+
+    @override_settings(CELERY_BROKER_URL='memory://', DRAW_WARMUP_MINUTES=10)
+    def test_scheduled_job_enqueues_warmup_and_draw(self):
+        """Test: un sorteo programado encola el precálculo y el sorteo con ETA"""
+        scheduled_for = timezone.now() + timedelta(days=1)
+        with patch('participants.tasks.warm_draw_job.apply_async') as warm, \
+                patch('participants.tasks.run_draw_job.apply_async') as run:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.jobs_url, {'scheduled_for': scheduled_for.isoformat()}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(run.call_args.kwargs['eta'], scheduled_for)
+        self.assertEqual(warm.call_args.kwargs['eta'], scheduled_for - timedelta(minutes=10))
+        job = DrawJob.objects.get(id=response.data['job_id'])
+        self.assertEqual(job.status, DrawJob.STATUS_SCHEDULED)
+
+    def test_job_runs_only_once(self):
+        """Test: una entrega duplicada del job no sortea dos veces"""
+        job = DrawJob.objects.create(created_by=self.admin)
+        run_draw_job(str(job.id))
+        run_draw_job(str(job.id))
+
+        self.assertEqual(Winner.objects.count(), 1)
+
+
+class ConcurrentDrawTests(TransactionTestCase):
+    """Tests de sorteos concurrentes (lock por campaña e Idempotency-Key)"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        self.admin = Participant.objects.create_superuser(
+            email='admin@ctsturismo.cl',
+            full_name='Admin CTS',
+            phone='+56900000000',
+            password='admin123'
+        )
+        self.token = str(RefreshToken.for_user(self.admin).access_token)
+        for i in range(10):
+            participant = Participant.objects.create_user(
+                email=f'concurrent{i}@example.com',
+                full_name=f'Concurrente {i}',
+                phone=f'+5699000000{i}'
+            )
+            participant.verify_email()
+
+    def _parallel_draws(self, headers_list):
+        """Lanza un POST de sorteo por cada header en hilos paralelos"""
+        barrier = threading.Barrier(len(headers_list))
+        responses = []
+
+        def worker(headers):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}', **headers)
+            barrier.wait()
+            try:
+                responses.append(client.post(reverse('admin-winners-draw'), {'count': 2}, format='json'))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(headers,)) for headers in headers_list]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def test_parallel_draws_never_share_winners(self):
+        """Test: sorteos en paralelo no repiten ganadores"""
+        responses = self._parallel_draws([{} for _ in range(4)])
+
+        self.assertEqual([r.status_code for r in responses], [status.HTTP_201_CREATED] * 4)
+        self.assertEqual(Winner.objects.count(), 8)
+        self.assertEqual(Winner.objects.values('participant').distinct().count(), 8)
+
+    def test_parallel_retries_with_same_idempotency_key(self):
+        """Test: reintentos con la misma Idempotency-Key sortean una sola vez"""
+        responses = self._parallel_draws([{'HTTP_IDEMPOTENCY_KEY': 'sorteo-1'} for _ in range(4)])
+
+        self.assertEqual([r.status_code for r in responses], [status.HTTP_201_CREATED] * 4)
+        self.assertEqual(Winner.objects.count(), 2)
+        winner_ids = {tuple(w['id'] for w in r.data['winners']) for r in responses}
+        self.assertEqual(len(winner_ids), 1)
+
+
+class QueryBudgetMixin:
+    """Hace fallar el test si un endpoint supera su presupuesto de consultas (settings.QUERY_BUDGETS)"""
+
+    def assertWithinQueryBudget(self, response):
+        name = response.resolver_match.view_name
+        budget = query_budget(name)
+        self.assertLessEqual(
+            response.query_count, budget,
+            f'{name} ejecutó {response.query_count} consultas (presupuesto {budget})'
+        )
+
+
+@override_settings(BACKGROUND_EXECUTOR_WORKERS=0)
+class QueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """Tests de presupuesto de consultas por endpoint (detectan N+1)"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        cache.clear()
+        reset_metrics()
+        self.admin = Participant.objects.create_superuser(
+            email='admin@ctsturismo.cl',
+            full_name='Admin CTS',
+            phone='+56900000000',
+            password='admin123'
+        )
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        for i in range(12):
+            participant = Participant.objects.create_user(
+                email=f'budget{i}@example.com',
+                full_name=f'Budget {i}',
+                phone=f'+5693000000{i:02d}'
+            )
+            participant.verify_email()
+        # La verificación del índice de búsqueda ocurre una vez por proceso y
+        # no forma parte del presupuesto de cada solicitud
+        search_participants(Participant.objects.all(), ['budget'])
+
+    def test_admin_endpoints_within_budget(self):
+        """Test: los endpoints de admin respetan su presupuesto sin importar cuántas filas retornan"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertWithinQueryBudget(self.client.post(reverse('admin-winners-draw'), {'count': 6}, format='json'))
+
+        for url in (
+            reverse('admin-participants-list'),
+            reverse('admin-participants-list') + '?pagination=cursor',
+            reverse('admin-participants-list') + '?search=budget1',
+            reverse('admin-participants-stats'),
+            reverse('admin-winners-list'),
+            reverse('admin-metrics'),
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertWithinQueryBudget(response)
+
+    def test_winner_list_has_no_n_plus_one(self):
+        """Test: el listado de ganadores no hace una consulta por ganador"""
+        draw_winners(self.admin, count=2)
+        few = self.client.get(reverse('admin-winners-list')).query_count
+        draw_winners(self.admin, count=8)
+        many = self.client.get(reverse('admin-winners-list')).query_count
+
+        self.assertEqual(few, many)
+
+    def test_public_endpoints_within_budget(self):
+        """Test: registro, verificación y creación de contraseña respetan su presupuesto"""
+        self.client.credentials()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('register'), {
+                'email': 'nuevo@example.com', 'full_name': 'Nuevo', 'phone': '+56912345678'
+            }, format='json')
+        self.assertWithinQueryBudget(response)
+
+        participant = Participant.objects.get(email='nuevo@example.com')
+        response = self.client.post(reverse('verify-email'), {'token': str(participant.verification_token)}, format='json')
+        self.assertWithinQueryBudget(response)
+
+        response = self.client.post(reverse('set-password'), {
+            'verification_token': str(participant.verification_token),
+            'password': 'ClaveSegura123!',
+            'password_confirm': 'ClaveSegura123!'
+        }, format='json')
+        self.assertWithinQueryBudget(response)
+
+    def test_metrics_endpoint_reports_endpoints(self):
+        """Test: /api/admin/metrics/ agrega consultas y tiempos por endpoint y Server-Timing se envía"""
+        response = self.client.get(reverse('admin-participants-list'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+
+        response = self.client.get(reverse('admin-metrics'))
+        metrics = response.data['endpoints']['admin-participants-list']
+        self.assertEqual(metrics['requests'], 1)
+        self.assertGreater(metrics['avg_queries'], 0)
+        self.assertIn('email_throttle', response.data)
+
+    @override_settings(METRICS_FLUSH_SECONDS=60)
+    def test_metrics_are_flushed_in_batches(self):
+        """Test: las solicitudes se acumulan en el proceso y se vuelcan a la caché juntas"""
+        flush_metrics()
+        for _ in range(3):
+            self.client.get(reverse('admin-participants-list'))
+
+        self.assertIsNone(cache.get(ENDPOINT_CACHE_KEY.format('admin-participants-list', 'requests')))
+        self.assertEqual(endpoint_metrics()['admin-participants-list']['requests'], 3)
+        self.assertEqual(cache.get(ENDPOINT_CACHE_KEY.format('admin-participants-list', 'requests')), 3)
+
+    async def test_middleware_counts_queries_under_asgi(self):
+        """Test: bajo ASGI el middleware cuenta las consultas que la vista hace en su hilo"""
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.admin).access_token))()
+        url = reverse('admin-participants-list')
+        sync_count = (await sync_to_async(self.client.get)(url)).query_count
+
+        response = await self.async_client.get(url, headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(response.query_count, 0)
+        self.assertEqual(response.query_count, sync_count)
+        self.assertIn(f'desc="{sync_count} queries"', response['Server-Timing'])
+
+    def test_metrics_endpoint_requires_admin(self):
+        """Test: las métricas solo las ve un administrador"""
+        self.client.credentials()
+        response = self.client.get(reverse('admin-metrics'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ConditionalGetTests(APITestCase):
+    """Tests de ETag / 304 en los listados y estadísticas de admin"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        self.admin = Participant.objects.create_superuser(
+            email='admin@ctsturismo.cl',
+            full_name='Admin CTS',
+            phone='+56900000000',
+            password='admin123'
+        )
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.participants = []
+        for i in range(4):
+            participant = Participant.objects.create_user(
+                email=f'etag{i}@example.com',
+                full_name=f'Etag {i}',
+                phone=f'+5694000000{i}'
+            )
+            participant.verify_email()
+            self.participants.append(participant)
+
+    def assertNotModified(self, url):
+        """Repite la petición con el ETag recibido y espera 304 sin cuerpo"""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cached.content, b'')
+        self.assertEqual(cached['ETag'], response['ETag'])
+        return response['ETag']
+
+    def test_participant_list_not_modified(self):
+        """Test: el listado responde 304 mientras no cambie ningún participante"""
+        url = reverse('admin-participants-list')
+        etag = self.assertNotModified(url)
+        self.assertIn('Last-Modified', self.client.get(url))
+
+        self.participants[0].full_name = 'Etag Editado'
+        self.participants[0].save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        self.participants[1].delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_verification_changes_participant_etag(self):
+        """Test: verificar el email cambia el ETag del listado (el estado deja de ser pendiente)"""
+        pending = Participant.objects.create_user(email='pendiente@example.com', full_name='Pendiente', phone='+56940000099')
+        url = reverse('admin-participants-list')
+        etag = self.assertNotModified(url)
+
+        pending.verify_email()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        row = next(row for row in response.data['results'] if row['email'] == 'pendiente@example.com')
+        self.assertTrue(row['is_verified'])
+
+    def test_etag_depends_on_query_params(self):
+        """Test: otros filtros o páginas tienen otro ETag"""
+        url = reverse('admin-participants-list')
+        etag = self.assertNotModified(url)
+        response = self.client.get(url + '?search=etag1', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertNotModified(url + '?search=etag1')
+
+    def test_winner_list_not_modified(self):
+        """Test: el listado de ganadores cambia de ETag al notificar o editar al ganador"""
+        url = reverse('admin-winners-list')
+        winner = draw_winners(self.admin, count=1)[0]
+        etag = self.assertNotModified(url)
+
+        winner.mark_as_notified()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response['ETag']
+        participant = Participant.objects.get(pk=winner.participant_id)
+        participant.phone = '+56999999999'
+        participant.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_stats_not_modified(self):
+        """Test: las estadísticas responden 304 hasta que cambia algún contador"""
+        url = reverse('admin-participants-stats')
+        etag = self.assertNotModified(url)
+
+        Participant.objects.create_user(email='nuevo@example.com', full_name='Nuevo', phone='+56912345678')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_participants'], 5)
+
+
+@override_settings(LIVE_EVENTS_POLL_SECONDS=0, LIVE_EVENTS_MAX_SECONDS=0, BACKGROUND_EXECUTOR_WORKERS=0)
+class LiveEventsTests(TestCase):
+    """Tests del stream SSE de eventos para el dashboard"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        cache.clear()
+        self.admin = Participant.objects.create_superuser(
+            email='admin@ctsturismo.cl',
+            full_name='Admin CTS',
+            phone='+56900000000',
+            password='admin123'
+        )
+        self.token = stream_token(self.admin)
+        self.url = reverse('admin-events')
+
+    def test_read_events_in_order_and_resync(self):
+        """Test: los eventos se leen en orden y un cliente fuera del buffer recibe resync"""
+        publish('a', n=1)
+        publish('b', n=2)
+        events, last_id = read_events(0)
+        self.assertEqual([event['type'] for _, event in events], ['a', 'b'])
+        self.assertEqual(last_id, 2)
+        self.assertEqual(read_events(2), ([], 2))
+
+        with override_settings(LIVE_EVENTS_BUFFER=1):
+            events, last_id = read_events(0)
+        self.assertEqual(events[0][1]['type'], RESYNC)
+        self.assertEqual(last_id, 2)
+
+    def test_operations_publish_events(self):
+        """Test: el registro y el sorteo publican eventos al confirmarse"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('register'), {
+                'email': 'vivo@example.com', 'full_name': 'En Vivo', 'phone': '+56912345678'
+            }, content_type='application/json')
+        participant = Participant.objects.get(email='vivo@example.com')
+        participant.verify_email()
+        with self.captureOnCommitCallbacks(execute=True):
+            winners = draw_winners(self.admin, count=1)
+
+        events, _ = read_events(0)
+        types = [event['type'] for _, event in events]
+        self.assertEqual(types, [PARTICIPANT_REGISTERED, WINNERS_DRAWN])
+        self.assertEqual(events[1][1]['data']['ids'], [winners[0].id])
+
+    def test_stream_requires_admin_token(self):
+        """Test: el stream exige un token de stream de administrador en ?token="""
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get(self.url, {'token': 'x'}).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        user = Participant.objects.create_user(email='user@example.com', full_name='User', phone='+56911111111')
+        self.assertEqual(
+            self.client.get(self.url, {'token': stream_token(user)}).status_code, status.HTTP_403_FORBIDDEN
+        )
+
+    def test_stream_rejects_access_tokens_and_expired_tokens(self):
+        """Test: el access JWT no abre el stream y el token de stream vence"""
+        access = str(RefreshToken.for_user(self.admin).access_token)
+        self.assertEqual(self.client.get(self.url, {'token': access}).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        with override_settings(LIVE_EVENTS_TOKEN_SECONDS=-1):
+            self.assertEqual(
+                self.client.get(self.url, {'token': self.token}).status_code, status.HTTP_401_UNAUTHORIZED
+            )
+
+    def test_stream_token_endpoint_requires_admin(self):
+        """Test: solo un admin autenticado con JWT obtiene un token de stream"""
+        url = reverse('admin-events-token')
+        client = APIClient()
+        self.assertEqual(client.post(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        client.force_authenticate(user=self.admin)
+        response = client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['expires_in'], settings.LIVE_EVENTS_TOKEN_SECONDS)
+        self.assertEqual(self.client.get(self.url, {'token': response.data['token']}).status_code, status.HTTP_200_OK)
+
+    async def test_stream_resumes_from_last_event_id(self):
+        """Test: el stream entrega los eventos posteriores a Last-Event-ID en formato SSE"""
+        await sync_to_async(publish)('participant.registered', id=1)
+        await sync_to_async(publish)('participant.verified', id=1)
+
+        response = await self.async_client.get(self.url, {'token': self.token}, headers={'Last-Event-ID': '1'})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = b''.join([chunk async for chunk in response.streaming_content]).decode()
+
+        self.assertIn('retry: ', content)
+        self.assertNotIn('event: participant.registered', content)
+        self.assertIn('id: 2\nevent: participant.verified\ndata: {"id": 1}\n\n', content)
+
+
+class HighVolumeAdminTests(TestCase):
+    """Tests de los changelists del admin para tablas grandes"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        self.admin = Participant.objects.create_superuser(
+            email='admin@ctsturismo.cl',
+            full_name='Admin CTS',
+            phone='+56900000000',
+            password='admin123'
+        )
+        self.client.force_login(self.admin)
+        for i in range(12):
+            participant = Participant.objects.create_user(
+                email=f'admin-list{i}@example.com',
+                full_name=f'Admin List {i}',
+                phone=f'+5695000000{i:02d}'
+            )
+            participant.verify_email()
+
+    def test_winner_changelist_queries_do_not_grow_with_rows(self):
+        """Test: el changelist de ganadores no carga participante ni admin por fila"""
+        url = reverse('admin:participants_winner_changelist')
+        draw_winners(self.admin, count=2)
+        few = self.client.get(url)
+        draw_winners(self.admin, count=8)
+        many = self.client.get(url)
+
+        self.assertEqual(many.status_code, 200)
+        self.assertEqual(few.query_count, many.query_count)
+        self.assertContains(many, '@example.com</td>', count=10)
+
+    def test_participant_changelist_renders_projection(self):
+        """Test: el changelist de participantes muestra las columnas y filtra por fecha"""
+        url = reverse('admin:participants_participant_changelist')
+        response = self.client.get(url, {'created_at__gte': (timezone.now() - timedelta(days=1)).isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'admin-list11@example.com')
+        self.assertEqual(response.context['cl'].result_count, 13)
+
+    def test_estimated_count_paginator(self):
+        """Test: se usa la estimación sobre el umbral y el conteo exacto bajo él"""
+        queryset = Participant.objects.order_by('pk')
+        with patch('participants.pagination.estimate_count', return_value=2_000_000):
+            self.assertEqual(EstimatedCountPaginator(queryset, 100).count, 2_000_000)
+        with patch('participants.pagination.estimate_count', return_value=50):
+            self.assertEqual(EstimatedCountPaginator(queryset, 100).count, 13)
+        self.assertEqual(EstimatedCountPaginator(queryset, 100).count, 13)
+
+
+@override_settings(BACKGROUND_EXECUTOR_WORKERS=0, BULK_JOB_CHUNK_SIZE=2)
+class BulkJobTests(APITestCase):
+    """Tests de acciones masivas en segundo plano"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        cache.clear()
+        self.admin = Participant.objects.create_superuser(
+            email='admin@ctsturismo.cl',
+            full_name='Admin CTS',
+            phone='+56900000000',
+            password='admin123'
+        )
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.participants = []
+        for i in range(5):
+            participant = Participant.objects.create_user(
+                email=f'bulk{i}@example.com',
+                full_name=f'Bulk {i}',
+                phone=f'+5696000000{i}'
+            )
+            if i < 3:
+                participant.verify_email()
+            self.participants.append(participant)
+
+    def run_bulk(self, url, action, ids):
+        with patch('participants.outbox.dispatch_outbox'), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'action': action, 'ids': [str(pk) for pk in ids]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED, response.data)
+        return self.client.get(response.data['status_url']).data
+
+    def test_deactivate_participants_in_chunks(self):
+        """Test: desactiva por bloques, ajusta los contadores y reporta el progreso"""
+        ids = [participant.id for participant in self.participants]
+        job = self.run_bulk(reverse('admin-participants-bulk'), BulkJob.ACTION_DEACTIVATE, ids + [self.admin.id])
+
+        self.assertEqual(job['status'], BulkJob.STATUS_DONE)
+        self.assertEqual((job['total'], job['processed'], job['affected']), (6, 6, 5))
+        self.assertEqual(job['progress'], 100.0)
+        self.assertFalse(Participant.objects.filter(id__in=ids, is_active=True).exists())
+        self.assertTrue(Participant.objects.get(pk=self.admin.pk).is_active)
+
+        counters = ParticipantCounters.current()
+        self.assertEqual({field: getattr(counters, field) for field in ParticipantCounters.FIELDS},
+                         ParticipantCounters.compute())
+
+    def test_resend_verification_batches_outbox_rows(self):
+        """Test: solo los no verificados reciben un email en la bandeja de salida"""
+        EmailOutbox.objects.all().delete()
+        ids = [participant.id for participant in self.participants]
+        job = self.run_bulk(reverse('admin-participants-bulk'), BulkJob.ACTION_RESEND_VERIFICATION, ids)
+
+        self.assertEqual(job['affected'], 2)
+        self.assertEqual(
+            set(EmailOutbox.objects.values_list('to_email', flat=True)),
+            {'bulk3@example.com', 'bulk4@example.com'}
+        )
+
+    def test_mark_winners_notified(self):
+        """Test: marca como notificados solo a los ganadores pendientes"""
+        winners = draw_winners(self.admin, count=3)
+        winners[0].mark_as_notified()
+        job = self.run_bulk(reverse('admin-winners-bulk'), BulkJob.ACTION_MARK_NOTIFIED, [w.id for w in winners])
+
+        self.assertEqual(job['affected'], 2)
+        self.assertEqual(Winner.objects.filter(notified=True).count(), 3)
+
+    def test_rejects_action_of_other_resource(self):
+        """Test: cada recurso acepta solo sus acciones"""
+        response = self.client.post(reverse('admin-winners-bulk'), {
+            'action': BulkJob.ACTION_DEACTIVATE, 'ids': [str(self.participants[0].id)]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(BulkJob.objects.exists())
+
+    def test_admin_action_starts_job(self):
+        """Test: la acción del Django admin crea la acción masiva en vez de recorrer filas"""
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin:participants_participant_changelist'), {
+                'action': 'deactivate_participants',
+                '_selected_action': [str(participant.id) for participant in self.participants[:2]],
+            })
+        self.assertEqual(response.status_code, 302)
+        job = BulkJob.objects.get()
+        self.assertEqual((job.action, job.status, job.affected), (BulkJob.ACTION_DEACTIVATE, BulkJob.STATUS_DONE, 2))
+
+
+    @override_settings(BULK_JOB_MAX_IDS=3)
+    def test_admin_action_respects_max_ids(self):
+        """Test: la acción del admin aplica BULK_JOB_MAX_IDS como la API"""
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('admin:participants_participant_changelist'), {
+            'action': 'deactivate_participants',
+            '_selected_action': [str(participant.id) for participant in self.participants],
+        }, follow=True)
+
+        self.assertContains(response, 'Selecciona como máximo 3 filas')
+        self.assertFalse(BulkJob.objects.exists())
+
+    def test_progress_does_not_load_target_ids(self):
+        """Test: el progreso y el listado del admin no leen la lista de IDs"""
+        ids = [participant.id for participant in self.participants]
+        job = self.run_bulk(reverse('admin-participants-bulk'), BulkJob.ACTION_RESEND_VERIFICATION, ids)
+
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('admin-bulk-jobs-detail', args=[job['id']]))
+            self.client.get(reverse('admin:participants_bulkjob_changelist'))
+            self.client.get(reverse('admin:participants_bulkjob_change', args=[job['id']]))
+        self.assertTrue(any('participants_bulkjob' in query['sql'] for query in queries.captured_queries))
+        self.assertFalse(any('target_ids' in query['sql'] for query in queries.captured_queries))
+
+class EmailTemplateTests(TestCase):
+    """Tests de las plantillas de email (asunto, texto y HTML)"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        self.participant = Participant.objects.create_user(
+            email='plantilla@example.com',
+            full_name='Ana & <Pedro>',
+            phone='+56912345678'
+        )
+
+    def test_renders_text_and_html_parts(self):
+        """Test: un mismo contexto genera asunto, texto sin escapar y HTML escapado"""
+        email = build_verification_email(self.participant)
+        link = f'/verify/{self.participant.verification_token}'
+
+        self.assertEqual(email.subject, 'Verifica tu correo - Sorteo San Valentín CTS Turismo')
+        self.assertIn('¡Hola Ana & <Pedro>!', email.text)
+        self.assertIn(link, email.text)
+        self.assertIn('Ana &amp; &lt;Pedro&gt;', email.html)
+        self.assertIn(link, email.html)
+
+    def test_templates_are_compiled_once(self):
+        """Test: la plantilla se lee y compila solo la primera vez"""
+        clear_email_templates()
+        engine = engines['django'].engine
+        with patch.object(engine, 'get_template', wraps=engine.get_template) as get_template:
+            for i in range(5):
+                render_email('winner', {'full_name': f'Ganador {i}', 'phone': '+569', 'prize_description': 'Hotel'})
+        self.assertEqual(get_template.call_count, 1)
+
+    def test_sent_email_is_multipart(self):
+        """Test: el email enviado lleva la parte HTML como alternativa"""
+        send_verification_email_sync(self.participant.id)
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('Ana & <Pedro>', mail.outbox[0].body)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+
+
+@override_settings(EMAIL_RATE_PER_SECOND=0)
+class EmailTaskTests(TestCase):
+    """Tests de reintentos e idempotencia de las tareas de email de Celery"""
+
+    def setUp(self):
+        """Configuración inicial"""
+        self.participant = Participant.objects.create_user(
+            email='tarea@example.com',
+            full_name='Tarea Test',
+            phone='+56912345678'
+        )
+
+    def test_retries_transient_error_and_sends_once(self):
+        """Test: un error transitorio se reintenta y el email se envía una sola vez"""
+        with patch('participants.tasks.send_mail', side_effect=[ConnectionError('caído'), 1]) as send:
+            result = send_verification_email.apply(args=[str(self.participant.id)])
+
+        self.assertTrue(result.successful())
+        self.assertEqual(send.call_count, 2)
+        delivery = EmailDelivery.objects.get(participant=self.participant)
+        self.assertEqual(delivery.status, EmailDelivery.STATUS_SENT)
+        self.assertEqual(delivery.attempts, 2)
+
+    def test_redelivered_task_does_not_resend(self):
+        """Test: una entrega duplicada de la tarea no repite el email"""
+        winner = Winner.objects.create(participant=self.participant)
+        send_winner_notification.apply(args=[winner.id])
+        send_winner_notification.apply(args=[winner.id])
+        send_verification_email.apply(args=[str(self.participant.id)])
+
+        self.assertEqual(len(mail.outbox), 2)
+        winner.refresh_from_db()
+        self.assertTrue(winner.notified)
+        self.assertEqual(EmailDelivery.objects.filter(participant=self.participant).count(), 2)
+
+    def test_redelivery_with_fresh_claim_retries_until_it_expires(self):
+        """Test: una tarea reentregada con la reserva aún vigente reintenta en vez de perder el email"""
+        delivery = EmailDelivery.objects.create(
+            participant=self.participant, kind=EmailOutbox.KIND_VERIFICATION,
+            reference=str(self.participant.verification_token),
+            status=EmailDelivery.STATUS_SENDING, claimed_at=timezone.now(), attempts=1
+        )
+        with patch.object(send_verification_email, 'retry', side_effect=Retry()) as retry:
+            send_verification_email.apply(args=[str(self.participant.id)])
+
+        countdown = retry.call_args.kwargs['countdown']
+        self.assertTrue(0 < countdown <= 301)
+        self.assertEqual(len(mail.outbox), 0)
+
+        # Al expirar la reserva el reintento toma el envío y lo completa
+        EmailDelivery.objects.filter(pk=delivery.pk).update(claimed_at=timezone.now() - timedelta(seconds=301))
+        send_verification_email.apply(args=[str(self.participant.id)])
+        delivery.refresh_from_db()
+        self.assertEqual(delivery.status, EmailDelivery.STATUS_SENT)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_permanent_error_is_not_retried(self):
+        """Test: un destinatario rechazado marca el envío como fallido sin reintentar"""
+        with patch('participants.tasks.send_mail', side_effect=AnymailRecipientsRefused()) as send:
+            result = send_verification_email.apply(args=[str(self.participant.id)])
+
+        self.assertTrue(result.failed())
+        self.assertEqual(send.call_count, 1)
+        delivery = EmailDelivery.objects.get(participant=self.participant)
+        self.assertEqual(delivery.status, EmailDelivery.STATUS_FAILED)
+
+
+class CeleryTopologyTests(TestCase):
+    """Tests de la configuración de colas de Celery"""
+
+    def test_tasks_are_routed_to_their_queue(self):
+        """Test: los emails van a la cola email y los sorteos a la cola draw"""
+        from config.celery import app
+
+        queues = {
+            'participants.tasks.send_verification_email': 'email',
+            'participants.tasks.send_winner_notification': 'email',
+            'participants.tasks.dispatch_email_outbox': 'email',
+            'participants.tasks.run_draw_job': 'draw',
+            'participants.tasks.warm_draw_job': 'draw',
+            'participants.tasks.run_bulk_job': 'default',
+        }
+        for name, queue in queues.items():
+            self.assertEqual(app.amqp.router.route({}, name)['queue'].name, queue, name)
+
+    def test_tasks_ignore_results_and_have_time_limits(self):
+        """Test: ninguna tarea guarda resultado y cada envío tiene un timeout en el cliente"""
+        from django.conf import settings
+        from config.celery import app
+
+        for task in (send_verification_email, send_winner_notification, run_draw_job):
+            self.assertTrue(task.ignore_result, task.name)
+        self.assertGreater(app.conf.task_time_limit, app.conf.task_soft_time_limit)
+        # El pool de hilos ignora los límites de Celery: el envío lo acota el cliente HTTP/SMTP
+        self.assertEqual(settings.ANYMAIL['REQUESTS_TIMEOUT'], settings.EMAIL_SEND_TIMEOUT)
+        self.assertEqual(settings.EMAIL_TIMEOUT, settings.EMAIL_SEND_TIMEOUT)
+        self.assertLess(settings.EMAIL_SEND_TIMEOUT, app.conf.task_soft_time_limit)
+
+
+@override_settings(BACKGROUND_EXECUTOR_WORKERS=1, BACKGROUND_EXECUTOR_QUEUE=0)
+class BackgroundExecutorTests(TestCase):
+    """Tests del pool de hilos acotado que se usa sin broker de Celery"""
+
+    def setUp(self):
+        """Configuración inicial: un pool nuevo con su único cupo ocupado"""
+        patcher = patch.multiple(dispatch, _executor=None, _slots=None, _closed=False, _pending=set())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.busy = dispatch.run_in_background(self.release.wait, 5)
+
+    def test_inline_policy_runs_in_current_thread(self):
+        """Test: con el pool lleno y la política 'inline' el trabajo corre en el request"""
+        with self.settings(BACKGROUND_EXECUTOR_POLICY=dispatch.POLICY_INLINE):
+            result = dispatch.run_in_background(lambda: threading.current_thread().name)
+        self.assertEqual(result, threading.current_thread().name)
+
+    def test_outbox_policy_drops_job(self):
+        """Test: con la política 'outbox' el trabajo se descarta y se llama a on_drop"""
+        calls = []
+        with self.settings(BACKGROUND_EXECUTOR_POLICY=dispatch.POLICY_OUTBOX):
+            dispatch.run_in_background(calls.append, 'job', on_drop=lambda: calls.append('dropped'))
+            # Sin on_drop no se puede descartar: se ejecuta en el hilo actual
+            dispatch.run_in_background(calls.append, 'inline')
+        self.assertEqual(calls, ['dropped', 'inline'])
+
+    def test_block_policy_waits_for_slot(self):
+        """Test: con la política 'block' el request espera un cupo y el trabajo va al pool"""
+        threading.Timer(0.05, self.release.set).start()
+        with self.settings(BACKGROUND_EXECUTOR_POLICY=dispatch.POLICY_BLOCK, BACKGROUND_EXECUTOR_BLOCK_SECONDS=5):
+            future = dispatch.run_in_background(lambda: threading.current_thread().name)
+        self.assertTrue(future.result(timeout=5).startswith('background'))
+
+    def test_pool_registers_shutdown_at_exit(self):
+        """Test: al crear el pool se registra su drenaje con atexit"""
+        with patch.multiple(dispatch, _executor=None, _slots=None), \
+                patch('participants.dispatch.atexit.register') as register:
+            dispatch.run_in_background(lambda: None).result(timeout=5)
+            dispatch._executor.shutdown()
+        register.assert_called_once_with(dispatch.shutdown_background)
+
+    def test_shutdown_drains_pending_jobs(self):
+        """Test: al apagar se espera a los trabajos pendientes y los nuevos corren en el hilo actual"""
+        self.release.set()
+        self.busy.result(timeout=5)
+        done = []
+        dispatch.run_in_background(lambda: (time.sleep(0.05), done.append('job')))
+
+        self.assertTrue(dispatch.shutdown_background(timeout=5))
+        self.assertEqual(done, ['job'])
+        dispatch.run_in_background(done.append, 'inline')
+        self.assertEqual(done, ['job', 'inline'])
+
+
+@override_settings(BACKGROUND_EXECUTOR_WORKERS=0, EMAIL_RATE_PER_SECOND=0)
+class VerificationReminderTests(TestCase):
+    """Tests de la campaña de recordatorios de verificación"""
+
+    def setUp(self):
+        """Configuración inicial: 5 pendientes (dos con la misma fecha de registro) y 3 que no corresponden"""
+        two_days_ago = timezone.now() - timedelta(days=2)
+        self.due = []
+        for i in range(5):
+            participant = Participant.objects.create_user(
+                email=f'pendiente{i}@example.com', full_name=f'Pendiente {i}', phone='+56912345678'
+            )
+            Participant.objects.filter(id=participant.id).update(
+                created_at=two_days_ago + timedelta(minutes=min(i, 3))
+            )
+            self.due.append(participant)
+
+        verified = Participant.objects.create_user(email='verificado@example.com', full_name='V', phone='+569')
+        reminded = Participant.objects.create_user(email='recordado@example.com', full_name='R', phone='+569')
+        Participant.objects.create_user(email='nuevo@example.com', full_name='N', phone='+569')
+        Participant.objects.filter(id=verified.id).update(is_verified=True, created_at=two_days_ago)
+        Participant.objects.filter(id=reminded.id).update(
+            created_at=two_days_ago, last_reminded_at=timezone.now() - timedelta(hours=1)
+        )
+
+    def test_reminds_only_due_participants(self):
+        """Test: solo los no verificados antiguos y sin recordatorio reciente reciben el email"""
+        with self.captureOnCommitCallbacks(execute=True):
+            reminded, _ = run_reminder_campaign()
+
+        self.assertEqual(reminded, 5)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), sorted(p.email for p in self.due))
+        self.assertTrue(all(m.subject.startswith('Recuerda verificar') for m in mail.outbox))
+        self.assertEqual(Participant.objects.filter(last_reminded_at__isnull=False).count(), 6)
+
+    def test_walks_backlog_in_chunks_without_duplicates(self):
+        """Test: el recorrido por keyset cubre a todos una sola vez, aunque compartan created_at"""
+        reminded, chunks = run_reminder_campaign(chunk_size=2)
+
+        self.assertEqual((reminded, chunks), (5, 3))
+        rows = EmailOutbox.objects.filter(kind=EmailOutbox.KIND_REMINDER)
+        self.assertEqual(sorted(rows.values_list('to_email', flat=True)), sorted(p.email for p in self.due))
+
+    def test_recently_reminded_are_skipped(self):
+        """Test: una segunda campaña no vuelve a recordar dentro del intervalo"""
+        run_reminder_campaign()
+        self.assertEqual(run_reminder_campaign(), (0, 0))
+
+    def test_dry_run_changes_nothing(self):
+        """Test: --dry-run solo cuenta"""
+        out = StringIO()
+        call_command('send_reminders', '--dry-run', stdout=out)
+
+        self.assertIn('Would remind 5 participant(s)', out.getvalue())
+        self.assertFalse(EmailOutbox.objects.exists())
+        self.assertEqual(Participant.objects.filter(last_reminded_at__isnull=False).count(), 1)
+
+
+class PurgeUnverifiedTests(TestCase):
+    """Tests de la expiración de registros no verificados"""
+
+    def setUp(self):
+        """Configuración inicial: 5 vencidos y 4 que se conservan (verificado, reciente, ganador y admin)"""
+        old = timezone.now() - timedelta(days=45)
+        self.stale = []
+        for i in range(5):
+            participant = Participant.objects.create_user(
+                email=f'vencido{i}@example.com', full_name=f'Vencido {i}', phone='+56912345678'
+            )
+            EmailOutbox.objects.create(
+                participant=participant, kind=EmailOutbox.KIND_VERIFICATION, to_email=participant.email,
+                subject='Verifica', body='-'
+            )
+            self.stale.append(participant)
+
+        verified = Participant.objects.create_user(email='verificado@example.com', full_name='V', phone='+569')
+        winner = Participant.objects.create_user(email='ganador@example.com', full_name='G', phone='+569')
+        admin = Participant.objects.create_superuser(email='admin@example.com', full_name='A', phone='+569', password='x')
+        Participant.objects.create_user(email='nuevo@example.com', full_name='N', phone='+569')
+        Winner.objects.create(participant=winner, drawn_by=admin)
+        Participant.objects.filter(id__in=[p.id for p in self.stale] + [verified.id, winner.id, admin.id]).update(
+            created_at=old
+        )
+        Participant.objects.filter(id=verified.id).update(is_verified=True)
+        Participant.objects.filter(id=admin.id).update(is_verified=False)
+        ParticipantCounters.reconcile()
+
+    def test_deletes_only_stale_unverified(self):
+        """Test: solo se borran los no verificados vencidos, con sus emails, y los contadores cuadran"""
+        Participant.objects.filter(id=self.stale[0].id).update(is_active=False, password=make_password('ClaveSegura123!'))
+        ParticipantCounters.reconcile()
+
+        with CaptureQueriesContext(connection) as queries:
+            deleted, batches = purge_unverified(days=30, sleep=0)
+
+        self.assertEqual((deleted, batches), (5, 1))
+        # Un solo UPDATE de contadores por bloque, no uno por fila borrada
+        counter_updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "participants_participantcounters"')]
+        self.assertEqual(len(counter_updates), 1)
+        self.assertFalse(Participant.objects.filter(id__in=[p.id for p in self.stale]).exists())
+        self.assertEqual(Participant.objects.count(), 4)
+        self.assertFalse(EmailOutbox.objects.exists())
+        counters = ParticipantCounters.current()
+        self.assertEqual({field: getattr(counters, field) for field in ParticipantCounters.FIELDS},
+                         ParticipantCounters.compute())
+
+    def test_deletes_in_batches_with_pause(self):
+        """Test: bloques pequeños por id con una pausa entre bloques y avance reportado"""
+        progress = []
+        with patch('participants.retention.time.sleep') as sleep:
+            deleted, batches = purge_unverified(days=30, batch_size=2, sleep=0.5,
+                                                progress=lambda *args: progress.append(args))
+
+        self.assertEqual((deleted, batches), (5, 3))
+        self.assertEqual(progress, [(2, 1), (4, 2), (5, 3)])
+        self.assertEqual(sleep.call_count, 2)
+        sleep.assert_called_with(0.5)
+
+    def test_dry_run_changes_nothing(self):
+        """Test: --dry-run solo cuenta"""
+        out = StringIO()
+        call_command('purge_unverified', '--days', '30', '--batch-size', '2', '--dry-run', stdout=out)
+
+        self.assertIn('Would delete 5 unverified participant(s) older than 30 day(s) in 3 batch(es)', out.getvalue())
+        self.assertEqual(Participant.objects.count(), 9)
+
+    @override_settings(UNVERIFIED_RETENTION_DAYS=0)
+    def test_zero_retention_disables_purge(self):
+        """Test: con retención 0 la tarea periódica no borra y el comando exige días"""
+        self.assertEqual(purge_unverified_participants(), 'Unverified retention disabled')
+        with self.assertRaises(CommandError):
+            call_command('purge_unverified', stdout=StringIO())
+        self.assertEqual(Participant.objects.count(), 9)
+
+
 class IntegrationTests(APITestCase):
     """Tests de integración para el flujo completo"""
 
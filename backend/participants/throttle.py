@@ -0,0 +1,139 @@
+"""
+Límite de envío de emails (token bucket) compartido entre procesos mediante
+la caché de Django
+"""
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import increment
+
+logger = logging.getLogger(__name__)
+
+BUCKET_CACHE_KEY = 'email-throttle:bucket'
+LOCK_CACHE_KEY = 'email-throttle:lock'
+DAILY_CACHE_KEY = 'email-throttle:day:{}'
+METRIC_CACHE_KEY = 'email-throttle:metric:{}'
+METRICS = ('granted', 'deferred', 'wait_ms')
+# Espera sugerida cuando otro proceso retiene el lock del bucket
+LOCK_RETRY_SECONDS = 0.5
+
+
+class EmailThrottled(Exception):
+    """El envío supera el presupuesto del proveedor y debe reintentarse más tarde"""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Límite de envío alcanzado, reintentar en {retry_after:.1f}s')
+        self.retry_after = retry_after
+
+
+def is_rate_limited_error(error):
+    """Indica si el proveedor rechazó el envío por límite de tasa (HTTP 429)"""
+    return getattr(error, 'status_code', None) == 429
+
+
+@contextmanager
+def _bucket_lock(timeout=2):
+    """
+    Lock corto sobre el estado del bucket. `cache.add` es atómico en Redis y
+    memcached, así que sirve como mutex entre procesos; el timeout lo libera
+    si un proceso muere con el lock tomado. Retorna si se obtuvo el lock: sin
+    él no se toca el bucket, y al salir solo se borra si sigue siendo propio.
+    """
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + timeout
+    acquired = cache.add(LOCK_CACHE_KEY, token, timeout=timeout)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.005)
+        acquired = cache.add(LOCK_CACHE_KEY, token, timeout=timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired and cache.get(LOCK_CACHE_KEY) == token:
+            cache.delete(LOCK_CACHE_KEY)
+
+
+def _seconds_until_next_day():
+    """Segundos hasta la medianoche UTC (cuando el proveedor reinicia el cupo diario)"""
+    now = datetime.now(dt_timezone.utc)
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (tomorrow - now).total_seconds()
+
+
+def reserve(tokens=1):
+    """
+    Intenta tomar `tokens` del bucket. Retorna 0 si el envío puede salir ya o
+    los segundos que faltan para tener presupuesto (sin consumir nada).
+    """
+    rate = settings.EMAIL_RATE_PER_SECOND
+    if rate <= 0:
+        return 0.0
+    burst = max(settings.EMAIL_RATE_BURST, tokens)
+    daily_limit = settings.EMAIL_DAILY_LIMIT
+    day_key = DAILY_CACHE_KEY.format(datetime.now(dt_timezone.utc).date().isoformat())
+
+    with _bucket_lock() as locked:
+        if not locked:
+            logger.warning("Lock del limitador de emails ocupado; envío diferido")
+            return LOCK_RETRY_SECONDS
+        if daily_limit and cache.get(day_key, 0) + tokens > daily_limit:
+            return _seconds_until_next_day()
+
+        now = time.time()
+        level, updated_at = cache.get(BUCKET_CACHE_KEY) or (burst, now)
+        level = min(burst, level + (now - updated_at) * rate)
+        if level < tokens:
+            return (tokens - level) / rate
+
+        cache.set(BUCKET_CACHE_KEY, (level - tokens, now), timeout=3600)
+        if daily_limit:
+            cache.add(day_key, 0, timeout=2 * 86400)
+            cache.incr(day_key, tokens)
+    return 0.0
+
+
+def acquire(tokens=1, max_wait=None):
+    """
+    Espera hasta tener presupuesto para enviar. Si la espera necesaria supera
+    `max_wait` segundos lanza EmailThrottled para que el envío se reprograme.
+    Retorna los segundos esperados.
+    """
+    if max_wait is None:
+        max_wait = settings.EMAIL_THROTTLE_MAX_WAIT
+    waited = 0.0
+    while True:
+        wait = reserve(tokens)
+        if not wait:
+            _record('granted', tokens)
+            if waited:
+                _record('wait_ms', int(waited * 1000))
+            return waited
+        if waited + wait > max_wait:
+            _record('deferred', tokens)
+            logger.info("Envío de email diferido %.1fs por límite de tasa", wait)
+            raise EmailThrottled(wait)
+        time.sleep(wait)
+        waited += wait
+
+
+def _record(metric, amount):
+    """Suma `amount` a una métrica del limitador"""
+    increment(METRIC_CACHE_KEY.format(metric), amount)
+
+
+def record_deferral(tokens=1):
+    """Registra envíos reprogramados por un rechazo del proveedor (HTTP 429)"""
+    _record('deferred', tokens)
+
+
+def throttle_metrics():
+    """Métricas acumuladas del limitador: envíos, diferidos y espera total/promedio"""
+    values = cache.get_many([METRIC_CACHE_KEY.format(metric) for metric in METRICS])
+    metrics = {metric: values.get(METRIC_CACHE_KEY.format(metric), 0) for metric in METRICS}
+    metrics['avg_wait_ms'] = round(metrics['wait_ms'] / metrics['granted'], 2) if metrics['granted'] else 0.0
+    return metrics
@@ -5,16 +5,23 @@ from .views import (
     verify_email,
     set_password,
     login_admin,
+    admin_metrics,
+    admin_events,
+    admin_events_token,
     test_sendgrid,
     clean_database,
     ParticipantViewSet,
-    WinnerViewSet
+    WinnerViewSet,
+    DrawJobViewSet,
+    BulkJobViewSet
 )
 
 # Router para ViewSets
 router = DefaultRouter()
 router.register(r'admin/participants', ParticipantViewSet, basename='admin-participants')
 router.register(r'admin/winners', WinnerViewSet, basename='admin-winners')
+router.register(r'admin/draw-jobs', DrawJobViewSet, basename='admin-draw-jobs')
+router.register(r'admin/bulk-jobs', BulkJobViewSet, basename='admin-bulk-jobs')
 
 urlpatterns = [
     # Endpoints públicos de participantes
@@ -28,6 +35,13 @@ urlpatterns = [
     # Autenticación de administrador
     path('auth/login/', login_admin, name='admin-login'),
 
+    # Métricas por endpoint (solo admin)
+    path('admin/metrics/', admin_metrics, name='admin-metrics'),
+
+    # Eventos en vivo para el dashboard (SSE, solo admin)
+    path('admin/events/', admin_events, name='admin-events'),
+    path('admin/events/token/', admin_events_token, name='admin-events-token'),
+
     # Test SendGrid
     path('test-sendgrid/', test_sendgrid, name='test-sendgrid'),
 
@@ -3,26 +3,54 @@ from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework_simplejwt.tokens import RefreshToken
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from django.core.mail import send_mail
-from django.shortcuts import get_object_or_404
+from django.http import JsonResponse, StreamingHttpResponse
 from django.conf import settings
-from django.db.models import Q
-import random
-
-from .models import Participant, Winner
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
+from datetime import timedelta
+from functools import partial
+
+from .models import BulkJob, DrawIdempotencyKey, DrawJob, Participant, ParticipantCounters, Winner
+from .bulk import create_bulk_job
+from .dispatch import broker_configured, enqueue
+from .draw import DrawError, draw_lock, draw_winners
 from .serializers import (
     ParticipantRegistrationSerializer,
     SetPasswordSerializer,
     ParticipantSerializer,
     ParticipantListSerializer,
+    ParticipantListRowSerializer,
     WinnerSerializer,
+    DrawSerializer,
+    DrawJobCreateSerializer,
+    DrawJobSerializer,
+    BulkJobCreateSerializer,
+    BulkJobSerializer,
     LoginSerializer,
     VerifyEmailSerializer
 )
-# Importar tareas asíncronas de Celery (si las tienes)
-from .tasks import send_verification_email, send_winner_notification
-# Importar versiones síncronas como fallback
-from .emails import send_verification_email_sync, send_winner_notification_sync
+from .tasks import run_draw_job, warm_draw_job
+from .conditional import conditional_get, participants_version, winners_version
+from .export import EXPORT_FORMATS, export_response
+from .live import (
+    PARTICIPANT_REGISTERED,
+    PARTICIPANT_VERIFIED,
+    event_stream,
+    parse_last_event_id,
+    publish_on_commit,
+    stream_token,
+    stream_token_user_id
+)
+from .metrics import endpoint_metrics
+from .throttle import throttle_metrics
+from .pagination import KeysetPagination
+from .search import ParticipantSearchFilter
+from .outbox import enqueue_verification_email, enqueue_winner_emails, flush_outbox_on_commit
 
 
 class IsAdmin(IsAdminUser):
@@ -35,13 +63,18 @@ class IsAdmin(IsAdminUser):
 # Endpoints públicos
 # ======================
 
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register_participant(request):
     serializer = ParticipantRegistrationSerializer(data=request.data)
     if serializer.is_valid():
-        participant = serializer.save()
-        send_verification_email_sync(participant.id)  # fallback síncrono
+        with transaction.atomic():
+            participant = serializer.save()
+            # El email queda en la bandeja de salida y se despacha después del commit
+            enqueue_verification_email(participant)
+            flush_outbox_on_commit()
+            publish_on_commit(PARTICIPANT_REGISTERED, id=participant.id, full_name=participant.full_name)
         return Response({
             'message': '¡Gracias por registrarte! Revisa tu correo para verificar tu cuenta.',
             'participant': {
@@ -64,6 +97,7 @@ def verify_email(request):
             return Response({'error': 'Token de verificación inválido o ya utilizado.'}, status=status.HTTP_400_BAD_REQUEST)
 
         participant.verify_email()
+        publish_on_commit(PARTICIPANT_VERIFIED, id=participant.id, full_name=participant.full_name)
         return Response({
             'message': 'Email verificado exitosamente. Ahora puedes crear tu contraseña.',
             'participant': ParticipantSerializer(participant).data
@@ -135,14 +169,75 @@ def login_admin(request):
 # ViewSets (admin)
 # ======================
 
+def export_queryset(view, request, columns, filename):
+    """
+    Aplica los mismos filtros del listado y responde en streaming. Se usa
+    ?export_format= porque ?format= lo reserva DRF para elegir el renderer.
+    """
+    export_format = request.query_params.get('export_format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return Response(
+            {'error': f"Formato no soportado. Usa: {', '.join(EXPORT_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    queryset = view.filter_queryset(view.get_queryset())
+    # Bajo ASGI el cuerpo debe ser asíncrono para que Django no lo acumule en memoria
+    asynchronous = isinstance(request._request, ASGIRequest)
+    return export_response(queryset, columns, export_format, filename, asynchronous=asynchronous)
+
+
+def start_bulk_job(request, actions):
+    """Valida la acción masiva pedida y la deja en segundo plano (responde 202)"""
+    serializer = BulkJobCreateSerializer(data=request.data, actions=actions)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    job = create_bulk_job(
+        serializer.validated_data['action'], serializer.validated_data['ids'], request.user
+    )
+    return Response({
+        'message': 'Acción masiva en proceso.',
+        'job_id': str(job.id),
+        'status_url': request.build_absolute_uri(reverse('admin-bulk-jobs-detail', args=[job.id]))
+    }, status=status.HTTP_202_ACCEPTED)
+
+
 class ParticipantViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Participant.objects.filter(is_admin=False)
     serializer_class = ParticipantListSerializer
     permission_classes = [IsAdmin]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    # La búsqueda va después del orden para que pueda ordenar por relevancia
+    filter_backends = [filters.OrderingFilter, ParticipantSearchFilter]
     search_fields = ['email', 'full_name', 'phone']
     ordering_fields = ['created_at', 'full_name', 'is_verified']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
+
+    @property
+    def paginator(self):
+        """
+        Paginación por número de página por defecto; con ?pagination=cursor (o
+        un ?cursor=) se usa keyset sobre (created_at, id), que no depende del
+        tamaño de la tabla. En modo cursor el orden es siempre -created_at.
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def list(self, request, *args, **kwargs):
+        """Listado por la ruta rápida; responde 304 si nada cambió desde el ETag del cliente"""
+        total, last_modified = participants_version()
+        return conditional_get(request, self._list_page, (total, last_modified), last_modified)
+
+    def _list_page(self):
+        """Solo las columnas necesarias y `status` calculado en SQL"""
+        queryset = ParticipantListRowSerializer.select(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(ParticipantListRowSerializer(page).data)
+        return Response(ParticipantListRowSerializer(queryset).data)
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -151,40 +246,227 @@ class ParticipantViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(is_verified=is_verified.lower() == 'true')
         return queryset
 
+    EXPORT_COLUMNS = {
+        'id': 'id',
+        'email': 'email',
+        'full_name': 'full_name',
+        'phone': 'phone',
+        'is_verified': 'is_verified',
+        'verified_at': 'verified_at',
+        'is_active': 'is_active',
+        'created_at': 'created_at',
+    }
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Exporta los participantes filtrados (?export_format=csv|ndjson) en streaming"""
+        return export_queryset(self, request, self.EXPORT_COLUMNS, 'participantes')
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Reenvía verificaciones o desactiva participantes en segundo plano ({action, ids})"""
+        return start_bulk_job(request, BulkJob.PARTICIPANT_ACTIONS)
+
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        total = self.get_queryset().count()
-        verified = self.get_queryset().filter(is_verified=True).count()
-        pending = total - verified
-        return Response({
-            'total_participants': total,
-            'verified': verified,
-            'pending': pending,
-            'eligible_for_draw': verified
-        })
+        # Una sola fila mantenida en cada escritura (ver ParticipantCounters)
+        counters = ParticipantCounters.current()
+        version = tuple(getattr(counters, field) for field in ParticipantCounters.FIELDS)
+        return conditional_get(request, lambda: Response({
+            'total_participants': counters.total,
+            'verified': counters.verified,
+            'pending': counters.total - counters.verified,
+            'eligible_for_draw': counters.eligible,
+            'password_set': counters.password_set,
+            'active': counters.active,
+            'inactive': counters.total - counters.active,
+            'winners': counters.won
+        }), version)
 
 
 class WinnerViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Winner.objects.all()
+    queryset = Winner.objects.select_related('participant', 'drawn_by')
     serializer_class = WinnerSerializer
     permission_classes = [IsAdmin]
     ordering = ['-drawn_at']
 
+    EXPORT_COLUMNS = {
+        'id': 'id',
+        'participant_id': 'participant_id',
+        'participant_name': 'participant__full_name',
+        'participant_email': 'participant__email',
+        'participant_phone': 'participant__phone',
+        'prize_description': 'prize_description',
+        'drawn_at': 'drawn_at',
+        'notified': 'notified',
+        'notified_at': 'notified_at',
+        'draw_mode': 'draw_mode',
+        'seed': 'seed',
+    }
+
+    def list(self, request, *args, **kwargs):
+        """Listado de ganadores; responde 304 si nada cambió desde el ETag del cliente"""
+        version = winners_version()
+        build = partial(super().list, request, *args, **kwargs)
+        return conditional_get(request, build, version, version[1])
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Exporta los ganadores (?export_format=csv|ndjson) en streaming"""
+        return export_queryset(self, request, self.EXPORT_COLUMNS, 'ganadores')
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Notifica o marca como notificados a los ganadores en segundo plano ({action, ids})"""
+        return start_bulk_job(request, BulkJob.WINNER_ACTIONS)
+
     @action(detail=False, methods=['post'])
     def draw(self, request):
-        eligible_participants = Participant.objects.filter(is_verified=True, is_active=True, is_admin=False)
-        if not eligible_participants.exists():
-            return Response({'error': 'No hay participantes elegibles para el sorteo.'}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = DrawSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        count = serializer.validated_data.get('count')
+        idempotency_key = request.headers.get('Idempotency-Key')
+
+        with draw_lock():
+            if idempotency_key:
+                stored = DrawIdempotencyKey.objects.filter(key=idempotency_key).first()
+                if stored is not None:
+                    return Response(stored.response, status=stored.status_code)
+
+            try:
+                winners = draw_winners(
+                    request.user,
+                    count=count,
+                    mode=serializer.validated_data['mode'],
+                    prize_descriptions=serializer.validated_data.get('prize_descriptions', []),
+                    nonce=serializer.validated_data.get('nonce')
+                )
+            except DrawError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            if count is None:
+                data = {'message': '¡Ganador seleccionado exitosamente!', 'winner': WinnerSerializer(winners[0]).data}
+            else:
+                data = {
+                    'message': f'¡{len(winners)} ganadores seleccionados exitosamente!',
+                    'winners': WinnerSerializer(winners, many=True).data
+                }
+            if idempotency_key:
+                DrawIdempotencyKey.objects.create(
+                    key=idempotency_key,
+                    created_by=request.user,
+                    status_code=status.HTTP_201_CREATED,
+                    response=data
+                )
+            enqueue_winner_emails(winners)
+            flush_outbox_on_commit()
+
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class DrawJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Sorteos en segundo plano: se crean con POST y se consultan por ID (polling)"""
+    queryset = DrawJob.objects.all()
+    serializer_class = DrawJobSerializer
+    permission_classes = [IsAdmin]
 
-        winner_participant = random.choice(list(eligible_participants))
-        winner = Winner.objects.create(participant=winner_participant, drawn_by=request.user)
+    def create(self, request):
+        serializer = DrawJobCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        scheduled_for = serializer.validated_data.get('scheduled_for')
+        if scheduled_for and not broker_configured():
+            return Response({'error': 'Los sorteos programados requieren Celery (CELERY_BROKER_URL).'}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = DrawJob.objects.create(
+            status=DrawJob.STATUS_SCHEDULED if scheduled_for else DrawJob.STATUS_PENDING,
+            mode=serializer.validated_data['mode'],
+            count=serializer.validated_data.get('count'),
+            prize_descriptions=serializer.validated_data.get('prize_descriptions', []),
+            nonce=serializer.validated_data.get('nonce', ''),
+            scheduled_for=scheduled_for,
+            created_by=request.user
+        )
+        transaction.on_commit(lambda: dispatch_draw_job(job))
 
-        try:
-            send_winner_notification_sync(winner.id)
-        except Exception as e:
-            print(f"Error enviando notificación: {str(e)}")
+        return Response({
+            'message': 'Sorteo programado.' if scheduled_for else 'Sorteo en proceso.',
+            'job_id': str(job.id),
+            'status_url': request.build_absolute_uri(reverse('admin-draw-jobs-detail', args=[job.id]))
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class BulkJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Progreso de las acciones masivas (polling)"""
+    # target_ids puede tener BULK_JOB_MAX_IDS elementos y el progreso no lo usa
+    queryset = BulkJob.objects.defer('target_ids')
+    serializer_class = BulkJobSerializer
+    permission_classes = [IsAdmin]
 
-        return Response({'message': '¡Ganador seleccionado exitosamente!', 'winner': WinnerSerializer(winner).data}, status=status.HTTP_201_CREATED)
+
+def dispatch_draw_job(job):
+    """Encola el sorteo; los programados además precalculan el pool antes de la hora"""
+    if job.scheduled_for is None:
+        enqueue(run_draw_job, str(job.id))
+        return
+    warm_at = job.scheduled_for - timedelta(minutes=settings.DRAW_WARMUP_MINUTES)
+    enqueue(warm_draw_job, str(job.id), eta=max(warm_at, timezone.now()))
+    enqueue(run_draw_job, str(job.id), eta=job.scheduled_for)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def admin_metrics(request):
+    """Consultas, tiempo de base de datos y tiempo total promedio por endpoint"""
+    return Response({
+        'endpoints': endpoint_metrics(),
+        'email_throttle': throttle_metrics(),
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAdmin])
+def admin_events_token(request):
+    """Token de corta duración para abrir /api/admin/events/ con EventSource"""
+    return Response({
+        'token': stream_token(request.user),
+        'expires_in': settings.LIVE_EVENTS_TOKEN_SECONDS,
+    })
+
+
+def stream_user(request):
+    """
+    Usuario del token de stream en ?token= (ver `admin_events_token`):
+    EventSource no permite enviar el header Authorization. Retorna None si el
+    token falta, no es válido, venció o el usuario ya no está activo.
+    """
+    user_id = stream_token_user_id(request.GET.get('token', ''))
+    if user_id is None:
+        return None
+    return Participant.objects.filter(pk=user_id, is_active=True).first()
+
+
+@require_GET
+async def admin_events(request):
+    """Stream SSE con altas, verificaciones, sorteos y notificaciones para el dashboard"""
+    user = await sync_to_async(stream_user)(request)
+    if user is None:
+        return JsonResponse({'error': 'Token inválido o expirado.'}, status=status.HTTP_401_UNAUTHORIZED)
+    if not user.is_admin:
+        return JsonResponse({'error': 'No tienes permisos de administrador.'}, status=status.HTTP_403_FORBIDDEN)
+
+    # Al reabrir con un token nuevo el cliente envía el último ID en la URL
+    last_id = parse_last_event_id(
+        request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    )
+    response = StreamingHttpResponse(event_stream(last_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Evita que nginx u otro proxy acumule el stream en un buffer
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 # ======================
@@ -99,6 +99,7 @@ export const useApi = () => {
       search?: string
       is_verified?: boolean
       page?: number
+      cursor?: string
     }) => {
       const queryParams = new URLSearchParams()
       if (params?.search) queryParams.append('search', params.search)
@@ -106,6 +107,7 @@ export const useApi = () => {
         queryParams.append('is_verified', params.is_verified.toString())
       }
       if (params?.page) queryParams.append('page', params.page.toString())
+      if (params?.cursor) queryParams.append('cursor', params.cursor)
 
       const query = queryParams.toString()
       return apiCall(`/admin/participants/${query ? '?' + query : ''}`)
@@ -121,5 +123,39 @@ export const useApi = () => {
 
     // Listar ganadores (admin)
     getWinners: () => apiCall('/admin/winners/'),
+
+    // Crear sorteo en segundo plano, inmediato o programado (admin)
+    createDrawJob: (data: {
+      count?: number
+      mode?: 'uniform' | 'weighted'
+      prize_descriptions?: string[]
+      scheduled_for?: string
+    } = {}) => apiCall('/admin/draw-jobs/', {
+      method: 'POST',
+      body: JSON.stringify(data),
+    }),
+
+    // Consultar el estado de un sorteo en segundo plano (admin)
+    getDrawJob: (jobId: string) => apiCall(`/admin/draw-jobs/${jobId}/`),
+
+    // Acción masiva en segundo plano sobre participantes o ganadores (admin)
+    startBulkJob: (resource: 'participants' | 'winners', action: string, ids: string[]) =>
+      apiCall(`/admin/${resource}/bulk/`, {
+        method: 'POST',
+        body: JSON.stringify({ action, ids }),
+      }),
+
+    // Consultar el progreso de una acción masiva (admin)
+    getBulkJob: (jobId: string) => apiCall(`/admin/bulk-jobs/${jobId}/`),
+
+    // Eventos en vivo (SSE) del dashboard. EventSource no envía headers: se pide un
+    // token de stream de corta duración (no el access token) y va en la URL
+    openAdminEvents: async (lastEventId?: string): Promise<EventSource | null> => {
+      if (typeof window === 'undefined' || !localStorage.getItem('access_token')) return null
+      const { token } = await apiCall<{ token: string }>('/admin/events/token/', { method: 'POST' })
+      const params = new URLSearchParams({ token })
+      if (lastEventId) params.set('last_event_id', lastEventId)
+      return new EventSource(`${apiBase}/admin/events/?${params}`)
+    },
   }
 }